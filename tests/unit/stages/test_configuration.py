@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from wiredflow.main.build import FlowBuilder
+
+
+def generate_devices(**params):
+    """ Generator configuration which yield parameters for each device """
+    for device_id in range(0, 8):
+        yield {'device_id': device_id}
+
+
+def slow_device_request(**params):
+    time.sleep(0.2)
+    if params['device_id'] == 5:
+        raise ValueError('Device is not available')
+    return {'Device': params['device_id']}
+
+
+def get_fan_out_action(http_connector, **params):
+    flow_builder = FlowBuilder()
+    pipeline = flow_builder.add_pipeline('test_pipeline', **params) \
+        .with_configuration(generate_devices) \
+        .with_http_connector(http_connector)
+    pipeline.create_action()
+    return pipeline.action
+
+
+def test_configuration_generator_concurrent_fan_out():
+    """ Check that outputs of generator configuration processed simultaneously """
+    processed_devices = []
+    lock = threading.Lock()
+
+    def device_request(**params):
+        time.sleep(0.2)
+        with lock:
+            processed_devices.append(params['device_id'])
+        return {'Device': params['device_id']}
+
+    action = get_fan_out_action(device_request, max_concurrency=8)
+    start_time = time.perf_counter()
+    action.perform_action()
+    spend_time = time.perf_counter() - start_time
+    action.close_stages()
+
+    assert sorted(processed_devices) == list(range(0, 8))
+    # Sequential processing takes at least 1.6 seconds
+    assert spend_time < 1
+
+
+def test_configuration_generator_fan_out_failure():
+    """ Check that failure in one of parallel tasks is propagated """
+    action = get_fan_out_action(slow_device_request, max_concurrency=4)
+    with pytest.raises(ValueError):
+        action.perform_action()
+    action.close_stages()
+
+
+def test_slow_output_does_not_block_fan_out():
+    """ New outputs must be processed while the slow one is still in progress """
+    processed_devices = []
+    lock = threading.Lock()
+
+    def device_request(**params):
+        time.sleep(0.5 if params['device_id'] == 0 else 0.02)
+        with lock:
+            processed_devices.append(params['device_id'])
+        return {'Device': params['device_id']}
+
+    action = get_fan_out_action(device_request, max_concurrency=2)
+    action.perform_action()
+    action.close_stages()
+
+    assert processed_devices[-1] == 0
+
+
+def test_generator_core_logic_receives_stage_parameters():
+    """ Parameters of generator core logic are passed the same way as for single step launch """
+    received_params = []
+
+    def get_data(**params):
+        return {'value': 1}
+
+    def split_data(relevant_info, db_connectors, parts: int, **params):
+        received_params.append(params.get('device_id'))
+        for part_id in range(parts):
+            yield {'Part': part_id}
+
+    flow_builder = FlowBuilder()
+    pipeline = flow_builder.add_pipeline('core_generator_pipeline') \
+        .with_http_connector(get_data) \
+        .with_core_logic(split_data, parts=3, device_id='default')
+    pipeline.create_action()
+    pipeline.action.perform_action()
+    # Configured parameters have priority over parameters of the stage
+    outputs = pipeline.action._launch_multi_stage(pipeline.action.init_stages[1], {'value': 1},
+                                                  {'device_id': 'configured'})
+    assert len(list(outputs)) == 3
+    pipeline.action.close_stages()
+
+    assert received_params == ['default', 'configured']
@@ -0,0 +1,82 @@
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from wiredflow.main.actions.stages.http_stage import StageGetHTTPConnector
+from wiredflow.mocks.http_server import MockHTTPServer
+
+
+def test_http_connector_reuses_connections():
+    """ Check that connector sends all requests through single connection """
+    with MockHTTPServer() as server:
+        connector = StageGetHTTPConnector(server.url, None, use_threads=True, pool_size=2, timeout=5)
+        # Parameters of connections pool are not passed into requests
+        assert connector.params == {}
+        for _ in range(5):
+            response = connector.get(pipeline_name='test')
+            assert isinstance(response, list)
+        connector.close()
+
+    assert server.statistics() == {'requests': 5, 'errors': 0, 'connections': 1}
+
+
+def test_mock_http_server_latency_and_errors():
+    """ Check that mock server serves slow requests simultaneously and generates errors """
+    with MockHTTPServer(latency_seconds=0.2, response_size=1000, error_rate=0.5, seed=0) as server:
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            responses = list(executor.map(lambda _: requests.get(server.url, timeout=5), range(10)))
+        spend_time = time.perf_counter() - start_time
+
+    statuses = [response.status_code for response in responses]
+    assert spend_time < 1
+    assert statuses.count(503) == server.statistics()['errors']
+    assert 0 < statuses.count(503) < 10
+    assert all(len(response.content) > 900 for response in responses if response.status_code == 200)
+
+
+def test_mock_http_server_accepts_connections_burst():
+    """ Simultaneous connections of load test must not wait for retransmission of refused ones """
+    with MockHTTPServer() as server:
+        barrier = threading.Barrier(64)
+
+        def request_with_new_connection(_):
+            barrier.wait()
+            start_time = time.perf_counter()
+            requests.get(server.url, headers={'Connection': 'close'}, timeout=5)
+            return time.perf_counter() - start_time
+
+        with ThreadPoolExecutor(max_workers=64) as executor:
+            durations = list(executor.map(request_with_new_connection, range(64)))
+
+    assert server.statistics()['requests'] == 64
+    # Dropped connection attempt is repeated only after one second
+    assert max(durations) < 0.9
+
+
+def test_http_connector_session_is_not_pickled():
+    """ Check that connector with opened session can be passed into another process """
+    connector = StageGetHTTPConnector('http://127.0.0.1', None, use_threads=False)
+    assert connector.session is not None
+
+    restored_connector = pickle.loads(pickle.dumps(connector))
+    assert restored_connector._session is None
+    connector.close()
+    assert connector._session is None
+    assert restored_connector.session is not None
+    restored_connector.close()
+
+
+def test_http_connector_creates_single_session():
+    """ Concurrent first requests must share single session with finite timeout """
+    connector = StageGetHTTPConnector('http://127.0.0.1', None, use_threads=True)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        sessions = list(executor.map(lambda _: connector.session, range(32)))
+
+    assert all(session is sessions[0] for session in sessions)
+    assert connector._request_params({})['timeout'] == 10
+    assert connector._request_params({'timeout': 1})['timeout'] == 1
+    connector.close()
@@ -0,0 +1,173 @@
+import os
+import pickle
+import time
+
+import pytest
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError
+
+from wiredflow.main.store_engines.mongo_engine.clients import get_clients_registry
+from wiredflow.main.store_engines.mongo_engine.mongo_db import MongoStorageStage, DUPLICATE_KEY_ERROR_CODE
+
+
+class MockCursor:
+    """ Cursor which applies sorting and limits only during iteration """
+
+    def __init__(self, documents: list):
+        self.documents = documents
+        self.is_fetched = False
+        self.start = 0
+        self.number_of_documents = None
+
+    def sort(self, key, direction):
+        assert direction == ASCENDING
+        return self
+
+    def skip(self, number_of_documents):
+        self.start = number_of_documents
+        return self
+
+    def limit(self, number_of_documents):
+        self.number_of_documents = number_of_documents
+        return self
+
+    def __iter__(self):
+        self.is_fetched = True
+        documents = self.documents[self.start:]
+        if self.number_of_documents is not None:
+            documents = documents[:self.number_of_documents]
+        return iter(documents)
+
+
+class MockDatabase(dict):
+    def list_collection_names(self):
+        return list(self.keys())
+
+
+class MockCollection:
+    """ Collection which remember all requests without real database """
+
+    def __init__(self):
+        self.create_index_calls = 0
+        self.inserted_batches = []
+        self.write_concern = None
+        self.duplicates = set()
+
+    def with_options(self, write_concern=None):
+        self.write_concern = write_concern
+        return self
+
+    def create_index(self, keys, unique=False):
+        self.create_index_calls += 1
+
+    def insert_one(self, document):
+        self.inserted_batches.append([document])
+
+    def insert_many(self, documents, ordered=True):
+        assert ordered is False
+        self.inserted_batches.append(documents)
+        errors = [{'index': i, 'code': DUPLICATE_KEY_ERROR_CODE} for i, document in enumerate(documents)
+                  if document.get('Index') in self.duplicates]
+        if len(errors) > 0:
+            raise BulkWriteError({'writeErrors': errors, 'writeConcernErrors': []})
+
+    def _find_documents(self, query) -> list:
+        documents = [document for batch in self.inserted_batches for document in batch]
+        if query == {'_id': {'$exists': False}}:
+            return []
+        return documents
+
+    def find(self, query, projection=None):
+        return MockCursor(self._find_documents(query))
+
+    def count_documents(self, query):
+        return len(self._find_documents(query))
+
+
+def get_mongo_stage_with_mock_collection(**params) -> MongoStorageStage:
+    stage = MongoStorageStage('mongo_test', use_threads=True, source='mongodb://localhost', **params)
+    collection = MockCollection()
+    stage._db = MockDatabase({stage.collection_name: collection})
+    stage._client_pid = os.getpid()
+    return stage
+
+
+def test_mongo_storage_buffered_insertion():
+    """ Check that documents are inserted by batches and index is created once """
+    stage = get_mongo_stage_with_mock_collection(buffer_size=10, index_field='Index',
+                                                 write_concern={'w': 1})
+    collection = stage.db[stage.collection_name]
+    for document_id in range(25):
+        stage.save({'Index': document_id})
+
+    assert [len(batch) for batch in collection.inserted_batches] == [10, 10]
+    assert collection.create_index_calls == 1
+    assert collection.write_concern.document == {'w': 1}
+
+    stage.close()
+    assert [len(batch) for batch in collection.inserted_batches] == [10, 10, 5]
+
+
+def test_mongo_storage_flush_by_timer():
+    stage = get_mongo_stage_with_mock_collection(buffer_size=100, flush_interval_seconds=0.1)
+    collection = stage.db[stage.collection_name]
+    stage.save([{'Index': 0}, {'Index': 1}])
+    assert len(collection.inserted_batches) == 0
+
+    time.sleep(0.5)
+    assert [len(batch) for batch in collection.inserted_batches] == [2]
+
+
+def test_mongo_storage_load_returns_lazy_cursor():
+    """ Documents must be fetched from the database only during iteration """
+    stage = get_mongo_stage_with_mock_collection()
+    stage.save([{'Index': document_id} for document_id in range(5)])
+
+    cursor = stage.load()
+    assert cursor.is_fetched is False
+    assert list(cursor) == [{'Index': document_id} for document_id in range(5)]
+
+    last_documents = stage.load(last_n=2)
+    assert last_documents.is_fetched is False
+    assert list(last_documents) == [{'Index': 3}, {'Index': 4}]
+    assert list(stage.load(last_n=10)) == [{'Index': document_id} for document_id in range(5)]
+    assert list(stage.load(last_n=0)) == []
+
+
+def test_mongo_storage_skips_duplicates_only():
+    """ Documents which violate unique index are skipped, other errors are raised """
+    stage = get_mongo_stage_with_mock_collection(index_field='Index')
+    collection = stage.db[stage.collection_name]
+    collection.duplicates = {1}
+    stage.save([{'Index': 0}, {'Index': 1}])
+
+    def insert_with_validation_error(documents, ordered=True):
+        raise BulkWriteError({'writeErrors': [{'index': 0, 'code': 121}], 'writeConcernErrors': []})
+
+    collection.insert_many = insert_with_validation_error
+    with pytest.raises(BulkWriteError):
+        stage.save([{'Index': 2}, {'Index': 3}])
+
+
+def test_mongo_stages_share_client():
+    """ Check that stages with the same connection parameters use single client """
+    registry = get_clients_registry()
+    clients_before = len(registry)
+    stages = [MongoStorageStage(f'mongo_test_{stage_id}', use_threads=True,
+                                source='mongodb://localhost:27017', max_pool_size=5)
+              for stage_id in range(3)]
+    other_stage = MongoStorageStage('mongo_test_other', use_threads=True, source='mongodb://127.0.0.1:27017')
+
+    databases = [stage.db for stage in stages + [other_stage]]
+    assert databases[0].client is databases[1].client is databases[2].client
+    assert databases[0].client is not databases[3].client
+    assert databases[0].client.options.pool_options.max_pool_size == 5
+    assert len(registry) == clients_before + 2
+
+    # Stage without client can be passed into another process
+    restored_stage = pickle.loads(pickle.dumps(stages[0]))
+    assert restored_stage._db is None
+
+    for stage in stages + [other_stage]:
+        stage.close()
+    assert len(registry) == clients_before
@@ -0,0 +1,288 @@
+import json
+import socketserver
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+import pytest
+
+from wiredflow.main.actions.action_input_mqtt import InputActionMQTT, \
+    MQTTMessagesProcessingSybAction
+from wiredflow.main.actions.assimilation.mqtt_staging import MQTTStageProxy
+from wiredflow.main.actions.assimilation.store_staging import StoreStageProxy
+from wiredflow.main.actions.stages.payload import define_payload_decoder
+from wiredflow.messages.failures_check import ExecutionStatusChecker
+from wiredflow.mocks.mqtt_broker import MQTTLoadGenerator
+from wiredflow.mocks.mqtt_server import LocalMQTTBroker, MQTT_LOCALHOST, is_topic_matched
+from wiredflow.wiredtimer.timer import WiredTimer
+
+
+class MockMQTTClient:
+    """ Client which imitate paho MQTT client without real connection """
+
+    def __init__(self):
+        self.loop_start_calls = 0
+        self.loop_stop_calls = 0
+        self.disconnect_calls = 0
+
+    def loop_start(self):
+        self.loop_start_calls += 1
+
+    def loop_stop(self):
+        self.loop_stop_calls += 1
+
+    def disconnect(self):
+        self.disconnect_calls += 1
+
+
+class MockStorage:
+    """ Storage which remember all calls of save method """
+
+    def __init__(self):
+        self.saved = []
+
+    def save(self, relevant_info, **kwargs):
+        self.saved.append(relevant_info)
+
+
+def mock_storage(relevant_info, **params):
+    return None
+
+
+def flatten_saved(storage: MockStorage) -> list:
+    """ Single messages are saved as dictionaries and batches as lists """
+    records = []
+    for saved in storage.saved:
+        records.extend(saved if isinstance(saved, list) else [saved])
+    return records
+
+
+def generate_message(payload: dict) -> mqtt.MQTTMessage:
+    message = mqtt.MQTTMessage(topic=b'/test/topic')
+    message.payload = json.dumps(payload).encode('utf-8')
+    return message
+
+
+def get_mqtt_action_with_mock_client() -> InputActionMQTT:
+    stages = [MQTTStageProxy('localhost', 1883, '/test/topic', use_threads=True),
+              StoreStageProxy(mock_storage, stage_id='mqtt_test', use_threads=True)]
+    action = InputActionMQTT('mqtt_test', stages)
+
+    def subscribe_to_broker(connector, mqtt_processing):
+        action.client = MockMQTTClient()
+    action.subscribe_to_broker = subscribe_to_broker
+    return action
+
+
+def test_mqtt_action_waits_without_busy_loop():
+    """ Check that MQTT action starts network loop once and sleeps till timeout """
+    action = get_mqtt_action_with_mock_client()
+    action.timeout_timer = WiredTimer(execution_seconds=2)
+
+    start_wall_time = time.perf_counter()
+    start_cpu_time = time.process_time()
+    action.execute_action(ExecutionStatusChecker())
+    spend_wall_time = time.perf_counter() - start_wall_time
+    spend_cpu_time = time.process_time() - start_cpu_time
+
+    assert action.client.loop_start_calls == 1
+    assert action.client.loop_stop_calls == 1
+    assert action.client.disconnect_calls == 1
+    assert 1.5 <= spend_wall_time < 3
+    assert spend_cpu_time < 0.5
+
+
+def test_mqtt_action_stop():
+    """ Check that MQTT action can be stopped before timeout """
+    action = get_mqtt_action_with_mock_client()
+    action.timeout_timer = WiredTimer(execution_seconds=None)
+    action.stop()
+
+    action.execute_action(ExecutionStatusChecker())
+    assert action.client.loop_stop_calls == 1
+
+
+def test_mqtt_messages_saved_by_batches():
+    """ Check that MQTT messages are accumulated and saved by batches """
+    storage = MockStorage()
+    mqtt_processing = MQTTMessagesProcessingSybAction(storage, '/test/topic', WiredTimer(None),
+                                                      batch_size=3)
+    mqtt_processing.start()
+    for message_id in range(0, 7):
+        mqtt_processing.add_message(generate_message({'Message id': message_id}))
+
+    # Remaining message must be saved during stop
+    mqtt_processing.stop()
+    assert len(storage.saved) == 3
+    assert [message['Message id'] for message in storage.saved[1]] == [3, 4, 5]
+    assert storage.saved[-1] == {'Message id': 6}
+
+
+def test_mqtt_messages_saved_by_flush_interval():
+    """ Check that not full batch is saved when flush interval expires """
+    storage = MockStorage()
+    mqtt_processing = MQTTMessagesProcessingSybAction(storage, '/test/topic', WiredTimer(None),
+                                                      batch_size=100, flush_interval_seconds=0.2)
+    mqtt_processing.start()
+    mqtt_processing.add_message(generate_message({'Message id': 0}))
+    mqtt_processing.add_message(generate_message({'Message id': 1}))
+    assert len(storage.saved) == 0
+
+    time.sleep(0.5)
+    assert storage.saved == [[{'Message id': 0}, {'Message id': 1}]]
+    mqtt_processing.stop()
+
+
+def test_mqtt_flush_interval_starts_with_first_message():
+    """ Message received after idle period must wait for the next ones """
+    storage = MockStorage()
+    mqtt_processing = MQTTMessagesProcessingSybAction(storage, '/test/topic', WiredTimer(None),
+                                                      batch_size=100, flush_interval_seconds=0.5)
+    mqtt_processing.start()
+    time.sleep(0.8)
+    for message_id in range(0, 5):
+        mqtt_processing.add_message(generate_message({'Message id': message_id}))
+        time.sleep(0.05)
+    assert len(storage.saved) == 0
+
+    time.sleep(0.5)
+    assert storage.saved == [[{'Message id': message_id} for message_id in range(0, 5)]]
+    mqtt_processing.stop()
+
+
+def test_mqtt_messages_dropped_when_queue_is_full():
+    """ Check backpressure policies when writer can not keep up with messages """
+    for backpressure, expected_ids in [('drop_oldest', [3, 4]), ('drop_newest', [0, 1])]:
+        storage = MockStorage()
+        # Writer is not started - messages stay in the queue
+        mqtt_processing = MQTTMessagesProcessingSybAction(storage, '/test/topic', WiredTimer(None),
+                                                          batch_size=10, queue_size=2,
+                                                          backpressure=backpressure)
+        for message_id in range(0, 5):
+            mqtt_processing.add_message(generate_message({'Message id': message_id}))
+        assert mqtt_processing.queue_depth == 2
+        assert mqtt_processing.dropped_messages == 3
+
+        mqtt_processing.start()
+        mqtt_processing.stop()
+        assert [message['Message id'] for message in storage.saved[0]] == expected_ids
+
+
+def test_mqtt_writer_failure_stops_action():
+    """ Check that exception during messages saving is raised from the action """
+    class FailedStorage:
+        def save(self, relevant_info, **kwargs):
+            raise ValueError('Storage is not available')
+
+    mqtt_processing = MQTTMessagesProcessingSybAction(FailedStorage(), '/test/topic',
+                                                      WiredTimer(None))
+    mqtt_processing.start()
+    mqtt_processing.add_message(generate_message({'Message id': 0}))
+    mqtt_processing.stop()
+    assert isinstance(mqtt_processing.failure, ValueError)
+
+
+def test_mqtt_blocked_network_thread_released_after_writer_failure():
+    """ Network thread must not wait forever for free space if writer failed """
+    is_storage_released = threading.Event()
+
+    class BlockedStorage:
+        def save(self, relevant_info, **kwargs):
+            is_storage_released.wait(10)
+            raise ValueError('Storage is not available')
+
+    mqtt_processing = MQTTMessagesProcessingSybAction(BlockedStorage(), '/test/topic',
+                                                      WiredTimer(None), queue_size=1,
+                                                      backpressure='block')
+    mqtt_processing.start()
+    # The first message is being saved, the second one fills the queue
+    for message_id in range(0, 2):
+        mqtt_processing.add_message(generate_message({'Message id': message_id}))
+    network_thread = threading.Thread(target=mqtt_processing.add_message,
+                                      args=(generate_message({'Message id': 2}),), daemon=True)
+    network_thread.start()
+    network_thread.join(0.2)
+    assert network_thread.is_alive() is True
+
+    is_storage_released.set()
+    network_thread.join(5)
+    assert network_thread.is_alive() is False
+    mqtt_processing.stop()
+    assert isinstance(mqtt_processing.failure, ValueError)
+
+
+def test_mqtt_malformed_messages_skipped():
+    """ Check that messages which can not be decoded are counted and skipped """
+    storage = MockStorage()
+    mqtt_processing = MQTTMessagesProcessingSybAction(storage, '/test/topic', WiredTimer(None),
+                                                      batch_size=3)
+    malformed_message = mqtt.MQTTMessage(topic=b'/test/topic')
+    malformed_message.payload = b'{"Message id": '
+    for message in [generate_message({'Message id': 0}), malformed_message,
+                    generate_message({'Message id': 2})]:
+        mqtt_processing.add_message(message)
+
+    mqtt_processing.start()
+    mqtt_processing.stop()
+    assert mqtt_processing.failure is None
+    assert mqtt_processing.malformed_messages == 1
+    assert storage.saved == [[{'Message id': 0}, {'Message id': 2}]]
+
+
+def test_mqtt_payload_format():
+    """ Check built-in and custom payload decoders """
+    payload = json.dumps({'Message id': 0}).encode('utf-8')
+    assert define_payload_decoder(None)(payload) == {'Message id': 0}
+    assert define_payload_decoder('raw')(payload) == payload
+    assert define_payload_decoder(lambda value: len(value))(payload) == len(payload)
+    with pytest.raises(ValueError):
+        define_payload_decoder('xml')
+
+
+def test_topic_wildcards_matching():
+    assert is_topic_matched('/demo/#', '/demo/integers/1') is True
+    assert is_topic_matched('/demo/+/1', '/demo/integers/1') is True
+    assert is_topic_matched('/demo/+', '/demo/integers/1') is False
+    assert is_topic_matched('/demo/letters', '/demo/integers') is False
+
+
+@pytest.mark.parametrize('protocol', [mqtt.MQTTv311, mqtt.MQTTv5])
+def test_mqtt_action_with_local_broker(protocol):
+    """ Check that messages from load generator are received and saved through local broker """
+    storage = MockStorage()
+    with LocalMQTTBroker(port=0) as broker:
+        stages = [MQTTStageProxy(MQTT_LOCALHOST, broker.port, '/load/#', use_threads=True,
+                                 batch_size=50, flush_interval_seconds=0.1),
+                  StoreStageProxy(mock_storage, stage_id='mqtt_broker_test', use_threads=True)]
+        action = InputActionMQTT('mqtt_broker_test', stages)
+        action.init_stages[1] = storage
+        action.timeout_timer = WiredTimer(execution_seconds=None)
+
+        subscriber = threading.Thread(target=action.execute_action, args=(ExecutionStatusChecker(),))
+        subscriber.start()
+        try:
+            assert broker.wait_for_subscriptions(1) is True
+            generator = MQTTLoadGenerator(MQTT_LOCALHOST, broker.port, rate=None, burst_size=100,
+                                          topics=5, duration_seconds=None, max_messages=1000,
+                                          protocol=protocol)
+            sending_info = generator.run()
+
+            deadline = time.monotonic() + 5
+            while len(flatten_saved(storage)) < 1000 and time.monotonic() < deadline:
+                time.sleep(0.05)
+        finally:
+            action.stop()
+            subscriber.join()
+
+    assert sending_info['published_messages'] == 1000
+    assert broker.received_messages == 1000
+    saved_indices = sorted(record['Index'] for record in flatten_saved(storage))
+    assert saved_indices == list(range(1000))
+
+
+def test_local_broker_does_not_change_tcp_server_defaults():
+    """ Options of the broker server must not affect other servers of the process """
+    with LocalMQTTBroker(port=0) as broker:
+        assert broker.server.allow_reuse_address is True
+        assert socketserver.ThreadingTCPServer.allow_reuse_address is False
+        assert socketserver.ThreadingTCPServer.daemon_threads is False
@@ -11,6 +11,7 @@ from wiredflow.main.actions.stages.http_stage import StageGetHTTPConnector, Stag
 from wiredflow.main.actions.stages.send_stage import HTTPPUTSendStage, HTTPPOSTSendStage, MQTTSendStage, CustomSendStage
 from wiredflow.main.store_engines.csv_engine.csv_db import CSVStorageStage
 from wiredflow.main.store_engines.json_engine.json_db import JSONStorageStage
+from wiredflow.main.store_engines.jsonl_engine.jsonl_db import JSONLinesStorageStage
 from wiredflow.main.store_engines.mongo_engine.mongo_db import MongoStorageStage
 from wiredflow.main.store_engines.сustom import CustomStorageStage
 
@@ -21,6 +22,7 @@ def custom_common_implementation():
 
 @pytest.mark.parametrize("storage_config, params, expected_stage",
                          [('json', {'folder_to_save': Path('./data')}, JSONStorageStage),
+                          ('jsonl', {'folder_to_save': Path('./data')}, JSONLinesStorageStage),
                           ('csv', {'folder_to_save':  Path('./data')}, CSVStorageStage),
                           ('mongo', {'source': 'mongodb://localhost'}, MongoStorageStage),
                           (custom_common_implementation, {'custom': 'value'}, CustomStorageStage)])
@@ -30,7 +32,7 @@ def test_storage_stage_proxy(storage_config: Union[str, Callable], params: dict,
     compiled_stage = proxy_stage.compile()
 
     assert isinstance(compiled_stage, expected_stage)
-    if isinstance(storage_config, str) and storage_config in ['json', 'csv']:
+    if isinstance(storage_config, str) and storage_config in ['json', 'jsonl', 'csv']:
         assert compiled_stage.db_path == params['folder_to_save']
     elif isinstance(storage_config, str) and storage_config == 'mongo':
         assert compiled_stage.source == params['source']
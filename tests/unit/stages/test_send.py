@@ -0,0 +1,327 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import paho.mqtt.client as mqtt
+import pytest
+import requests
+
+from wiredflow.main.actions.assimilation.send_staging import SendStageProxy
+from wiredflow.main.build import FlowBuilder
+from wiredflow.main.actions.stages.mqtt_publisher import get_publishers_registry
+from wiredflow.metrics.metric import get_statistics, STAGE_LAUNCHES, OUTBOX_DELIVERY_LATENCY
+from wiredflow.mocks.http_server import MockHTTPServer
+from wiredflow.mocks.mqtt_server import LocalMQTTBroker, MQTT_LOCALHOST
+
+
+class Subscriber:
+    """ Client which collect payloads of received messages """
+
+    def __init__(self, port: int, topic: str):
+        self.payloads = []
+        self.lock = threading.Lock()
+        self.client = mqtt.Client()
+        self.client.on_connect = lambda client, userdata, flags, rc: client.subscribe(topic)
+        self.client.on_message = self.on_message
+        self.client.connect(MQTT_LOCALHOST, port)
+        self.client.loop_start()
+
+    def on_message(self, client, userdata, message):
+        with self.lock:
+            self.payloads.append(message.payload)
+
+    def wait_for_payloads(self, number_of_payloads: int, timeout: float = 10):
+        deadline = time.monotonic() + timeout
+        while len(self.payloads) < number_of_payloads and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def stop(self):
+        self.client.disconnect()
+        self.client.loop_stop()
+
+
+def get_mqtt_sender(port: int, **params):
+    return SendStageProxy('mqtt', MQTT_LOCALHOST, True, port=port, topic='/test/send',
+                          label_to_send='result', **params).compile()
+
+
+@pytest.mark.parametrize('qos', [0, 1])
+def test_mqtt_sender_publishes_messages(qos: int):
+    """ Check that messages are delivered through persistent client """
+    with LocalMQTTBroker(port=0) as broker:
+        subscriber = Subscriber(broker.port, '/test/send')
+        assert broker.wait_for_subscriptions(1) is True
+
+        sender = get_mqtt_sender(broker.port, qos=qos)
+        try:
+            for i in range(5):
+                sender.send([{'result': f'message {i}'}, {'other': 'skipped'}, None])
+            publisher = sender.publisher
+            subscriber.wait_for_payloads(5)
+        finally:
+            sender.close()
+            subscriber.stop()
+
+    # Single connection is used for all launches of the stage
+    assert len(get_publishers_registry()) == 0
+    assert publisher.connected.is_set() is False
+    assert broker.received_messages == 5
+    assert len(subscriber.payloads) == 5
+
+
+def test_mqtt_senders_share_publisher():
+    """ Stages with the same destination use single connection to the broker """
+    with LocalMQTTBroker(port=0) as broker:
+        first_sender = get_mqtt_sender(broker.port)
+        second_sender = get_mqtt_sender(broker.port)
+        third_sender = get_mqtt_sender(broker.port, qos=1, max_inflight=5)
+        try:
+            assert first_sender.publisher is second_sender.publisher
+            assert first_sender.publisher is not third_sender.publisher
+            assert len(get_publishers_registry()) == 2
+
+            first_sender.close()
+            # Publisher is still used by the second stage
+            second_sender.send({'result': 'message'})
+            assert len(get_publishers_registry()) == 2
+        finally:
+            for sender in [first_sender, second_sender, third_sender]:
+                sender.close()
+
+    assert len(get_publishers_registry()) == 0
+    assert broker.received_messages == 1
+
+
+def test_mqtt_sender_acquires_publisher_once():
+    """ Concurrent first usage of the stage must not leak references to the publisher """
+    with LocalMQTTBroker(port=0) as broker:
+        sender = get_mqtt_sender(broker.port)
+        barrier = threading.Barrier(8)
+
+        def take_publisher(_):
+            barrier.wait()
+            return sender.publisher
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            publishers = list(executor.map(take_publisher, range(8)))
+        assert all(publisher is publishers[0] for publisher in publishers)
+        sender.close()
+
+    assert len(get_publishers_registry()) == 0
+
+
+def test_mqtt_sender_fails_without_broker():
+    """ Stage must raise an error if broker is unavailable """
+    sender = SendStageProxy('mqtt', MQTT_LOCALHOST, True, port=1, topic='/test/send',
+                            label_to_send='result', connect_timeout=0.5).compile()
+    try:
+        with pytest.raises(ConnectionError):
+            sender.send({'result': 'message'})
+    finally:
+        sender.close()
+
+
+def test_http_sender_sends_concurrently():
+    """ Check that items are sent simultaneously through the connections pool """
+    with MockHTTPServer(latency_seconds=0.2) as server:
+        sender = SendStageProxy('http_post', server.url, True, label_to_send='result',
+                                max_concurrency=10, pool_size=10).compile()
+        try:
+            start_time = time.perf_counter()
+            for _ in range(2):
+                sender.send([{'result': {'value': i}} for i in range(10)])
+            spend_time = time.perf_counter() - start_time
+        finally:
+            sender.close()
+        statistics = server.statistics()
+
+    # Sequential sending takes 4 seconds
+    assert spend_time < 1.5
+    assert statistics['requests'] == 20
+    # Connections are reused between launches of the stage
+    assert statistics['connections'] <= 10
+
+
+def test_http_sender_bulk_mode():
+    """ Items must be combined into JSON arrays of desired size """
+    sender = SendStageProxy('http_put', 'http://127.0.0.1', True, label_to_send='result',
+                            bulk=True, bulk_size=3).compile()
+    bodies = []
+    sender._send_request = bodies.append
+    sender.send([{'result': {'value': i}} for i in range(7)] + [{'other': 1}])
+
+    assert [json.loads(body) for body in bodies] == [[{'value': 0}, {'value': 1}, {'value': 2}],
+                                                     [{'value': 3}, {'value': 4}, {'value': 5}],
+                                                     [{'value': 6}]]
+    assert sender.headers['Content-Type'] == 'application/json'
+
+
+def test_http_sender_raises_connection_errors():
+    sender = SendStageProxy('http_put', 'http://127.0.0.1:1', True, label_to_send='result',
+                            max_concurrency=4, timeout=1).compile()
+    try:
+        with pytest.raises(requests.exceptions.ConnectionError):
+            sender.send([{'result': 'first'}, {'result': 'second'}])
+    finally:
+        sender.close()
+
+
+@pytest.mark.parametrize('max_concurrency', [1, 4])
+def test_http_sender_sends_all_items_despite_failures(max_concurrency: int):
+    """ Failed request must not prevent sending of remaining items """
+    sender = SendStageProxy('http_put', 'http://127.0.0.1', True, label_to_send='result',
+                            max_concurrency=max_concurrency).compile()
+    bodies = []
+
+    def send_request(body):
+        bodies.append(body)
+        if body == 'first':
+            raise ConnectionError('Destination is unavailable')
+
+    sender._send_request = send_request
+    try:
+        with pytest.raises(ConnectionError):
+            sender.send([{'result': 'first'}, {'result': 'second'}, {'result': 'third'}])
+    finally:
+        sender.close()
+    assert sorted(bodies) == ['first', 'second', 'third']
+
+
+def test_http_sender_creates_single_executor():
+    sender = SendStageProxy('http_put', 'http://127.0.0.1', True, label_to_send='result',
+                            max_concurrency=4).compile()
+    barrier = threading.Barrier(8)
+
+    def take_executor(_):
+        barrier.wait()
+        return sender.executor
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        executors = list(executor.map(take_executor, range(8)))
+    assert all(sender_executor is executors[0] for sender_executor in executors)
+    sender.close()
+
+
+def test_outbox_does_not_block_pipeline():
+    """ Slow sender must not delay the pipeline if outbox is enabled """
+    delivered = []
+
+    def get_data(**params):
+        return {'value': 1}
+
+    def slow_send(data_to_send, **params):
+        time.sleep(0.2)
+        delivered.append(data_to_send)
+
+    flow_builder = FlowBuilder()
+    pipeline = flow_builder.add_pipeline('outbox_pipeline') \
+        .with_http_connector(get_data) \
+        .send(slow_send, outbox=True, outbox_workers=2)
+    pipeline.create_action()
+
+    start_time = time.perf_counter()
+    for _ in range(4):
+        pipeline.action.perform_action()
+    spend_time = time.perf_counter() - start_time
+    pipeline.action.close_stages()
+
+    assert spend_time < 0.2
+    assert len(delivered) == 4
+    snapshot = get_statistics().snapshot()
+    launches = [metric for metric in snapshot['counters'] if metric['name'] == STAGE_LAUNCHES and
+                metric['labels'] == {'pipeline': 'outbox_pipeline', 'stage': '1_slow_send_delivery'}]
+    assert launches[0]['value'] == 4
+    latency = [metric for metric in snapshot['histograms'] if metric['name'] == OUTBOX_DELIVERY_LATENCY and
+               metric['labels']['pipeline'] == 'outbox_pipeline']
+    assert latency[0]['value']['count'] == 4
+
+
+def test_outbox_spills_items_to_disk(tmp_path):
+    """ Items which do not fit into the queue are saved on disk and delivered later """
+    delivered = []
+    is_destination_available = threading.Event()
+
+    def blocked_send(data_to_send, **params):
+        is_destination_available.wait(10)
+        delivered.append(data_to_send['value'])
+
+    outbox = SendStageProxy(blocked_send, None, True, outbox=True, outbox_size=2,
+                            spill_directory=str(tmp_path)).compile()
+    for i in range(10):
+        outbox.send({'value': i})
+    # One item is being delivered, two are waiting in the queue
+    assert outbox.spilled_items >= 7
+    assert len(list(tmp_path.iterdir())) == 1
+
+    is_destination_available.set()
+    outbox.close()
+    assert sorted(delivered) == list(range(10))
+    assert len(list(tmp_path.iterdir())) == 0
+
+
+def test_outbox_isolates_delivery_failures():
+    def failed_send(data_to_send, **params):
+        raise ConnectionError('Destination is unavailable')
+
+    outbox = SendStageProxy(failed_send, None, True, outbox=True).compile()
+    outbox.send({'value': 1})
+    outbox.send({'value': 2})
+    outbox.close()
+
+    assert outbox.failed_deliveries == 2
+    assert outbox.delivered_items == 0
+
+
+def test_consecutive_senders_launched_simultaneously():
+    """ Duration of the pipeline launch is defined by the slowest sender """
+    delivered = []
+
+    def get_data(**params):
+        return {'value': 1}
+
+    def first_send(data_to_send, **params):
+        time.sleep(0.3)
+        delivered.append('first')
+
+    def second_send(data_to_send, **params):
+        time.sleep(0.3)
+        delivered.append('second')
+
+    def failed_send(data_to_send, **params):
+        raise ConnectionError('Destination is unavailable')
+
+    flow_builder = FlowBuilder()
+    pipeline = flow_builder.add_pipeline('parallel_senders_pipeline', parallel_senders=True) \
+        .with_http_connector(get_data) \
+        .send(first_send) \
+        .send(failed_send) \
+        .send(second_send)
+    pipeline.create_action()
+    assert [stage_id for stage_id, _ in pipeline.action.stage_groups] == [0, 1]
+
+    start_time = time.perf_counter()
+    with pytest.raises(ConnectionError):
+        pipeline.action.perform_action()
+    spend_time = time.perf_counter() - start_time
+    pipeline.action.close_stages()
+
+    # Failure of one sender does not prevent others from sending
+    assert sorted(delivered) == ['first', 'second']
+    assert spend_time < 0.55
+
+
+def test_senders_launched_sequentially_by_default():
+    def get_data(**params):
+        return {'value': 1}
+
+    def send_data(data_to_send, **params):
+        return None
+
+    flow_builder = FlowBuilder()
+    pipeline = flow_builder.add_pipeline('sequential_senders_pipeline') \
+        .with_http_connector(get_data) \
+        .send(send_data) \
+        .send(send_data)
+    pipeline.create_action()
+    assert [stage_id for stage_id, _ in pipeline.action.stage_groups] == [0, 1, 2]
@@ -1,11 +1,20 @@
+import io
 import json
+import os
+import time
+from datetime import datetime
+from multiprocessing import Process
 from pathlib import Path
-from typing import Union
+from typing import Union, Any, Iterator
 
 import pytest
 
+from wiredflow.main.actions.assimilation.store_staging import StoreStageProxy
 from wiredflow.main.store_engines.csv_engine.csv_db import CSVStorageStage
 from wiredflow.main.store_engines.json_engine.json_db import JSONStorageStage
+from wiredflow.main.store_engines.jsonl_engine.jsonl_db import JSONLinesStorageStage
+from wiredflow.main.store_engines.memory_engine.memory_db import MemoryStorageStage
+from wiredflow.main.store_engines.preprocessors.streaming import iterate_json_items
 from wiredflow.paths import get_test_folder_path, remove_folder_with_files
 
 
@@ -98,3 +107,218 @@ def test_initialization_csv_file():
 
     # Remove folder with files
     remove_folder_with_files(path_to_save_files)
+
+
+@pytest.mark.parametrize("mapping, number_of_documents",
+                         [('extend', 4),
+                          ('overwrite', 2)])
+def test_jsonl_storage_append_only(mapping: str, number_of_documents: int):
+    """ Check that JSON Lines storage appends records line by line """
+    path_to_save_files = Path(get_test_folder_path(), 'jsonl_storage_test')
+    remove_folder_with_files(path_to_save_files)
+
+    storage_stage = JSONLinesStorageStage(stage_id='jsonl_storage_test', use_threads=True,
+                                          **{'folder_to_save': path_to_save_files, 'mapping': mapping})
+
+    storage_stage.save({'Item': 1})
+    storage_stage.save({'Item': 2})
+    storage_stage.save([{'Item': 3}, {'Item': 4}])
+
+    created_file = Path(path_to_save_files, 'jsonl_storage_test.jsonl')
+    assert created_file.is_file()
+    with open(created_file, 'r') as fp:
+        lines = fp.readlines()
+    assert len(lines) == number_of_documents
+    assert json.loads(lines[-1])['Item'] == 4
+
+    loaded_data = storage_stage.load()
+    assert len(loaded_data) == number_of_documents
+    assert loaded_data[-1]['Item'] == 4
+
+    remove_folder_with_files(path_to_save_files)
+
+
+@pytest.mark.parametrize("storage_class, extension",
+                         [(JSONStorageStage, 'json'),
+                          (JSONLinesStorageStage, 'jsonl'),
+                          (CSVStorageStage, 'csv')])
+def test_file_storages_streaming_load(storage_class: Any, extension: str):
+    """ Check that file storages are able to return records lazily """
+    path_to_save_files = Path(get_test_folder_path(), f'{extension}_streaming_test')
+    remove_folder_with_files(path_to_save_files)
+
+    storage_stage = storage_class(stage_id='streaming_test', use_threads=True,
+                                  **{'folder_to_save': path_to_save_files})
+    assert storage_stage.load(stream=True) is None
+
+    storage_stage.save([{'Item': item_id} for item_id in range(0, 7)])
+
+    records = storage_stage.load(stream=True)
+    assert isinstance(records, Iterator)
+    assert [int(record['Item']) for record in records] == list(range(0, 7))
+
+    batches = list(storage_stage.load(stream=True, batch_size=3))
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+
+    remove_folder_with_files(path_to_save_files)
+
+
+@pytest.mark.skipif(os.path.isdir('/proc/self/fd') is False, reason='list of opened files is not available')
+@pytest.mark.parametrize("storage_class", [JSONStorageStage, JSONLinesStorageStage, CSVStorageStage])
+def test_file_storages_streaming_load_does_not_leak_files(storage_class: Any):
+    """ File is opened only during iteration and closed when generator is closed """
+    path_to_save_files = Path(get_test_folder_path(), 'streaming_files_test')
+    remove_folder_with_files(path_to_save_files)
+
+    storage_stage = storage_class(stage_id='streaming_files_test', use_threads=True,
+                                  **{'folder_to_save': path_to_save_files})
+    storage_stage.save([{'Item': item_id} for item_id in range(0, 7)])
+
+    opened_files = len(os.listdir('/proc/self/fd'))
+    records = storage_stage.load(stream=True, batch_size=2)
+    assert len(os.listdir('/proc/self/fd')) == opened_files
+
+    assert [int(record['Item']) for record in next(records)] == [0, 1]
+    assert len(os.listdir('/proc/self/fd')) == opened_files + 1
+    records.close()
+    assert len(os.listdir('/proc/self/fd')) == opened_files
+
+    remove_folder_with_files(path_to_save_files)
+
+
+def test_json_items_incremental_decoding():
+    """ Check that JSON array is decoded correctly when read by small chunks """
+    data = [{'Item': item_id, 'Label': 'a' * item_id} for item_id in range(0, 20)] + [12345, 'text', None]
+    items = list(iterate_json_items(io.StringIO(json.dumps(data)), chunk_size=7))
+    assert items == data
+
+    assert list(iterate_json_items(io.StringIO(json.dumps({'Key': 'value'})), chunk_size=3)) == [{'Key': 'value'}]
+    assert list(iterate_json_items(io.StringIO(''))) == []
+
+
+@pytest.mark.parametrize("storage_class", [JSONStorageStage, JSONLinesStorageStage, CSVStorageStage])
+def test_file_storages_windowed_load(storage_class: Any):
+    """ Check that file storages return only requested part of records """
+    path_to_save_files = Path(get_test_folder_path(), 'window_test')
+    remove_folder_with_files(path_to_save_files)
+
+    storage_stage = storage_class(stage_id='window_test', use_threads=True,
+                                  **{'folder_to_save': path_to_save_files})
+    storage_stage.save([{'Item': item_id, 'Parity': item_id % 2} for item_id in range(0, 5)])
+    time.sleep(0.05)
+    moment_between_saves = datetime.now()
+    time.sleep(0.05)
+    storage_stage.save([{'Item': item_id, 'Parity': item_id % 2} for item_id in range(5, 8)])
+
+    def items(records) -> list:
+        return [int(record['Item']) for record in records]
+
+    assert items(storage_stage.load(last_n=3)) == [5, 6, 7]
+    assert items(storage_stage.load(last_n=100)) == list(range(0, 8))
+    assert items(storage_stage.load(since=moment_between_saves)) == [5, 6, 7]
+    assert items(storage_stage.load(since=moment_between_saves, last_n=2)) == [6, 7]
+    assert items(storage_stage.load(since=time.time() + 60)) == []
+    assert items(storage_stage.load(where=lambda record: int(record['Item']) > 5)) == [6, 7]
+    assert items(storage_stage.load(where=lambda record: int(record['Parity']) == 0, last_n=2)) == [4, 6]
+    assert items(storage_stage.load(last_n=2, stream=True)) == [6, 7]
+
+    remove_folder_with_files(path_to_save_files)
+
+
+@pytest.mark.parametrize("storage_class", [JSONStorageStage, JSONLinesStorageStage, CSVStorageStage])
+def test_file_storages_windowed_load_without_index(storage_class: Any):
+    """ Storage file without index (created by previous versions) """
+    path_to_save_files = Path(get_test_folder_path(), 'window_without_index_test')
+    remove_folder_with_files(path_to_save_files)
+
+    storage_stage = storage_class(stage_id='window_without_index_test', use_threads=True,
+                                  **{'folder_to_save': path_to_save_files})
+    storage_stage.save([{'Item': item_id} for item_id in range(0, 5)])
+    storage_stage.index.remove()
+
+    def items(records) -> list:
+        return [int(record['Item']) for record in records]
+
+    # Records are found by full scan, but saving time is unknown
+    assert items(storage_stage.load(last_n=2)) == [3, 4]
+    assert items(storage_stage.load(last_n=2, stream=True)) == [3, 4]
+    with pytest.raises(ValueError):
+        storage_stage.load(since=0)
+
+    # Records which were saved without index are considered as old ones
+    moment_before_save = datetime.now()
+    storage_stage.save([{'Item': 5}])
+    assert items(storage_stage.load(since=0)) == list(range(0, 6))
+    assert items(storage_stage.load(since=moment_before_save)) == [5]
+
+    remove_folder_with_files(path_to_save_files)
+
+
+def test_json_windowed_load_after_mapping():
+    """ Check that index of JSON storage is consistent with extend mapping """
+    path_to_save_files = Path(get_test_folder_path(), 'json_window_mapping_test')
+    remove_folder_with_files(path_to_save_files)
+
+    storage_stage = JSONStorageStage(stage_id='json_window_mapping_test', use_threads=True,
+                                     **{'folder_to_save': path_to_save_files})
+    for item_id in range(0, 4):
+        storage_stage.save({'Item': item_id})
+
+    assert storage_stage.load(where={'Item': 2}) == [{'Item': 2}]
+    assert storage_stage.load(last_n=1) == [{'Item': 3}]
+    assert len(storage_stage.load()) == 4
+
+    remove_folder_with_files(path_to_save_files)
+
+
+def save_into_memory_storage(storage_stage: MemoryStorageStage):
+    storage_stage.save([{'Item': item_id} for item_id in range(0, 5)])
+    storage_stage.close()
+
+
+@pytest.mark.parametrize("use_threads", [True, False])
+def test_memory_storage_ring_buffer(use_threads: bool):
+    """ Check that memory storage keeps only last records and supports windows """
+    storage_stage = MemoryStorageStage(stage_id='memory_test', use_threads=use_threads, capacity=5)
+    assert storage_stage.load() is None
+
+    storage_stage.save([{'Item': item_id, 'Parity': item_id % 2} for item_id in range(0, 4)])
+    time.sleep(0.05)
+    moment_between_saves = datetime.now()
+    time.sleep(0.05)
+    storage_stage.save([{'Item': item_id, 'Parity': item_id % 2} for item_id in range(4, 8)])
+
+    def items(records) -> list:
+        return [record['Item'] for record in records]
+
+    # The oldest records were replaced
+    assert items(storage_stage.load()) == [3, 4, 5, 6, 7]
+    assert items(storage_stage.load(last_n=2)) == [6, 7]
+    assert items(storage_stage.load(since=moment_between_saves)) == [4, 5, 6, 7]
+    assert items(storage_stage.load(since=moment_between_saves, last_n=2)) == [6, 7]
+    assert items(storage_stage.load(where={'Parity': 1}, last_n=2)) == [5, 7]
+    assert [items(batch) for batch in storage_stage.load(stream=True, batch_size=2)] == [[3, 4], [5, 6], [7]]
+
+    overwritten_stage = MemoryStorageStage(stage_id='memory_test', use_threads=use_threads,
+                                           mapping='overwrite')
+    overwritten_stage.save({'Item': 1})
+    overwritten_stage.save({'Item': 2})
+    assert overwritten_stage.load() == [{'Item': 2}]
+
+    for stage in [storage_stage, overwritten_stage]:
+        stage.close()
+
+
+def test_memory_storage_shared_between_processes():
+    """ Records saved in another process must be available in shared memory """
+    storage_stage = StoreStageProxy('memory', 'memory_process_test', False, capacity=10,
+                                    slot_size=128).compile()
+    process = Process(target=save_into_memory_storage, args=(storage_stage,))
+    process.start()
+    process.join()
+
+    assert storage_stage.load() == [{'Item': item_id} for item_id in range(0, 5)]
+    with pytest.raises(ValueError):
+        storage_stage.save({'Item': 'a' * 200})
+    assert len(storage_stage.load()) == 5
+    storage_stage.buffer.unlink()
@@ -0,0 +1,43 @@
+import json
+
+from wiredflow.benchmarks.__main__ import parse_params
+from wiredflow.benchmarks.scenarios import benchmark_storage_growth, benchmark_core_fan_out, \
+    benchmark_mqtt_burst
+
+
+def check_report_structure(report: dict):
+    for field in ['elapsed_seconds', 'throughput_per_second', 'cpu_seconds', 'max_rss_mb', 'stages']:
+        assert field in report
+    # Report must be serializable
+    json.dumps(report)
+
+
+def test_storage_growth_benchmark():
+    report = benchmark_storage_growth('jsonl', records=1000, batch_size=100)
+
+    check_report_structure(report)
+    assert report['processed_records'] == 1000
+    assert report['loaded_records'] == 1000
+    assert report['stages']['1_JSONLinesStorageStage']['launches'] == 10
+    assert report['stages']['1_JSONLinesStorageStage']['p99_seconds'] is not None
+
+
+def test_core_fan_out_benchmark():
+    report = benchmark_core_fan_out(fan_out=20, launches=2, max_concurrency=4, work_seconds=0.001)
+
+    check_report_structure(report)
+    assert report['processed_records'] == 40
+    assert report['stages']['0_fan_out_results']['launches'] == 40
+
+
+def test_mqtt_burst_benchmark():
+    report = benchmark_mqtt_burst(messages=500, burst_size=100, batch_size=50, storage=None)
+
+    check_report_structure(report)
+    assert report['processed_records'] == 500
+    assert report['dropped_messages'] == 0
+
+
+def test_benchmark_params_parsing():
+    params = parse_params(['pipelines=8', 'mode=scheduler', 'storage=null', 'duration_seconds=2.5'])
+    assert params == {'pipelines': 8, 'mode': 'scheduler', 'storage': None, 'duration_seconds': 2.5}
@@ -0,0 +1,189 @@
+import datetime
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from wiredflow.main.build import FlowBuilder
+from wiredflow.schedule import Scheduler
+from wiredflow.settings import ASYNC_EXECUTOR_WORKERS
+from wiredflow.wiredtimer.cron import CronSchedule
+
+
+def test_flow_asyncio_mode():
+    """ Check that all pipelines are launched as coroutines in single event loop """
+    launches = Counter()
+    threads_during_launches = []
+    lock = threading.Lock()
+
+    def get_data(**params):
+        return {'Pipeline': params['pipeline_name']}
+
+    def save_data(relevant_info, **params):
+        with lock:
+            launches[relevant_info['Pipeline']] += 1
+            threads_during_launches.append(threading.active_count())
+
+    flow_builder = FlowBuilder(mode='asyncio')
+    for pipeline_id in range(0, 50):
+        flow_builder.add_pipeline(f'pipeline_{pipeline_id}', timedelta_seconds=1) \
+            .with_http_connector(get_data) \
+            .with_storage(save_data)
+
+    threads_before_launch = threading.active_count()
+    flow = flow_builder.build()
+    flow.launch_flow(execution_seconds=3)
+
+    assert len(launches) == 50
+    assert all(number_of_launches >= 2 for number_of_launches in launches.values())
+    # Pipelines do not own threads: blocking stages share the pool of the event loop
+    assert max(threads_during_launches) <= threads_before_launch + ASYNC_EXECUTOR_WORKERS
+
+
+def test_flow_scheduler_mode():
+    """ Check that central scheduler launches all pipelines using small pool of workers """
+    launches = Counter()
+    lock = threading.Lock()
+
+    def get_data(**params):
+        return {'Pipeline': params['pipeline_name']}
+
+    def save_data(relevant_info, **params):
+        with lock:
+            launches[relevant_info['Pipeline']] += 1
+
+    flow_builder = FlowBuilder(mode='scheduler', max_workers=4)
+    for pipeline_id in range(0, 100):
+        flow_builder.add_pipeline(f'pipeline_{pipeline_id}', timedelta_seconds=1) \
+            .with_http_connector(get_data) \
+            .with_storage(save_data)
+
+    flow = flow_builder.build()
+    flow.launch_flow(execution_seconds=2.5)
+
+    assert len(launches) == 100
+    # Launches at 0, 1 and 2 seconds
+    assert all(number_of_launches == 3 for number_of_launches in launches.values())
+
+
+def test_scheduler_next_launch():
+    """ Check deadlines of launches for fixed rate and fixed delay modes """
+    fixed_rate = Scheduler(lambda: None, 10, None, 'fixed_rate')
+    # The launch took 3 seconds - schedule does not drift
+    current_launch = time.monotonic() - 3
+    assert fixed_rate.define_next_launch((current_launch, None)) == current_launch + 10
+    # The launch took 25 seconds - missed launches are skipped
+    current_launch = time.monotonic() - 25
+    assert fixed_rate.define_next_launch((current_launch, None)) == current_launch + 30
+    assert fixed_rate.skipped_runs == 2
+
+    fixed_delay = Scheduler(lambda: None, 10, None, 'fixed_delay')
+    current_launch = time.monotonic() - 3
+    assert fixed_delay.define_next_launch((current_launch, None)) >= current_launch + 13
+
+
+@pytest.mark.parametrize('overlap_policy, expected_launches',
+                         [('skip_if_running', [0, 30]),
+                          ('coalesce_missed', [0, 25, 30]),
+                          ('catch_up', [0, 25, 25, 30])])
+def test_scheduler_overlap_policy(overlap_policy, expected_launches):
+    """ Check launches when the first launch took 25 seconds and period is 10 seconds """
+    clock = {'time': 0.0}
+    launches = []
+
+    def function_to_launch():
+        launches.append(clock['time'])
+        if clock['time'] == 0:
+            clock['time'] = 25
+
+    scheduler = Scheduler(function_to_launch, 10, None, overlap_policy=overlap_policy)
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(time, 'monotonic', lambda: clock['time'])
+        scheduler.slot = (0.0, None)
+        scheduler.next_launch = 0.0
+        while clock['time'] <= 30:
+            scheduler.run()
+            if scheduler.seconds_to_next_launch() > 0:
+                clock['time'] += scheduler.seconds_to_next_launch()
+
+    assert launches == expected_launches
+
+
+def test_scheduler_allow_overlap():
+    """ Check that launches are performed simultaneously but not more than allowed """
+    release = threading.Event()
+    scheduler = Scheduler(release.wait, 10, None, overlap_policy='allow_overlap',
+                          max_overlapping_runs=2)
+    for _ in range(0, 3):
+        scheduler.launch()
+    release.set()
+    scheduler.close()
+
+    assert scheduler.overlapping_runs == 1
+    assert scheduler.skipped_runs == 1
+
+
+def test_stages_closed_after_background_launches():
+    """ Launch which is still in progress must not use already closed stages """
+    events = []
+
+    def get_data(**params):
+        return {'value': 1}
+
+    def slow_send(data_to_send, **params):
+        time.sleep(0.5)
+        events.append('send')
+
+    flow_builder = FlowBuilder()
+    pipeline = flow_builder.add_pipeline('overlapping_pipeline', overlap_policy='allow_overlap') \
+        .with_http_connector(get_data) \
+        .send(slow_send)
+    pipeline.create_action()
+    pipeline.action.init_stages[-1].close = lambda: events.append('close')
+    scheduler = pipeline.action.create_scheduler()
+    scheduler.launch()
+    pipeline.action.close_stages()
+
+    assert events == ['send', 'close']
+
+
+def test_cron_next_fire_time():
+    """ Check that time of the next launch is defined correctly for different formats """
+    timezone = datetime.timezone.utc
+    # Wednesday
+    current_time = datetime.datetime(2023, 5, 10, 14, 3, 20, tzinfo=timezone)
+
+    schedule = CronSchedule('*/5 * * * *', timezone)
+    assert schedule.next_fire_time(current_time) == datetime.datetime(2023, 5, 10, 14, 5, tzinfo=timezone)
+
+    for launch_time in ['every day 02:00', '02:00', '0 2 * * *']:
+        schedule = CronSchedule(launch_time, timezone)
+        assert schedule.next_fire_time(current_time) == datetime.datetime(2023, 5, 11, 2, 0, tzinfo=timezone)
+
+    schedule = CronSchedule('every monday 09:30', timezone)
+    assert schedule.next_fire_time(current_time) == datetime.datetime(2023, 5, 15, 9, 30, tzinfo=timezone)
+
+    schedule = CronSchedule('0 0 1 */3 *', timezone)
+    assert schedule.next_fire_time(current_time) == datetime.datetime(2023, 7, 1, 0, 0, tzinfo=timezone)
+
+    # Launch is not repeated in the same minute
+    fire_time = datetime.datetime(2023, 5, 10, 14, 5, tzinfo=timezone)
+    assert CronSchedule('*/5 * * * *', timezone).next_fire_time(fire_time) == \
+           datetime.datetime(2023, 5, 10, 14, 10, tzinfo=timezone)
+
+    with pytest.raises(ValueError):
+        CronSchedule('every year 02:00')
+    with pytest.raises(ValueError):
+        CronSchedule('61 * * * *')
+
+
+def test_scheduler_with_launch_time():
+    """ Check that the first launch is not performed immediately if launch time defined """
+    scheduler = Scheduler(lambda: None, 10, '* * * * *')
+    assert 0 < scheduler.seconds_to_next_launch() <= 60
+
+
+def test_flow_unknown_mode():
+    with pytest.raises(ValueError):
+        FlowBuilder(mode='greenlets')
@@ -0,0 +1,109 @@
+import pytest
+import requests
+
+from wiredflow.main.build import FlowBuilder
+from wiredflow.metrics.exporter import MetricsExporter, MetricsAggregator, MetricsPublisher, format_prometheus
+from wiredflow.metrics.metric import Statistics, Histogram, get_statistics, STAGE_DURATION, \
+    STAGE_LAUNCHES, STAGE_ERRORS
+
+
+def find_metric(metrics, name: str, **labels):
+    for metric in metrics:
+        if metric['name'] == name and all(metric['labels'].get(key) == value for key, value in labels.items()):
+            return metric
+    return None
+
+
+def test_histogram_quantile():
+    histogram = Histogram(buckets=(1, 2, 3, 4))
+    for value in [0.5] * 50 + [3.5] * 50:
+        histogram.observe(value)
+
+    assert histogram.count == 100
+    assert histogram.quantile(0.25) == pytest.approx(0.5)
+    assert histogram.quantile(0.99) == pytest.approx(3.98)
+
+
+def test_histogram_quantile_for_fast_stages():
+    """ Default buckets must distinguish latencies below one millisecond """
+    histogram = Histogram()
+    for value in [0.0002] * 90 + [0.002] * 10:
+        histogram.observe(value)
+
+    assert histogram.quantile(0.5) < 0.00025
+    assert 0.001 < histogram.quantile(0.99) <= 0.0025
+
+
+def test_statistics_snapshot_and_merge():
+    """ Check that snapshots from several registries are combined correctly """
+    first, second = Statistics(), Statistics()
+    for statistics in [first, second]:
+        statistics.record_stage('pipeline', 'stage', 0.2, number_of_records=10)
+        statistics.record_stage('pipeline', 'stage', 0.3, is_failed=True)
+
+    first.merge(second.snapshot())
+    snapshot = first.snapshot()
+    assert find_metric(snapshot['counters'], STAGE_LAUNCHES, stage='stage')['value'] == 4
+    assert find_metric(snapshot['counters'], STAGE_ERRORS, stage='stage')['value'] == 2
+    assert find_metric(snapshot['histograms'], STAGE_DURATION, stage='stage')['value']['count'] == 4
+
+
+def test_stages_metrics_collected():
+    """ Check that duration of each stage launch is saved into metrics """
+    def get_data(**params):
+        return [{'Value': 1}, {'Value': 2}]
+
+    def save_data(relevant_info, **params):
+        return None
+
+    flow_builder = FlowBuilder()
+    pipeline = flow_builder.add_pipeline('metrics_pipeline') \
+        .with_http_connector(get_data) \
+        .with_storage(save_data)
+    pipeline.create_action()
+    pipeline.action.perform_action()
+    pipeline.action.perform_action()
+
+    snapshot = get_statistics().snapshot()
+    launches = find_metric(snapshot['counters'], STAGE_LAUNCHES, pipeline='metrics_pipeline', stage='0_get_data')
+    assert launches['value'] == 2
+    duration = find_metric(snapshot['histograms'], STAGE_DURATION, pipeline='metrics_pipeline',
+                           stage='1_save_data')
+    assert duration['value']['count'] == 2
+
+
+def test_prometheus_format():
+    statistics = Statistics()
+    statistics.record_stage('pipeline', 'stage', 0.02, number_of_records=5)
+    statistics.set_gauge('wiredflow_queue_depth', 3, pipeline='pipeline')
+
+    text = format_prometheus(statistics.snapshot())
+    assert '# TYPE wiredflow_stage_launches_total counter' in text
+    assert 'wiredflow_stage_launches_total{pipeline="pipeline",stage="stage"} 1.0' in text
+    assert 'wiredflow_queue_depth{pipeline="pipeline"} 3.0' in text
+    assert 'wiredflow_stage_duration_seconds_bucket{pipeline="pipeline",stage="stage",le="0.01"} 0' in text
+    assert 'wiredflow_stage_duration_seconds_bucket{pipeline="pipeline",stage="stage",le="0.025"} 1' in text
+    assert 'wiredflow_stage_duration_seconds_bucket{pipeline="pipeline",stage="stage",le="+Inf"} 1' in text
+    assert 'wiredflow_stage_duration_seconds_count{pipeline="pipeline",stage="stage"} 1' in text
+
+
+def test_metrics_exporter_with_aggregator():
+    """ Check that metrics sent by processes are available via HTTP endpoint """
+    aggregator = MetricsAggregator()
+    get_statistics().record_stage('exported_pipeline', 'stage', 0.1)
+    publisher = MetricsPublisher(aggregator, push_seconds=60)
+    publisher.start()
+    publisher.stop()
+
+    exporter = MetricsExporter(0, host='127.0.0.1', snapshot_provider=aggregator.snapshot)
+    exporter.start()
+    try:
+        response = requests.get(f'http://127.0.0.1:{exporter.port}/metrics', timeout=5)
+        missing_response = requests.get(f'http://127.0.0.1:{exporter.port}/other', timeout=5)
+    finally:
+        exporter.stop()
+
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/plain')
+    assert 'pipeline="exported_pipeline"' in response.text
+    assert missing_response.status_code == 404
@@ -0,0 +1,73 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from wiredflow.main.registry import SharedResourcesRegistry
+
+
+class Resource:
+    def __init__(self, name: str, size: int = 1):
+        self.name = name
+        self.size = size
+        self.is_closed = False
+
+    def close(self):
+        self.is_closed = True
+
+
+def get_registry() -> SharedResourcesRegistry:
+    return SharedResourcesRegistry(Resource, lambda resource: resource.close())
+
+
+def test_registry_shares_resources_by_parameters():
+    """ Resource is created once for each set of parameters and closed after the last release """
+    registry = get_registry()
+    first = registry.acquire('first', size=2)
+    assert registry.acquire('first', size=2) is first
+    assert registry.acquire('first', size=3) is not first
+    assert len(registry) == 2
+
+    registry.release('first', size=2)
+    assert first.is_closed is False
+    registry.release('first', size=2)
+    assert first.is_closed is True
+    # Release of unknown resource is ignored
+    registry.release('first', size=2)
+    assert len(registry) == 1
+
+
+def test_registry_concurrent_acquire():
+    registry = get_registry()
+    barrier = threading.Barrier(8)
+
+    def acquire(_):
+        barrier.wait()
+        return registry.acquire('shared')
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        resources = list(executor.map(acquire, range(8)))
+
+    assert all(resource is resources[0] for resource in resources)
+    for _ in range(7):
+        registry.release('shared')
+    assert resources[0].is_closed is False
+    registry.release('shared')
+    assert resources[0].is_closed is True
+
+
+@pytest.mark.skipif(hasattr(os, 'fork') is False, reason='fork is not supported')
+def test_registry_is_empty_in_child_process():
+    """ Resources of the parent must not be used or closed in the child process """
+    registry = get_registry()
+    resource = registry.acquire('parent')
+
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0 if len(registry) == 0 else 1)
+    _, status = os.waitpid(pid, 0)
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert len(registry) == 1
+    assert resource.is_closed is False
@@ -0,0 +1,47 @@
+import argparse
+import json
+import sys
+
+from loguru import logger
+
+from wiredflow.benchmarks.scenarios import scenario_by_name
+
+
+def parse_params(params: list) -> dict:
+    """ Convert parameters in form "name=value" into dictionary """
+    parsed_params = {}
+    for param in params:
+        name, value = param.split('=', 1)
+        try:
+            parsed_params[name] = json.loads(value)
+        except json.JSONDecodeError:
+            # Strings can be passed without quotes
+            parsed_params[name] = value
+    return parsed_params
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m wiredflow.benchmarks',
+                                     description='Launch benchmark scenario and print report in JSON format')
+    parser.add_argument('scenario', choices=list(scenario_by_name.keys()))
+    parser.add_argument('params', nargs='*', help='parameters of scenario in form name=value, '
+                                                  'for example pipelines=8')
+    parser.add_argument('--output', help='path to file to save report. If not defined - report is printed')
+    parser.add_argument('--log-level', default='WARNING',
+                        help='level of logs. Debug messages affect the results, so default is WARNING')
+    arguments = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level=arguments.log_level)
+
+    report = scenario_by_name[arguments.scenario](**parse_params(arguments.params))
+    report = json.dumps(report, indent=2)
+    if arguments.output is None:
+        print(report)
+    else:
+        with open(arguments.output, 'w') as fp:
+            fp.write(report)
+
+
+if __name__ == '__main__':
+    main()
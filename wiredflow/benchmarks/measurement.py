@@ -0,0 +1,151 @@
+import os
+import resource
+import time
+from typing import Dict, Union, Iterable
+
+from wiredflow.metrics.metric import Statistics, get_statistics, estimate_quantile, \
+    STAGE_DURATION, STAGE_LAUNCHES, STAGE_ERRORS, STAGE_PAYLOAD_RECORDS
+
+
+class BenchmarkMeasurement:
+    """
+    Measure resources consumed by the current process (and its finished child
+    processes) during benchmark scenario execution and combine them with
+    metrics of stages into machine-readable report
+
+    :param scenario: name of scenario
+    :param params: parameters of scenario to save into report
+    """
+
+    def __init__(self, scenario: str, params: Dict):
+        self.scenario = scenario
+        self.params = params
+
+        self.start_time = None
+        self.finish_time = None
+        self.start_cpu_seconds = None
+        self.finish_cpu_seconds = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        self.start_cpu_seconds = _cpu_seconds()
+        self.start_time = time.perf_counter()
+
+    def stop(self):
+        self.finish_time = time.perf_counter()
+        self.finish_cpu_seconds = _cpu_seconds()
+
+    @property
+    def elapsed_seconds(self) -> float:
+        finish_time = time.perf_counter() if self.finish_time is None else self.finish_time
+        return finish_time - self.start_time
+
+    def report(self, pipeline_names: Iterable[str], processed_records: Union[int, None] = None,
+               throughput_stage: Union[str, None] = None,
+               additional_info: Union[Dict, None] = None) -> Dict:
+        """
+        Prepare report with throughput, latency of stages and consumed resources
+
+        :param pipeline_names: names of pipelines which metrics must be
+        included into report
+        :param processed_records: number of records (requests, messages)
+        processed during scenario execution
+        :param throughput_stage: if number of records is not defined - it is
+        calculated as number of successful launches of stages with this name
+        :param additional_info: scenario specific values
+        """
+        stages = collect_stages_statistics(get_statistics(), pipeline_names)
+        if processed_records is None:
+            processed_records = sum(stage['launches'] - stage['errors'] for name, stage in stages.items()
+                                    if name.endswith(throughput_stage))
+
+        elapsed_seconds = self.elapsed_seconds
+        cpu_seconds = self.finish_cpu_seconds - self.start_cpu_seconds
+        report = {'scenario': self.scenario,
+                  'params': self.params,
+                  'elapsed_seconds': elapsed_seconds,
+                  'processed_records': processed_records,
+                  'throughput_per_second': processed_records / elapsed_seconds if elapsed_seconds > 0 else None,
+                  'stages': stages,
+                  'cpu_seconds': cpu_seconds,
+                  'cpu_percent': 100 * cpu_seconds / elapsed_seconds if elapsed_seconds > 0 else None,
+                  'rss_mb': current_rss_mb(),
+                  'max_rss_mb': max_rss_mb()}
+        if additional_info is not None:
+            report.update(additional_info)
+        return report
+
+
+def collect_stages_statistics(statistics: Statistics, pipeline_names: Iterable[str]) -> Dict[str, Dict]:
+    """
+    Combine metrics of stages with the same name from desired pipelines.
+    Latency quantiles are estimated using histograms, so precision is
+    limited by the buckets boundaries
+    """
+    pipeline_names = set(pipeline_names)
+    snapshot = statistics.snapshot()
+    stages_metrics = Statistics()
+    for metrics_type in ['counters', 'histograms']:
+        for metric in snapshot[metrics_type]:
+            if metric['labels'].get('pipeline') not in pipeline_names:
+                continue
+            labels = {'stage': metric['labels'].get('stage')}
+            stages_metrics.merge({metrics_type: [{**metric, 'labels': labels}]})
+
+    merged_snapshot = stages_metrics.snapshot()
+    stages = {}
+    for metric in merged_snapshot['counters']:
+        stage = stages.setdefault(metric['labels']['stage'], _empty_stage_report())
+        if metric['name'] == STAGE_LAUNCHES:
+            stage['launches'] = int(metric['value'])
+        elif metric['name'] == STAGE_ERRORS:
+            stage['errors'] = int(metric['value'])
+
+    for metric in merged_snapshot['histograms']:
+        histogram = metric['value']
+        stage = stages.setdefault(metric['labels']['stage'], _empty_stage_report())
+        if metric['name'] == STAGE_PAYLOAD_RECORDS:
+            stage['records'] = int(histogram['sum'])
+        if metric['name'] != STAGE_DURATION:
+            continue
+        stage['mean_seconds'] = histogram['sum'] / histogram['count'] if histogram['count'] > 0 else None
+        stage['p50_seconds'] = estimate_quantile(histogram, 0.5)
+        stage['p99_seconds'] = estimate_quantile(histogram, 0.99)
+    return stages
+
+
+def current_rss_mb() -> Union[float, None]:
+    """ Resident set size of the current process in megabytes (Linux only) """
+    try:
+        with open('/proc/self/statm', 'r') as fp:
+            resident_pages = int(fp.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def max_rss_mb() -> float:
+    """ Peak resident set size of the current process in megabytes """
+    # On Linux value is in kilobytes
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _cpu_seconds() -> float:
+    """ User and system CPU time of the process and its finished children """
+    cpu_seconds = 0.0
+    for who in [resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN]:
+        usage = resource.getrusage(who)
+        cpu_seconds += usage.ru_utime + usage.ru_stime
+    return cpu_seconds
+
+
+def _empty_stage_report() -> Dict[str, Union[int, float, None]]:
+    return {'launches': 0, 'errors': 0, 'records': 0, 'mean_seconds': None,
+            'p50_seconds': None, 'p99_seconds': None}
+
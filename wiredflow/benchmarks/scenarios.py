@@ -0,0 +1,345 @@
+import json
+import math
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Union
+
+import paho.mqtt.client as mqtt
+
+from wiredflow.benchmarks.measurement import BenchmarkMeasurement, collect_stages_statistics
+from wiredflow.main.actions.action_input_mqtt import MQTTMessagesProcessingSybAction
+from wiredflow.main.build import FlowBuilder
+from wiredflow.main.pipeline import Pipeline
+from wiredflow.messages.failures_check import ExecutionStatusChecker
+from wiredflow.metrics.metric import get_statistics
+from wiredflow.mocks.http_server import MockHTTPServer, HTTP_LOCALHOST
+from wiredflow.mocks.mqtt_broker import MQTTLoadGenerator
+from wiredflow.mocks.mqtt_server import LocalMQTTBroker, MQTT_LOCALHOST
+from wiredflow.wiredtimer.timer import WiredTimer
+
+
+def benchmark_http_polling(pipelines: int = 4, requests_per_second: int = 10,
+                           duration_seconds: float = 10, mode: str = 'threads',
+                           latency_seconds: float = 0.0, response_size: int = 100,
+                           error_rate: float = 0.0) -> Dict:
+    """
+    Several pipelines request data from local multithreaded mock HTTP server
+    with keep-alive connections. Each pipeline is launched every second and
+    performs desired number of requests
+
+    :param pipelines: number of pipelines
+    :param requests_per_second: number of requests per second for each pipeline
+    :param duration_seconds: duration of flow execution
+    :param mode: how to launch pipelines - 'threads', 'asyncio' or 'scheduler'.
+    Metrics of processes are not available in the current process, so
+    'processes' mode is not supported
+    :param latency_seconds: artificial delay of the server before each response
+    :param response_size: approximate size of each response in bytes
+    :param error_rate: part of requests (from 0 to 1) to respond with error
+    """
+    if mode == 'processes':
+        raise ValueError('Mode "processes" is not supported by benchmark. Use "threads", '
+                         '"asyncio" or "scheduler"')
+    params = {'pipelines': pipelines, 'requests_per_second': requests_per_second,
+              'duration_seconds': duration_seconds, 'mode': mode, 'latency_seconds': latency_seconds,
+              'response_size': response_size, 'error_rate': error_rate}
+
+    server = MockHTTPServer(latency_seconds=latency_seconds, response_size=response_size,
+                            error_rate=error_rate)
+    server.start()
+
+    pipeline_names = _define_pipeline_names('http_polling', pipelines)
+    flow_builder = FlowBuilder(mode=mode)
+    for pipeline_name in pipeline_names:
+        flow_builder.add_pipeline(pipeline_name, timedelta_seconds=1, delay_seconds=0) \
+            .with_configuration(generate_requests, requests_per_launch=requests_per_second) \
+            .with_http_connector(source=server.url) \
+            .with_storage(discard_records)
+    flow = flow_builder.build()
+
+    try:
+        with BenchmarkMeasurement('http_polling', params) as measurement:
+            flow.launch_flow(execution_seconds=duration_seconds)
+    finally:
+        server.stop()
+    # Number of connections shows how well connections are reused
+    server_statistics = {f'server_{name}': value for name, value in server.statistics().items()}
+    return measurement.report(pipeline_names, throughput_stage='StageGetHTTPConnector',
+                              additional_info=server_statistics)
+
+
+def benchmark_mqtt_burst(messages: int = 100000, burst_size: int = 1000,
+                         burst_interval_seconds: float = 0.0, payload_size: int = 100,
+                         batch_size: int = 100, queue_size: int = 10000,
+                         backpressure: str = 'block', storage: Union[str, None] = 'jsonl') -> Dict:
+    """
+    Bursts of messages are passed into MQTT subscriber of the pipeline the
+    same way as network thread of the client does it. Broker is not required,
+    so only processing of messages by wiredflow is measured: queue, decoding
+    and saving into storage
+
+    :param messages: total number of messages
+    :param burst_size: number of messages sent without pauses
+    :param burst_interval_seconds: pause between bursts
+    :param payload_size: approximate size of each payload in bytes
+    :param batch_size: number of messages saved into storage with single call
+    :param queue_size: size of the queue between network thread and writer
+    :param backpressure: policy for full queue
+    :param storage: name of storage or None to discard messages
+    """
+    params = {'messages': messages, 'burst_size': burst_size,
+              'burst_interval_seconds': burst_interval_seconds, 'payload_size': payload_size,
+              'batch_size': batch_size, 'queue_size': queue_size,
+              'backpressure': backpressure, 'storage': storage}
+    topic = '/benchmark/burst'
+    pipeline_name = _define_pipeline_names('mqtt_burst', 1)[0]
+
+    folder_to_save = Path(tempfile.mkdtemp(prefix='wiredflow_benchmark_'))
+    try:
+        pipeline = _with_storage(Pipeline(pipeline_name, use_threads=True)
+                                 .with_mqtt_connector(HTTP_LOCALHOST, topic=topic, batch_size=batch_size,
+                                                      queue_size=queue_size, backpressure=backpressure),
+                                 storage, folder_to_save)
+        pipeline.create_action()
+        connector, db_saver = pipeline.action.init_stages
+        mqtt_processing = MQTTMessagesProcessingSybAction(db_saver, topic, WiredTimer(None),
+                                                          connector.batch_size,
+                                                          connector.flush_interval_seconds,
+                                                          connector.queue_size,
+                                                          connector.backpressure,
+                                                          connector.payload_decoder,
+                                                          pipeline_name)
+        burst = [_create_mqtt_message(topic, message_id, payload_size)
+                 for message_id in range(min(burst_size, messages))]
+
+        with BenchmarkMeasurement('mqtt_burst', params) as measurement:
+            mqtt_processing.start()
+            sent_messages = 0
+            while sent_messages < messages:
+                for message in burst[:messages - sent_messages]:
+                    mqtt_processing.add_message(message)
+                sent_messages += len(burst[:messages - sent_messages])
+                if burst_interval_seconds > 0 and sent_messages < messages:
+                    time.sleep(burst_interval_seconds)
+            # Wait for all messages to be saved
+            mqtt_processing.stop()
+        pipeline.action.close_stages()
+    finally:
+        shutil.rmtree(folder_to_save, ignore_errors=True)
+
+    if mqtt_processing.failure is not None:
+        raise mqtt_processing.failure
+    processed_messages = messages - mqtt_processing.dropped_messages - mqtt_processing.malformed_messages
+    return measurement.report([pipeline_name], processed_records=processed_messages,
+                              additional_info={'dropped_messages': mqtt_processing.dropped_messages})
+
+
+def benchmark_mqtt_load(rate: Union[float, None] = 20000, burst_size: int = 100,
+                        payload_size: int = 100, topics: int = 10, duration_seconds: float = 10,
+                        batch_size: int = 100, storage: Union[str, None] = None) -> Dict:
+    """
+    Load generator publishes messages into local MQTT broker through
+    persistent connection and pipeline subscribed to all topics saves them.
+    Network communication of MQTT client is included into measurements
+
+    :param rate: number of messages per second. If None - messages are sent
+    as fast as possible
+    :param burst_size: number of messages sent without pauses
+    :param payload_size: approximate size of each payload in bytes
+    :param topics: number of topics to send messages into
+    :param duration_seconds: duration of sending
+    :param batch_size: number of messages saved into storage with single call
+    :param storage: name of storage or None to discard messages
+    """
+    params = {'rate': rate, 'burst_size': burst_size, 'payload_size': payload_size, 'topics': topics,
+              'duration_seconds': duration_seconds, 'batch_size': batch_size, 'storage': storage}
+    topic_prefix = '/benchmark/load'
+    pipeline_name = _define_pipeline_names('mqtt_load', 1)[0]
+
+    folder_to_save = Path(tempfile.mkdtemp(prefix='wiredflow_benchmark_'))
+    broker = LocalMQTTBroker(port=0)
+    broker.start()
+    try:
+        pipeline = _with_storage(Pipeline(pipeline_name, use_threads=True)
+                                 .with_mqtt_connector(MQTT_LOCALHOST, port=broker.port, topic=f'{topic_prefix}/#',
+                                                      batch_size=batch_size, flush_interval_seconds=0.1),
+                                 storage, folder_to_save)
+        pipeline.create_action()
+        failures = []
+        subscriber = threading.Thread(target=_run_pipeline, args=(pipeline, failures))
+        subscriber.start()
+        try:
+            if broker.wait_for_subscriptions(1) is False:
+                raise ValueError('MQTT subscriber did not subscribe to local broker')
+
+            generator = MQTTLoadGenerator(MQTT_LOCALHOST, broker.port, rate, burst_size, payload_size,
+                                          topics, duration_seconds, topic_prefix=topic_prefix)
+            with BenchmarkMeasurement('mqtt_load', params) as measurement:
+                sending_info = generator.run()
+                # Wait till all received messages are saved
+                _wait_for_records(pipeline_name, sending_info['published_messages'])
+        finally:
+            pipeline.action.stop()
+            subscriber.join()
+    finally:
+        broker.stop()
+        shutil.rmtree(folder_to_save, ignore_errors=True)
+
+    if len(failures) > 0:
+        raise failures[0]
+    stages = collect_stages_statistics(get_statistics(), [pipeline_name])
+    saved_messages = sum(stage['records'] for stage in stages.values())
+    return measurement.report([pipeline_name], processed_records=saved_messages,
+                              additional_info={'published_messages': sending_info['published_messages'],
+                                               'publish_rate': sending_info['publish_rate'],
+                                               'lost_messages': sending_info['published_messages'] - saved_messages})
+
+
+def benchmark_storage_growth(storage: str = 'jsonl', records: int = 1000000,
+                             batch_size: int = 10000, mapping: str = 'extend') -> Dict:
+    """
+    Records are saved into storage by batches until storage contains desired
+    number of records. Then all records are loaded at once
+
+    :param storage: name of storage
+    :param records: number of records to save
+    :param batch_size: number of records in each save
+    :param mapping: mapping procedure for storage
+    """
+    params = {'storage': storage, 'records': records, 'batch_size': batch_size, 'mapping': mapping}
+    pipeline_name = _define_pipeline_names('storage_growth', 1)[0]
+    number_of_batches = math.ceil(records / batch_size)
+
+    folder_to_save = Path(tempfile.mkdtemp(prefix='wiredflow_benchmark_'))
+    try:
+        pipeline = Pipeline(pipeline_name, use_threads=True) \
+            .with_http_connector(generate_records, batch_size=batch_size) \
+            .with_storage(storage, folder_to_save=folder_to_save, mapping=mapping)
+        pipeline.create_action()
+        db_connector = pipeline.action.get_db_connector_object
+
+        with BenchmarkMeasurement('storage_growth', params) as measurement:
+            for _ in range(number_of_batches):
+                pipeline.action.perform_action()
+        saving_seconds = measurement.elapsed_seconds
+
+        start_time = time.perf_counter()
+        loaded_records = db_connector.load()
+        loading_seconds = time.perf_counter() - start_time
+
+        additional_info = {'saving_seconds': saving_seconds,
+                           'loading_seconds': loading_seconds,
+                           'loaded_records': None if loaded_records is None else len(loaded_records),
+                           'storage_size_mb': _folder_size_mb(folder_to_save)}
+        pipeline.action.close_stages()
+    finally:
+        shutil.rmtree(folder_to_save, ignore_errors=True)
+
+    return measurement.report([pipeline_name], processed_records=number_of_batches * batch_size,
+                              additional_info=additional_info)
+
+
+def benchmark_core_fan_out(fan_out: int = 100, launches: int = 10,
+                           max_concurrency: int = 1, work_seconds: float = 0.001) -> Dict:
+    """
+    Core logic generates several results per launch and each result is
+    delivered by send stage which imitates I/O with desired duration
+
+    :param fan_out: number of results generated by core logic per launch
+    :param launches: number of pipeline launches
+    :param max_concurrency: number of results delivered simultaneously
+    :param work_seconds: duration of delivery of single result
+    """
+    params = {'fan_out': fan_out, 'launches': launches,
+              'max_concurrency': max_concurrency, 'work_seconds': work_seconds}
+    pipeline_name = _define_pipeline_names('core_fan_out', 1)[0]
+    pipeline = Pipeline(pipeline_name, use_threads=True, max_concurrency=max_concurrency) \
+        .with_core_logic(fan_out_results, fan_out=fan_out) \
+        .send(deliver_result, work_seconds=work_seconds)
+    pipeline.create_action()
+
+    with BenchmarkMeasurement('core_fan_out', params) as measurement:
+        for _ in range(launches):
+            pipeline.action.perform_action()
+    pipeline.action.close_stages()
+    return measurement.report([pipeline_name], throughput_stage='deliver_result')
+
+
+scenario_by_name = {'http_polling': benchmark_http_polling,
+                    'mqtt_burst': benchmark_mqtt_burst,
+                    'mqtt_load': benchmark_mqtt_load,
+                    'storage_growth': benchmark_storage_growth,
+                    'core_fan_out': benchmark_core_fan_out}
+
+
+def generate_requests(requests_per_launch: int, **params):
+    """ Configuration which launches HTTP connector desired number of times """
+    for _ in range(requests_per_launch):
+        yield {}
+
+
+def discard_records(relevant_info, **params):
+    """ Storage which does not save anything - only connector is measured """
+    return None
+
+
+def generate_records(batch_size: int, **params) -> List[Dict]:
+    return [{'Index': record_id, 'Value': record_id * 0.5, 'Label': 'benchmark'}
+            for record_id in range(batch_size)]
+
+
+def fan_out_results(relevant_info, db_connectors, fan_out: int, **params):
+    for result_id in range(fan_out):
+        yield {'Result': result_id}
+
+
+def deliver_result(data_to_send, work_seconds: float, **params):
+    time.sleep(work_seconds)
+
+
+def _with_storage(pipeline: Pipeline, storage: Union[str, None], folder_to_save: Path) -> Pipeline:
+    if storage is None:
+        return pipeline.with_storage(discard_records)
+    return pipeline.with_storage(storage, folder_to_save=folder_to_save)
+
+
+def _run_pipeline(pipeline: Pipeline, failures: List[Exception]):
+    try:
+        pipeline.run(WiredTimer(None), ExecutionStatusChecker())
+    except Exception as ex:
+        failures.append(ex)
+
+
+def _wait_for_records(pipeline_name: str, expected_records: int, seconds_without_progress: float = 2):
+    """ Wait till pipeline saves desired number of records or saving stops """
+    saved_records = -1
+    last_progress_time = time.monotonic()
+    while time.monotonic() - last_progress_time < seconds_without_progress:
+        stages = collect_stages_statistics(get_statistics(), [pipeline_name])
+        current_records = sum(stage['records'] for stage in stages.values())
+        if current_records >= expected_records:
+            return None
+        if current_records > saved_records:
+            saved_records = current_records
+            last_progress_time = time.monotonic()
+        time.sleep(0.05)
+
+
+def _create_mqtt_message(topic: str, message_id: int, payload_size: int) -> mqtt.MQTTMessage:
+    message = mqtt.MQTTMessage(topic=topic.encode('utf-8'))
+    message.payload = json.dumps({'Index': message_id, 'Payload': 'x' * payload_size}).encode('utf-8')
+    return message
+
+
+def _define_pipeline_names(scenario: str, number_of_pipelines: int) -> List[str]:
+    """ Generate unique names, so metrics of previous launches are not included """
+    run_id = uuid.uuid4().hex[:8]
+    return [f'benchmark_{scenario}_{run_id}_{pipeline_id}' for pipeline_id in range(number_of_pipelines)]
+
+
+def _folder_size_mb(folder: Path) -> float:
+    return sum(path.stat().st_size for path in folder.rglob('*') if path.is_file()) / (1024 * 1024)
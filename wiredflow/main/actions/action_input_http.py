@@ -1,4 +1,4 @@
-from typing import List, Union
+from typing import List
 import time
 
 from loguru import logger
@@ -7,7 +7,6 @@ from wiredflow.main.actions.action_interface import Action, \
     calculate_break_interval
 from wiredflow.main.actions.assimilation.interface import ProxyStage
 from wiredflow.messages.failures_check import ExecutionStatusChecker
-from wiredflow.schedule import Scheduler
 
 
 class InputActionHttps(Action):
@@ -25,19 +24,20 @@ class InputActionHttps(Action):
     def execute_action(self, failures_checker: ExecutionStatusChecker):
         """ Launch process with defined parameters """
         number_of_seconds_to_break = calculate_break_interval(self.timedelta_seconds)
-        if self.params.get('delay_seconds') is not None:
-            # If there is a need to wait several seconds before start action execution
-            time.sleep(self.params.get('delay_seconds'))
+        # If there is a need to wait several seconds before start action execution
+        start_delay_seconds = self.start_delay_seconds()
+        if start_delay_seconds != 0:
+            time.sleep(start_delay_seconds)
 
-        # Launch once before loop
-        self.perform_action()
+        # Launch once before loop. If particular launch time was defined - wait for it
+        scheduler = self.create_scheduler()
+        scheduler.run()
 
         if self.timeout_timer is not None and self.timeout_timer.is_limit_reached():
             return None
         elif self.timeout_timer is not None and self.timeout_timer.will_limit_be_reached(number_of_seconds_to_break):
             return None
 
-        scheduler = Scheduler(self.perform_action, self.timedelta_seconds, self.launch_time)
         while True:
             if failures_checker.is_current_status_ok() is False:
                 logger.info(f'Service failure due to "{failures_checker.exception_message()}". '
@@ -51,6 +51,7 @@ class InputActionHttps(Action):
             elif self.timeout_timer is not None and self.timeout_timer.will_limit_be_reached(number_of_seconds_to_break):
                 break
 
-            time.sleep(number_of_seconds_to_break)
+            # Wake up exactly at the time of the next launch
+            time.sleep(min(scheduler.seconds_to_next_launch(), number_of_seconds_to_break))
 
         return None
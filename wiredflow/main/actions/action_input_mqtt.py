@@ -1,33 +1,228 @@
-from typing import List, Any, Union
+import asyncio
+import queue
+import threading
+import time
+from typing import List, Any, Union, Callable
 
 import paho.mqtt.client as mqtt
+from loguru import logger
 
-from wiredflow.main.actions.action_interface import Action
+from wiredflow.main.actions.action_interface import Action, define_stage_name
 from wiredflow.main.actions.assimilation.interface import ProxyStage
 from wiredflow.main.actions.stages.mqtt_stage import StageMQTTConnectorInterface
+from wiredflow.main.actions.stages.payload import decode_json
 from wiredflow.messages.failures_check import ExecutionStatusChecker
+from wiredflow.metrics.metric import get_statistics, QUEUE_DEPTH, DROPPED_MESSAGES, MALFORMED_MESSAGES
+from wiredflow.settings import MQTT_STATUS_CHECK_SECONDS
 from wiredflow.wiredtimer.timer import WiredTimer
 
+# How often network thread checks writer state while waiting for free space in the queue
+BLOCKED_PUT_CHECK_SECONDS = 0.5
+
 
 class MQTTMessagesProcessingSybAction:
-    """ MQTT message processing with defined stages """
-    def __init__(self, db_saver: Any, topic: str, timeout_timer: WiredTimer):
+    """
+    MQTT message processing with defined stages. Messages obtained in the
+    network thread are put into bounded queue. Separate writer thread takes
+    messages from the queue, accumulates them and saves into storage by
+    batches. So slow storage does not block network communication
+
+    :param db_saver: storage stage to save messages
+    :param topic: name of topic
+    :param timeout_timer: object for checking allocated time
+    :param batch_size: number of messages to accumulate before saving
+    :param flush_interval_seconds: maximum number of seconds to keep messages
+    before saving even if the batch is not full
+    :param queue_size: maximum number of messages waiting to be processed
+    :param backpressure: what to do when the queue is full
+        - 'block' - wait for free space in the queue (network thread waits)
+        - 'drop_oldest' - remove the oldest message from the queue
+        - 'drop_newest' - skip new message
+    :param payload_decoder: function to convert payload bytes into object.
+    If not defined - payload is decoded as JSON
+    :param pipeline_name: name of pipeline to identify metrics
+    """
+    backpressure_policies = ['block', 'drop_oldest', 'drop_newest']
+
+    def __init__(self, db_saver: Any, topic: str, timeout_timer: WiredTimer,
+                 batch_size: int = 1, flush_interval_seconds: Union[float, None] = None,
+                 queue_size: int = 10000, backpressure: str = 'block',
+                 payload_decoder: Union[Callable, None] = None,
+                 pipeline_name: Union[str, None] = None):
         self.db_saver = db_saver
         self.topic = topic
         self.messages = []
 
         self.timeout_timer = timeout_timer
 
-        # If flow with messages too frequent - it is possible to use small stack
-        self.max_messages_in_stack = 1
+        # If flow with messages too frequent - it is possible to use bigger stack
+        self.max_messages_in_stack = max(batch_size, 1)
+        self.flush_interval_seconds = flush_interval_seconds
+        # Time when the oldest of accumulated messages was received
+        self.first_message_time = time.monotonic()
+
+        if backpressure not in self.backpressure_policies:
+            raise ValueError(f'Backpressure policy "{backpressure}" is not supported. '
+                             f'Possible options: {self.backpressure_policies}')
+        self.backpressure = backpressure
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped_messages = 0
+
+        self.payload_decoder = decode_json if payload_decoder is None else payload_decoder
+        # Messages which can not be decoded are skipped
+        self.malformed_messages = 0
+
+        self.pipeline_name = topic if pipeline_name is None else pipeline_name
+        self.statistics = get_statistics()
+
+        # Exception which arisen in writer thread
+        self.failure: Union[Exception, None] = None
+        self.writer: Union[threading.Thread, None] = None
+
+    @property
+    def queue_depth(self) -> int:
+        """ Number of messages waiting to be processed by writer """
+        return self.queue.qsize()
+
+    def start(self):
+        """ Launch writer in separate thread """
+        self.writer = threading.Thread(target=self._process_queue, daemon=True)
+        self.writer.start()
+
+    def stop(self):
+        """ Process all remaining messages and finish writer thread """
+        if self.writer is not None:
+            if self.writer.is_alive():
+                self.queue.put(_STOP_WRITER)
+            self.writer.join()
+            self.writer = None
+        if self.failure is None:
+            self.flush()
+
+        if self.dropped_messages > 0:
+            logger.info(f'MQTT info. {self.dropped_messages} messages from topic {self.topic} '
+                        f'were dropped due to full queue')
+        if self.malformed_messages > 0:
+            logger.info(f'MQTT info. {self.malformed_messages} malformed messages from topic '
+                        f'{self.topic} were skipped')
+
+    def add_message(self, message: mqtt.MQTTMessage):
+        """ Put new message into the queue according to backpressure policy """
+        if self.failure is not None:
+            # Writer does not work anymore - nobody will take message from the queue
+            return None
+
+        if self.backpressure == 'block':
+            # Writer may fail while network thread waits - check it periodically
+            while self.failure is None:
+                try:
+                    self.queue.put(message, timeout=BLOCKED_PUT_CHECK_SECONDS)
+                    return None
+                except queue.Full:
+                    pass
+            return None
+
+        while True:
+            try:
+                self.queue.put_nowait(message)
+                return None
+            except queue.Full:
+                if self.backpressure == 'drop_newest':
+                    self._count_dropped_message()
+                    return None
+
+            # Remove the oldest message to free space for the new one
+            try:
+                self.queue.get_nowait()
+                self._count_dropped_message()
+            except queue.Empty:
+                pass
+
+    def _count_dropped_message(self):
+        self.dropped_messages += 1
+        self.statistics.increment(DROPPED_MESSAGES, pipeline=self.pipeline_name)
+
+    def _process_queue(self):
+        """ Take messages from the queue and save them by batches """
+        try:
+            while True:
+                seconds_till_flush = self.seconds_till_flush()
+                try:
+                    message = self.queue.get(timeout=seconds_till_flush)
+                except queue.Empty:
+                    message = None
+
+                if message is _STOP_WRITER:
+                    return None
+                if message is not None:
+                    if len(self.messages) == 0:
+                        # Flush interval is counted from the first accumulated message
+                        self.first_message_time = time.monotonic()
+                    self.messages.append(message)
+                self.statistics.set_gauge(QUEUE_DEPTH, self.queue.qsize(), pipeline=self.pipeline_name)
+                self.launch_processors()
+        except Exception as ex:
+            logger.warning(f'MQTT info. Failed to save messages from topic {self.topic}: {ex}')
+            self.failure = ex
+            self._drain_queue()
+
+    def _drain_queue(self):
+        """ Remove messages which will never be processed, so nobody waits for free space """
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return None
 
     def launch_processors(self):
-        """ Start execute processors """
-        if len(self.messages) >= self.max_messages_in_stack:
-            # Save data into database
-            for mqtt_message in self.messages:
-                self.db_saver.save(eval(mqtt_message.payload.decode("utf-8")))
-            self.messages = []
+        """ Start execute processors if batch is full or flush interval expired """
+        is_batch_full = len(self.messages) >= self.max_messages_in_stack
+        seconds_till_flush = self.seconds_till_flush()
+        if is_batch_full or (seconds_till_flush is not None and seconds_till_flush <= 0):
+            self.flush()
+
+    def seconds_till_flush(self) -> Union[float, None]:
+        """ Return number of seconds before accumulated messages must be saved """
+        if self.flush_interval_seconds is None:
+            return None
+        if len(self.messages) == 0:
+            # Nothing to save - timer starts with the first message
+            return self.flush_interval_seconds
+        return max(self.flush_interval_seconds - (time.monotonic() - self.first_message_time), 0)
+
+    def flush(self):
+        """ Save all accumulated messages into database using single call """
+        messages, self.messages = self.messages, []
+        if len(messages) == 0:
+            return None
+
+        records = []
+        for mqtt_message in messages:
+            try:
+                records.append(self.payload_decoder(mqtt_message.payload))
+            except Exception as ex:
+                self.malformed_messages += 1
+                self.statistics.increment(MALFORMED_MESSAGES, pipeline=self.pipeline_name)
+                logger.warning(f'MQTT info. Skip malformed message from topic {self.topic}: {ex}')
+
+        if len(records) == 0:
+            return None
+
+        start_time = time.perf_counter()
+        is_failed = True
+        try:
+            if len(records) == 1:
+                self.db_saver.save(records[0])
+            else:
+                self.db_saver.save(records)
+            is_failed = False
+        finally:
+            self.statistics.record_stage(self.pipeline_name, define_stage_name(self.db_saver),
+                                         time.perf_counter() - start_time, len(records), is_failed)
+
+
+# Marker to finish writer thread
+_STOP_WRITER = object()
 
 
 class InputActionMQTT(Action):
@@ -42,28 +237,104 @@ class InputActionMQTT(Action):
     def __init__(self, pipeline_name: str, stages: List[ProxyStage], **params):
         super().__init__(pipeline_name, stages, **params)
         self.client = None
+        self.stop_event = threading.Event()
 
     def execute_action(self, failures_checker: ExecutionStatusChecker):
         """ Launch MQTT connection """
+        mqtt_processing = self.start_processing()
+        try:
+            self.wait_for_stop(failures_checker, mqtt_processing)
+        finally:
+            self.finish_processing(mqtt_processing)
+
+    async def execute_action_async(self, failures_checker: ExecutionStatusChecker):
+        """
+        Launch MQTT connection as coroutine. Connection and saving are
+        blocking, so they are executed in the executor of event loop
+        """
+        loop = asyncio.get_running_loop()
+        mqtt_processing = await loop.run_in_executor(None, self.start_processing)
+        try:
+            while True:
+                seconds_to_wait = self.seconds_to_wait_for_stop(failures_checker, mqtt_processing)
+                if seconds_to_wait is None or self.stop_event.is_set():
+                    break
+                await asyncio.sleep(seconds_to_wait)
+        finally:
+            await loop.run_in_executor(None, self.finish_processing, mqtt_processing)
+
+    def start_processing(self) -> MQTTMessagesProcessingSybAction:
+        """ Connect to the broker and start messages processing """
         # Get connector object and saver
         connector = self.init_stages[0]
         db_saver = self.init_stages[1]
         mqtt_processing = MQTTMessagesProcessingSybAction(db_saver, connector.topic,
-                                                          self.timeout_timer)
+                                                          self.timeout_timer,
+                                                          connector.batch_size,
+                                                          connector.flush_interval_seconds,
+                                                          connector.queue_size,
+                                                          connector.backpressure,
+                                                          connector.payload_decoder,
+                                                          self.pipeline_name)
 
         self.subscribe_to_broker(connector, mqtt_processing)
 
-        # Launch as loop
-        if self.timeout_timer is not None and self.timeout_timer.execution_seconds is not None:
-            while self.timeout_timer.is_limit_reached() is False and failures_checker.is_current_status_ok() is True:
-                self.client.loop_start()
-            self.client.loop_stop()
-            exit()
-        else:
-            # Execute till other threads are working
-            while failures_checker.is_current_status_ok() is True:
-                self.client.loop_start()
+        # Network loop and writer process messages in background threads,
+        # so there is only a need to wait for stop conditions
+        mqtt_processing.start()
+        self.client.loop_start()
+        return mqtt_processing
+
+    def finish_processing(self, mqtt_processing: MQTTMessagesProcessingSybAction):
+        """ Disconnect from the broker and save messages which were not saved yet """
+        try:
+            self.client.disconnect()
             self.client.loop_stop()
+        finally:
+            mqtt_processing.stop()
+
+        if mqtt_processing.failure is not None:
+            raise mqtt_processing.failure
+
+    def wait_for_stop(self, failures_checker: ExecutionStatusChecker,
+                      mqtt_processing: MQTTMessagesProcessingSybAction):
+        """ Block till timeout is reached, service failed or stop was requested """
+        while True:
+            seconds_to_wait = self.seconds_to_wait_for_stop(failures_checker, mqtt_processing)
+            if seconds_to_wait is None:
+                return None
+
+            if self.stop_event.wait(seconds_to_wait) is True:
+                return None
+
+    def seconds_to_wait_for_stop(self, failures_checker: ExecutionStatusChecker,
+                                 mqtt_processing: MQTTMessagesProcessingSybAction) -> Union[float, None]:
+        """
+        Return number of seconds to wait before the next check of stop
+        conditions or None if processing must be finished now.
+        Failures checker is requested only once per MQTT_STATUS_CHECK_SECONDS
+        """
+        if mqtt_processing.failure is not None:
+            # Writer failed - pipeline must be stopped
+            return None
+
+        if failures_checker.is_current_status_ok() is False:
+            logger.info(f'Service failure due to "{failures_checker.exception_message()}". '
+                        f'Stop pipeline "{self.pipeline_name}" execution')
+            return None
+
+        seconds_to_wait = MQTT_STATUS_CHECK_SECONDS
+        if self.timeout_timer is not None and self.timeout_timer.execution_seconds is not None:
+            seconds_till_limit = self.timeout_timer.seconds_till_limit()
+            if seconds_till_limit <= 0:
+                # Finish execution
+                return None
+            seconds_to_wait = min(seconds_to_wait, seconds_till_limit)
+        return seconds_to_wait
+
+    def stop(self):
+        """ Finish MQTT messages processing """
+        self.stop_event.set()
 
     def subscribe_to_broker(self, connector: StageMQTTConnectorInterface,
                             mqtt_processing: MQTTMessagesProcessingSybAction):
@@ -1,5 +1,10 @@
+import asyncio
+import threading
+import time
 from abc import abstractmethod
-from typing import List, Dict, Union
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Union, Iterable, Any, Tuple
 
 from loguru import logger
 
@@ -7,10 +12,14 @@ from wiredflow.main.actions.assimilation.interface import ProxyStage
 from wiredflow.main.actions.stages.configuration_stage import ConfigurationInterface
 from wiredflow.main.actions.stages.core_stage import CoreLogicInterface
 from wiredflow.main.actions.stages.http_stage import HTTPConnectorInterface, StageCustomHTTPConnector
+from wiredflow.main.actions.stages.outbox import OutboxSendStage
 from wiredflow.main.actions.stages.send_stage import StageSendInterface, CustomSendStage
 from wiredflow.main.actions.stages.storage_stage import StageStorageInterface
 from wiredflow.main.multistep import is_current_stage_multi_step
+from wiredflow.metrics.metric import get_statistics
 from wiredflow.messages.failures_check import ExecutionStatusChecker
+from wiredflow.schedule import Scheduler
+from wiredflow.settings import ASYNC_STATUS_CHECK_SECONDS
 from wiredflow.wiredtimer.timer import WiredTimer
 
 
@@ -34,6 +43,8 @@ class Action:
 
         # Initialize all stages
         self.init_stages = []
+        # Names of stages to identify them in metrics
+        self.stage_names = []
         self._init_stages_objects()
 
         # Additional fields
@@ -59,6 +70,24 @@ class Action:
         # Field for timer
         self.timeout_timer: Union[WiredTimer, None] = None
 
+        # Number of generator outputs which can be processed by remaining
+        # stages simultaneously. By default - processing is sequential
+        self.max_concurrency = self.params.get('max_concurrency', 1)
+        if self.max_concurrency is None or self.max_concurrency < 1:
+            self.max_concurrency = 1
+        # Pool is created during first usage
+        self.executor: Union[ThreadPoolExecutor, None] = None
+
+        # Consecutive send stages are launched simultaneously if required
+        self.parallel_senders = self.params.get('parallel_senders', False)
+        self.stage_groups = define_stage_groups(self.init_stages, self.parallel_senders)
+        self.senders_executor: Union[ThreadPoolExecutor, None] = None
+        # Overlapping launches of the action may create pools simultaneously
+        self.executors_lock = threading.Lock()
+
+        # Object which controls the time of launches
+        self.scheduler: Union[Scheduler, None] = None
+
     def _init_stages_objects(self):
         """ Sequentially launch stages initialization """
         if len(self.init_stages) > 0:
@@ -67,12 +96,112 @@ class Action:
 
         for stage_proxy in self.stages:
             self.init_stages.append(stage_proxy.compile())
+        self.stage_names = [f'{stage_id}_{define_stage_name(stage)}'
+                            for stage_id, stage in enumerate(self.init_stages)]
+        for stage, stage_name in zip(self.init_stages, self.stage_names):
+            if isinstance(stage, OutboxSendStage):
+                # Metrics of background delivery
+                stage.pipeline_name = self.pipeline_name
+                stage.stage_name = stage_name
 
     @abstractmethod
     def execute_action(self, failures_checker: ExecutionStatusChecker):
         """ Launch all internally defined stages """
         raise NotImplementedError()
 
+    async def execute_action_async(self, failures_checker: ExecutionStatusChecker):
+        """
+        Launch action as coroutine. Stages are blocking, so they are executed
+        in the executor of event loop and coroutine only waits for the
+        next launch
+        """
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(self.start_delay_seconds())
+
+        scheduler = self.create_scheduler()
+        if scheduler.seconds_to_next_launch() <= 0:
+            await loop.run_in_executor(None, scheduler.launch)
+        while True:
+            if failures_checker.is_current_status_ok() is False:
+                logger.info(f'Service failure due to "{failures_checker.exception_message()}". '
+                            f'Stop pipeline "{self.pipeline_name}" execution')
+                break
+
+            seconds_to_wait = min(scheduler.seconds_to_next_launch(), ASYNC_STATUS_CHECK_SECONDS)
+            if self.timeout_timer is not None and self.timeout_timer.execution_seconds is not None:
+                seconds_till_limit = self.timeout_timer.seconds_till_limit()
+                if seconds_till_limit <= 0:
+                    # Finish execution
+                    break
+                seconds_to_wait = min(seconds_to_wait, seconds_till_limit)
+
+            await asyncio.sleep(seconds_to_wait)
+            if scheduler.seconds_to_next_launch() <= 0:
+                await loop.run_in_executor(None, scheduler.launch)
+
+    def create_scheduler(self) -> Scheduler:
+        """ Create object which controls the time of action launches """
+        self.scheduler = Scheduler(self.perform_action, self.timedelta_seconds, self.launch_time,
+                                   self.params.get('schedule_mode', 'fixed_rate'),
+                                   self.params.get('overlap_policy', 'skip_if_running'),
+                                   self.params.get('max_overlapping_runs', 2))
+        return self.scheduler
+
+    def start_delay_seconds(self) -> float:
+        """ Number of seconds to wait before the first launch of the action """
+        delay_seconds = self.params.get('delay_seconds')
+        return 0 if delay_seconds is None else delay_seconds
+
+    def close_stages(self):
+        """
+        Release resources (connections pools, clients) of all stages.
+        Called once when pipeline finishes execution. Launches which are still
+        in progress (in background or in pools of threads) are finished first,
+        so they do not use already closed stages
+        """
+        if self.scheduler is not None:
+            self.scheduler.close()
+            self._report_schedule_counters()
+
+        with self.executors_lock:
+            executors = [self.executor, self.senders_executor]
+            self.executor = None
+            self.senders_executor = None
+        for executor in executors:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+        for stage in self.init_stages:
+            close_method = getattr(stage, 'close', None)
+            if callable(close_method) is False:
+                continue
+
+            try:
+                close_method()
+            except Exception as ex:
+                logger.warning(f'Failed to close stage {stage} in pipeline {self.pipeline_name}: {ex}')
+
+    def _report_schedule_counters(self):
+        """ Inform about launches which were not performed in time """
+        skipped_runs = self.scheduler.skipped_runs
+        overlapping_runs = self.scheduler.overlapping_runs
+        caught_up_runs = self.scheduler.caught_up_runs
+        if skipped_runs > 0 or overlapping_runs > 0 or caught_up_runs > 0:
+            logger.info(f'Pipeline "{self.pipeline_name}" launches: skipped {skipped_runs}, '
+                        f'overlapping {overlapping_runs}, caught up {caught_up_runs}')
+
+    def __getstate__(self):
+        # Pool of threads and lock can not be transferred into another process
+        state = self.__dict__.copy()
+        state['executor'] = None
+        state['senders_executor'] = None
+        state.pop('executors_lock')
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.executors_lock = threading.Lock()
+
     @property
     def get_db_connector_object(self):
         """
@@ -89,34 +218,143 @@ class Action:
         """ Launch all processes for desired action. Default execution strategy """
         input_data = None
         configured_params = None
-        for stage_id, current_stage in enumerate(self.init_stages):
+        for stage_id, stages_group in self.stage_groups:
+            current_stage = stages_group[0]
 
             if is_current_stage_multi_step(current_stage) is False:
-                output_data = self.launch_stage(current_stage, input_data,
-                                                configured_params)
+                output_data = self.launch_stages_group(stages_group, input_data,
+                                                       configured_params)
                 input_data = output_data.get('data')
                 configured_params = output_data.get('configured_params')
             else:
                 # Multi step function - there is a need to launch several times
-                for output_data in self.launch_multi_stage(current_stage, input_data, configured_params):
-                    part_input_data = output_data.get('data')
-                    part_configured_params = output_data.get('configured_params')
-
-                    # Launch all defined post-processing
-                    if stage_id + 1 == len(self.init_stages):
-                        # That was last stage
-                        continue
-
-                    for remained_stage in self.init_stages[stage_id + 1:]:
-                        output_data = self.launch_stage(remained_stage,
-                                                        part_input_data,
-                                                        part_configured_params)
-                        input_data = output_data.get('data')
-                        configured_params = output_data.get('configured_params')
+                outputs = self.launch_multi_stage(current_stage, input_data, configured_params)
+                if stage_id + 1 == len(self.init_stages):
+                    # That was last stage - there is no need in post-processing
+                    for _ in outputs:
+                        pass
+                elif self.max_concurrency > 1:
+                    self.launch_remained_stages_concurrently(stage_id, outputs)
+                else:
+                    for output_data in outputs:
+                        self.launch_remained_stages(stage_id, output_data)
                 return None
 
+    def launch_remained_stages(self, stage_id: int, output_data: Dict) -> Dict:
+        """ Launch all stages after multi step stage for one generated output """
+        input_data = output_data.get('data')
+        configured_params = output_data.get('configured_params')
+        for group_stage_id, stages_group in self.stage_groups:
+            if group_stage_id <= stage_id:
+                continue
+            output_data = self.launch_stages_group(stages_group, input_data, configured_params)
+            input_data = output_data.get('data')
+            configured_params = output_data.get('configured_params')
+        return output_data
+
+    def launch_stages_group(self, stages_group: List, input_data, configured_params) -> Dict:
+        """
+        Launch single stage or several send stages simultaneously. Senders do
+        not change the data, so each of them receives the same input. Failure
+        of one sender does not interrupt others - the exception is raised
+        after all senders finished
+        """
+        if len(stages_group) == 1:
+            return self.launch_stage(stages_group[0], input_data, configured_params)
+
+        with self.executors_lock:
+            if self.senders_executor is None:
+                max_workers = max(len(group) for _, group in self.stage_groups) * self.max_concurrency
+                self.senders_executor = ThreadPoolExecutor(max_workers=max_workers,
+                                                           thread_name_prefix=f'{self.pipeline_name}_send')
+            senders_executor = self.senders_executor
+        tasks = [senders_executor.submit(self.launch_stage, stage, input_data, configured_params)
+                 for stage in stages_group]
+        wait(tasks)
+
+        failures = []
+        for stage, task in zip(stages_group, tasks):
+            exception = task.exception()
+            if exception is not None:
+                logger.warning(f'Send stage {define_stage_name(stage)} in pipeline '
+                               f'"{self.pipeline_name}" failed: {exception}')
+                failures.append(exception)
+        if len(failures) > 0:
+            raise failures[0]
+        return tasks[-1].result()
+
+    def launch_remained_stages_concurrently(self, stage_id: int, outputs: Iterable[Dict]):
+        """
+        Launch stages after multi step stage for several generated outputs
+        simultaneously using pool of threads. Generator is consumed lazily:
+        no more than two outputs per worker are waiting to be processed.
+        If processing of any output failed - the exception is raised after
+        all already launched tasks finished
+        """
+        with self.executors_lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                   thread_name_prefix=self.pipeline_name)
+            executor = self.executor
+
+        max_pending_tasks = self.max_concurrency * 2
+        pending: deque = deque()
+        failures = []
+        for output_data in outputs:
+            if len(pending) >= max_pending_tasks:
+                failures.extend(self._wait_for_tasks(pending))
+                if len(failures) > 0:
+                    break
+            pending.append(executor.submit(self.launch_remained_stages, stage_id, output_data))
+
+        while len(pending) > 0:
+            failures.extend(self._wait_for_tasks(pending))
+        if len(failures) > 0:
+            raise failures[0]
+
+    def _wait_for_tasks(self, pending: deque) -> List[Exception]:
+        """
+        Wait for any task to finish, so slow output does not prevent
+        processing of the next ones. Finished tasks are removed from pending ones
+        """
+        finished_tasks, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for task in finished_tasks:
+            pending.remove(task)
+
+        failures = []
+        for task in finished_tasks:
+            exception = task.exception()
+            if exception is not None:
+                failures.append(exception)
+        return failures
+
     def launch_stage(self, current_stage, input_data, configured_params) -> Dict:
-        """ Launch desired stage with configured parameters and data as input """
+        """
+        Launch desired stage with configured parameters and data as input.
+        Duration of the launch and size of output are saved into metrics
+        """
+        start_time = time.perf_counter()
+        try:
+            output_data = self._launch_stage(current_stage, input_data, configured_params)
+        except Exception:
+            self._record_stage_metrics(current_stage, start_time, None, is_failed=True)
+            raise
+
+        self._record_stage_metrics(current_stage, start_time, output_data.get('data'))
+        return output_data
+
+    def _record_stage_metrics(self, current_stage, start_time: float, output: Any,
+                              is_failed: bool = False):
+        duration_seconds = time.perf_counter() - start_time
+        stage_name = define_stage_name(current_stage)
+        for stage, name in zip(self.init_stages, self.stage_names):
+            if stage is current_stage:
+                stage_name = name
+                break
+        get_statistics().record_stage(self.pipeline_name, stage_name, duration_seconds,
+                                      define_number_of_records(output), is_failed)
+
+    def _launch_stage(self, current_stage, input_data, configured_params) -> Dict:
         is_custom_connector = isinstance(current_stage, StageCustomHTTPConnector)
 
         if isinstance(current_stage, ConfigurationInterface):
@@ -168,7 +406,7 @@ class Action:
             core_output = current_stage.launch(input_data, self.db_connectors, **configured_params)
             return {'data': core_output}
 
-        elif isinstance(current_stage, StageSendInterface) or isinstance(current_stage, CustomSendStage):
+        elif is_send_stage(current_stage) is True:
             #####################
             # Launch send stage #
             #####################
@@ -183,18 +421,38 @@ class Action:
             raise ValueError(f'Wiredflow does not support {current_stage} stage type launch')
 
     def launch_multi_stage(self, current_stage, input_data, configured_params) -> Dict:
-        """ Launch generator custom functions to generate parameters or data """
+        """
+        Launch generator custom functions to generate parameters or data.
+        Time spent for generation of each output is saved into metrics
+        """
+        outputs = self._launch_multi_stage(current_stage, input_data, configured_params)
+        while True:
+            start_time = time.perf_counter()
+            try:
+                output_data = next(outputs)
+            except StopIteration:
+                return None
+            except Exception:
+                self._record_stage_metrics(current_stage, start_time, None, is_failed=True)
+                raise
+
+            self._record_stage_metrics(current_stage, start_time, output_data.get('data'))
+            yield output_data
+
+    def _launch_multi_stage(self, current_stage, input_data, configured_params) -> Dict:
         if isinstance(current_stage, ConfigurationInterface):
             configured_params = current_stage.launch(**self.db_connectors)
             for params in configured_params:
                 yield {'configured_params': params}
 
         elif isinstance(current_stage, CoreLogicInterface):
+            # Parameters of the stage are passed the same way as for single step launch
             if configured_params is None:
-                core_output = current_stage.launch(input_data, self.db_connectors)
+                core_output = current_stage.launch(input_data, self.db_connectors,
+                                                   **current_stage.kwargs)
             else:
                 core_output = current_stage.launch(input_data, self.db_connectors,
-                                                   **configured_params)
+                                                   **{**current_stage.kwargs, **configured_params})
 
             for output in core_output:
                 yield {'data': output}
@@ -212,6 +470,47 @@ class Action:
             raise ValueError(f'Wiredflow does not support generator launch for {current_stage} stage type')
 
 
+def define_stage_name(stage) -> str:
+    """ Return name of custom function or name of stage class """
+    if isinstance(stage, OutboxSendStage):
+        # Outbox is named after the sender it wraps
+        stage = stage.sender
+    function_to_launch = getattr(stage, 'function_to_launch', None)
+    if function_to_launch is not None and hasattr(function_to_launch, '__name__'):
+        return function_to_launch.__name__
+    return type(stage).__name__
+
+
+def define_stage_groups(stages: List, parallel_senders: bool = False) -> List[Tuple[int, List]]:
+    """
+    Split stages into groups which are launched together. Consecutive send
+    stages form one group (if parallel_senders is True), all other stages
+    are launched alone. Each group is identified by index of its first stage
+    """
+    groups = []
+    for stage_id, stage in enumerate(stages):
+        if parallel_senders is True and is_send_stage(stage) is True and len(groups) > 0:
+            _, previous_group = groups[-1]
+            if is_send_stage(previous_group[-1]) is True:
+                previous_group.append(stage)
+                continue
+        groups.append((stage_id, [stage]))
+    return groups
+
+
+def is_send_stage(stage) -> bool:
+    return isinstance(stage, (StageSendInterface, CustomSendStage, OutboxSendStage))
+
+
+def define_number_of_records(output: Any) -> Union[int, None]:
+    """ Number of records in the stage output (without serialization) """
+    if output is None:
+        return None
+    if isinstance(output, (list, tuple)):
+        return len(output)
+    return 1
+
+
 def calculate_break_interval(timedelta_seconds) -> float:
     number_of_seconds_to_break = timedelta_seconds / 2
     if number_of_seconds_to_break < 0.5:
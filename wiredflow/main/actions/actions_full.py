@@ -1,5 +1,5 @@
 import time
-from typing import List, Union
+from typing import List
 
 from loguru import logger
 
@@ -7,7 +7,6 @@ from wiredflow.main.actions.action_interface import Action, \
     calculate_break_interval
 from wiredflow.main.actions.assimilation.interface import ProxyStage
 from wiredflow.messages.failures_check import ExecutionStatusChecker
-from wiredflow.schedule import Scheduler
 from wiredflow.settings import WARM_START_CORE_SECONDS
 
 
@@ -21,26 +20,30 @@ class FullProcessingAction(Action):
     def __init__(self, pipeline_name: str, stages: List[ProxyStage], **params):
         super().__init__(pipeline_name, stages, **params)
 
+    def start_delay_seconds(self) -> float:
+        """ Give some time for non core parts to start if delay was not defined """
+        if self.params.get('delay_seconds') is None:
+            return WARM_START_CORE_SECONDS
+        return self.params.get('delay_seconds')
+
     def execute_action(self, failures_checker: ExecutionStatusChecker):
         """ Launch all processes in single flow """
         number_of_seconds_to_break = calculate_break_interval(self.timedelta_seconds)
 
         # Launch once before loop - give some time for non core parts to start
-        if self.params.get('delay_seconds') is not None:
-            if self.params.get('delay_seconds') != 0:
-                # Sleep for "delay_seconds" seconds
-                time.sleep(self.params.get('delay_seconds'))
-        else:
-            time.sleep(WARM_START_CORE_SECONDS)
+        start_delay_seconds = self.start_delay_seconds()
+        if start_delay_seconds != 0:
+            time.sleep(start_delay_seconds)
 
-        self.perform_action()
+        # If particular launch time was defined - wait for it
+        scheduler = self.create_scheduler()
+        scheduler.run()
 
         if self.timeout_timer is not None and self.timeout_timer.is_limit_reached():
             return None
         elif self.timeout_timer is not None and self.timeout_timer.will_limit_be_reached(number_of_seconds_to_break):
             return None
 
-        scheduler = Scheduler(self.perform_action, self.timedelta_seconds, self.launch_time)
         while True:
             if failures_checker.is_current_status_ok() is False:
                 logger.info(f'Service failure due to "{failures_checker.exception_message()}". '
@@ -55,4 +58,5 @@ class FullProcessingAction(Action):
             elif self.timeout_timer is not None and self.timeout_timer.will_limit_be_reached(number_of_seconds_to_break):
                 break
 
-            time.sleep(number_of_seconds_to_break)
+            # Wake up exactly at the time of the next launch
+            time.sleep(min(scheduler.seconds_to_next_launch(), number_of_seconds_to_break))
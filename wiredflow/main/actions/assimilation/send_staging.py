@@ -1,13 +1,15 @@
 from typing import Union, Callable
 
 from wiredflow.main.actions.assimilation.interface import ProxyStage
+from wiredflow.main.actions.stages.outbox import OutboxSendStage, DEFAULT_OUTBOX_SIZE
 from wiredflow.main.actions.stages.send_stage import StageSendInterface, \
     MQTTSendStage, HTTPPUTSendStage, HTTPPOSTSendStage, CustomSendStage
 
 
 class SendStageProxy(ProxyStage):
     """
-    Class for compiling actual sender for data
+    Class for compiling actual sender for data. If outbox is enabled - sender
+    is wrapped into asynchronous outbox with background delivery
     """
 
     sender_by_name = {'mqtt': MQTTSendStage,
@@ -23,16 +25,26 @@ class SendStageProxy(ProxyStage):
             self.custom_realization = True
             self.send_stage = send_name
 
+        # Parameters of the outbox are not passed into sender
+        self.outbox = kwargs.pop('outbox', False)
+        self.outbox_params = {'outbox_size': kwargs.pop('outbox_size', DEFAULT_OUTBOX_SIZE),
+                              'outbox_workers': kwargs.pop('outbox_workers', 1),
+                              'spill_directory': kwargs.pop('spill_directory', None)}
+
         self.destination = destination
         self.kwargs = kwargs
         self.use_threads = use_threads
 
-    def compile(self) -> Union[StageSendInterface, CustomSendStage]:
+    def compile(self) -> Union[StageSendInterface, CustomSendStage, OutboxSendStage]:
         """ Compile Database connector stage object """
         if self.custom_realization is True:
             # Custom implementation through function
             if self.destination is not None:
                 self.kwargs['destination'] = self.destination
-            return CustomSendStage(self.send_stage, self.use_threads, **self.kwargs)
+            sender = CustomSendStage(self.send_stage, self.use_threads, **self.kwargs)
+        else:
+            sender = self.send_stage(self.destination, self.use_threads, **self.kwargs)
 
-        return self.send_stage(self.destination, self.use_threads, **self.kwargs)
+        if self.outbox is True:
+            return OutboxSendStage(sender, **self.outbox_params)
+        return sender
@@ -4,6 +4,8 @@ from wiredflow.main.actions.assimilation.interface import ProxyStage
 from wiredflow.main.actions.stages.storage_stage import StageStorageInterface
 from wiredflow.main.store_engines.csv_engine.csv_db import CSVStorageStage
 from wiredflow.main.store_engines.json_engine.json_db import JSONStorageStage
+from wiredflow.main.store_engines.jsonl_engine.jsonl_db import JSONLinesStorageStage
+from wiredflow.main.store_engines.memory_engine.memory_db import MemoryStorageStage
 from wiredflow.main.store_engines.mongo_engine.mongo_db import MongoStorageStage
 from wiredflow.main.store_engines.сustom import CustomStorageStage
 
@@ -15,8 +17,10 @@ class StoreStageProxy(ProxyStage):
     """
 
     storage_by_name = {'json': JSONStorageStage,
+                       'jsonl': JSONLinesStorageStage,
                        'csv': CSVStorageStage,
-                       'mongo': MongoStorageStage}
+                       'mongo': MongoStorageStage,
+                       'memory': MemoryStorageStage}
 
     def __init__(self, configuration: Union[str, Callable], stage_id: str,
                  use_threads: bool, **kwargs):
@@ -1,17 +1,99 @@
+import threading
 from abc import abstractmethod
 from typing import Dict, Union, Callable
 
 import requests
+from requests.adapters import HTTPAdapter
 
+# Default number of connections kept alive for each host
+DEFAULT_POOL_SIZE = 10
+# Default number of seconds to wait for connection and response
+DEFAULT_REQUEST_TIMEOUT = 10
 
-class HTTPConnectorInterface:
-    """ Base class which define common interface for all HTTP data request """
+
+def create_http_session(pool_size: int = DEFAULT_POOL_SIZE, keep_alive: bool = True) -> requests.Session:
+    """
+    Create session with connections pool. Connections in the pool are reused
+    between requests, so there is no need to do TCP (and TLS) handshake
+    for every request
+
+    :param pool_size: number of connections to keep for each host
+    :param keep_alive: is there a need to reuse connections or not
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if keep_alive is False:
+        session.headers['Connection'] = 'close'
+    return session
+
+
+class HTTPSessionMixin:
+    """
+    Lazily create HTTP session which lives as long as the stage lives.
+    Session is created during the first request, so stages can be passed
+    into another process before usage. Requests may be sent from several
+    threads, so session is created under the lock
+    """
+
+    def _init_session_params(self, params: Dict):
+        """ Take parameters of connections pool from stage parameters """
+        self.pool_size = params.pop('pool_size', DEFAULT_POOL_SIZE)
+        self.keep_alive = params.pop('keep_alive', True)
+        self.timeout = params.pop('timeout', DEFAULT_REQUEST_TIMEOUT)
+        self._session: Union[requests.Session, None] = None
+        self.session_lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self.session_lock:
+                if self._session is None:
+                    self._session = create_http_session(self.pool_size, self.keep_alive)
+        return self._session
+
+    def _request_params(self, params: Dict) -> Dict:
+        """ Add default timeout into request parameters if it was not defined """
+        if self.timeout is not None and params.get('timeout') is None:
+            params = {**params, **{'timeout': self.timeout}}
+        return params
+
+    def close(self):
+        """ Close all connections in the pool """
+        with self.session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def __getstate__(self):
+        # Opened connections and lock can not be transferred into another process
+        state = self.__dict__.copy()
+        state['_session'] = None
+        state.pop('session_lock')
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.session_lock = threading.Lock()
+
+
+class HTTPConnectorInterface(HTTPSessionMixin):
+    """
+    Base class which define common interface for all HTTP data request.
+    Each connector owns persistent connections pool. Supported parameters:
+        - pool_size - number of connections to keep for each host
+        - keep_alive - is there a need to reuse connections or not (default True)
+        - timeout - default timeout for requests in seconds (default 10).
+        If None - requests wait for response without limit
+    """
 
     def __init__(self, source: Union[str, None], headers: Union[Dict, None],
                  use_threads: bool, **params):
         self.connector_name = 'HTTP/HTTPS connector'
         self.source = source
         self.headers = headers
+        self._init_session_params(params)
         self.params = params
         self.use_threads = use_threads
 
@@ -41,7 +123,8 @@ class StageGetHTTPConnector(HTTPConnectorInterface):
 
         if isinstance(params, dict) and params.get('pipeline_name') is not None:
             params.pop('pipeline_name')
-        http_info = requests.get(self.source, headers=self.headers, **params)
+        http_info = self.session.get(self.source, headers=self.headers,
+                                     **self._request_params(params))
         return http_info.json()
 
 
@@ -62,8 +145,8 @@ class StagePostHTTPConnector(HTTPConnectorInterface):
         if isinstance(params, dict) and params.get('pipeline_name') is not None:
             params.pop('pipeline_name')
 
-        response = requests.request("POST", self.source, headers=self.headers,
-                                    **params)
+        response = self.session.request("POST", self.source, headers=self.headers,
+                                        **self._request_params(params))
         return response.json()
 
 
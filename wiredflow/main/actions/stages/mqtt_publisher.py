@@ -0,0 +1,123 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+import paho.mqtt.client as mqtt
+from loguru import logger
+
+from wiredflow.main.registry import SharedResourcesRegistry
+
+# Default number of QoS 1 and QoS 2 messages which can be sent without acknowledgement
+DEFAULT_MAX_INFLIGHT = 20
+# Default number of seconds to wait for connection to the broker
+DEFAULT_CONNECT_TIMEOUT = 10
+
+
+class MQTTPublisher:
+    """
+    Long-lived MQTT client for sending messages. Network loop works in
+    background thread, connection is restored automatically with growing
+    delay (from min_reconnect_delay to max_reconnect_delay seconds)
+
+    :param destination: address of the broker
+    :param port: port of the broker
+    :param username: username for authentication
+    :param password: password for authentication
+    :param max_inflight: number of QoS 1 and QoS 2 messages which can be sent
+    without acknowledgement
+    :param min_reconnect_delay: delay before the first reconnection attempt
+    :param max_reconnect_delay: maximum delay between reconnection attempts
+    """
+
+    def __init__(self, destination: str, port: int, username: Optional[str] = None,
+                 password: Optional[str] = None, max_inflight: int = DEFAULT_MAX_INFLIGHT,
+                 min_reconnect_delay: float = 1, max_reconnect_delay: float = 120):
+        self.destination = destination
+        self.port = port
+
+        self.connected = threading.Event()
+        self.client = mqtt.Client(protocol=mqtt.MQTTv5)
+        if username is not None:
+            self.client.username_pw_set(username=username, password=password)
+        self.client.max_inflight_messages_set(max_inflight)
+        # Messages are kept in the client while connection is restored
+        self.client.max_queued_messages_set(0)
+        self.client.reconnect_delay_set(min_delay=min_reconnect_delay, max_delay=max_reconnect_delay)
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+
+        # Messages which were not acknowledged by the broker yet
+        self.lock = threading.Lock()
+        self.pending: List[mqtt.MQTTMessageInfo] = []
+
+        self.client.connect_async(destination, port, 60)
+        self.client.loop_start()
+
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
+        logger.debug(f'MQTT publisher connected to {self.destination}:{self.port} with result code {rc}')
+        if rc == 0:
+            self.connected.set()
+
+    def _on_disconnect(self, client, userdata, rc, properties=None):
+        self.connected.clear()
+        logger.debug(f'MQTT publisher disconnected from {self.destination}:{self.port} with result code {rc}')
+
+    def publish(self, messages: List[Dict], qos: int = 0,
+                connect_timeout: float = DEFAULT_CONNECT_TIMEOUT):
+        """
+        Send messages without waiting for acknowledgements. Messages with
+        QoS 1 and QoS 2 are kept by the client till acknowledgement, so they
+        are sent again after reconnection
+
+        :param messages: list with topics and payloads
+        :param qos: quality of service level
+        :param connect_timeout: number of seconds to wait for connection
+        """
+        if self.connected.wait(connect_timeout) is False:
+            raise ConnectionError(f'MQTT publisher can not connect to {self.destination}:{self.port} '
+                                  f'during {connect_timeout} seconds')
+
+        with self.lock:
+            # Remove acknowledged messages
+            self.pending = [info for info in self.pending if info.is_published() is False]
+            for message in messages:
+                info = self.client.publish(message['topic'], message['payload'], qos=qos)
+                if info.rc != mqtt.MQTT_ERR_SUCCESS and (qos == 0 or info.rc != mqtt.MQTT_ERR_NO_CONN):
+                    raise ConnectionError(f'MQTT publisher failed to send message to topic '
+                                          f'{message["topic"]}: {mqtt.error_string(info.rc)}')
+                if qos > 0:
+                    self.pending.append(info)
+
+    def wait_for_pending(self, timeout: float):
+        """ Wait till broker acknowledges all sent messages """
+        deadline = time.monotonic() + timeout
+        with self.lock:
+            pending, self.pending = self.pending, []
+        for info in pending:
+            seconds_till_deadline = deadline - time.monotonic()
+            if seconds_till_deadline <= 0:
+                logger.warning(f'MQTT publisher. Not all messages were acknowledged by '
+                               f'{self.destination}:{self.port}')
+                return None
+            info.wait_for_publish(seconds_till_deadline)
+
+    def close(self, timeout: float = DEFAULT_CONNECT_TIMEOUT):
+        """ Wait for acknowledgements and disconnect from the broker """
+        try:
+            if self.connected.is_set():
+                self.wait_for_pending(timeout)
+        finally:
+            self.client.disconnect()
+            self.client.loop_stop()
+
+
+def close_publisher(publisher: MQTTPublisher):
+    publisher.close()
+
+
+_registry = SharedResourcesRegistry(MQTTPublisher, close_publisher)
+
+
+def get_publishers_registry() -> SharedResourcesRegistry:
+    """ Return registry of MQTT publishers for current process """
+    return _registry
@@ -4,6 +4,8 @@ from typing import Union
 import paho.mqtt.client as mqtt
 from loguru import logger
 
+from wiredflow.main.actions.stages.payload import define_payload_decoder
+
 
 class StageMQTTConnectorInterface:
     """
@@ -22,6 +24,17 @@ class StageMQTTConnectorInterface:
         self.username = self.params.get('username')
         self.password = self.params.get('password')
 
+        # Optional parameters for messages accumulation before saving
+        self.batch_size = self.params.get('batch_size', 1)
+        self.flush_interval_seconds = self.params.get('flush_interval_seconds')
+
+        # Parameters of the queue between network thread and storage writer
+        self.queue_size = self.params.get('queue_size', 10000)
+        self.backpressure = self.params.get('backpressure', 'block')
+
+        # Function to convert payload bytes into object
+        self.payload_decoder = define_payload_decoder(self.params.get('payload_format'))
+
     @abstractmethod
     def configure_client(self, client: mqtt.Client):
         raise NotImplementedError()
@@ -35,8 +48,7 @@ def mqtt_on_connect(client, userdata, flags, rc):
 
 def mqtt_on_message(client, userdata, message):
     """ Activate every time client got the message via MQTT """
-    userdata.messages.append(message)
-    userdata.launch_processors()
+    userdata.add_message(message)
 
 
 class DefaultMQTTConnector(StageMQTTConnectorInterface):
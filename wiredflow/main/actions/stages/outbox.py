@@ -0,0 +1,222 @@
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Union
+
+from loguru import logger
+
+from wiredflow.main.actions.stages.send_stage import StageSendInterface, CustomSendStage
+from wiredflow.metrics.metric import get_statistics, QUEUE_DEPTH, DROPPED_MESSAGES, \
+    OUTBOX_DELIVERY_LATENCY, OUTBOX_SPILLED_ITEMS
+
+# Default number of items which can wait for delivery in memory
+DEFAULT_OUTBOX_SIZE = 1000
+
+
+class OutboxSendStage:
+    """
+    Asynchronous wrapper for send stages. Data to send is put into bounded
+    in-memory queue and the stage returns immediately. Background workers
+    take items from the queue and deliver them using wrapped sender, so slow
+    or unreachable destination does not block the pipeline.
+
+    If the queue is full and spill directory is defined, items are appended to
+    the JSON lines segment on disk and delivered when the queue becomes empty
+    (items must be JSON serializable in this case). Otherwise send stage waits
+    for free space in the queue. Delivery order is guaranteed only for single
+    worker without spilling.
+
+    Failed deliveries are logged and saved into metrics, but do not stop the
+    pipeline. Remaining items are delivered when pipeline finishes execution
+
+    :param sender: send stage to deliver data
+    :param outbox_size: maximum number of items waiting for delivery in memory
+    :param outbox_workers: number of threads which deliver items
+    :param spill_directory: folder for saving items which do not fit into the
+    queue. If None - spilling is disabled
+    """
+
+    def __init__(self, sender: Union[StageSendInterface, CustomSendStage],
+                 outbox_size: int = DEFAULT_OUTBOX_SIZE, outbox_workers: int = 1,
+                 spill_directory: Union[str, None] = None):
+        self.sender = sender
+        self.use_threads = sender.use_threads
+        self.outbox_size = max(outbox_size, 1)
+        self.outbox_workers = max(outbox_workers, 1)
+        self.spill_directory = spill_directory
+
+        # Names to identify metrics. Defined by action which launches the stage
+        self.pipeline_name = type(sender).__name__
+        self.stage_name = type(sender).__name__
+
+        self.delivered_items = 0
+        self.failed_deliveries = 0
+        self.spilled_items = 0
+        self.dropped_items = 0
+
+        # Queue and workers are created lazily in the process where stage is launched
+        self._init_runtime()
+
+    def _init_runtime(self):
+        self.queue: Union[queue.Queue, None] = None
+        self.workers: List[threading.Thread] = []
+        self.workers_pid = None
+        self.lock = threading.Lock()
+        self.spill_path: Union[str, None] = None
+        self.spill_segments = itertools.count()
+
+    @property
+    def queue_depth(self) -> int:
+        """ Number of items waiting for delivery in memory """
+        return 0 if self.queue is None else self.queue.qsize()
+
+    def start(self):
+        """ Launch delivery workers in current process """
+        with self.lock:
+            if self.queue is not None and self.workers_pid == os.getpid():
+                return None
+            self.queue = queue.Queue(maxsize=self.outbox_size)
+            self.workers_pid = os.getpid()
+            if self.spill_directory is not None:
+                os.makedirs(self.spill_directory, exist_ok=True)
+                self.spill_path = os.path.join(self.spill_directory,
+                                               f'outbox_{os.getpid()}_{uuid.uuid4().hex[:8]}.jsonl')
+            self.workers = [threading.Thread(target=self._deliver_from_queue, daemon=True)
+                            for _ in range(self.outbox_workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def send(self, data_to_send: Any, **params):
+        """ Put data into the outbox. Delivery is performed in the background """
+        if data_to_send is None:
+            return None
+        self.start()
+
+        item = {'data': data_to_send, 'params': params, 'enqueue_time': time.time()}
+        if self.spill_path is None:
+            self.queue.put(item)
+        else:
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                self._spill(item)
+        self._update_queue_depth()
+
+    def close(self):
+        """ Deliver all remaining items, finish workers and close wrapped sender """
+        try:
+            if self.queue is not None and self.workers_pid == os.getpid():
+                for _ in self.workers:
+                    self.queue.put(_STOP_WORKER)
+                for worker in self.workers:
+                    worker.join()
+                # Items which were spilled after workers checked the segment
+                self._deliver_spilled()
+                self._update_queue_depth()
+                if self.failed_deliveries > 0 or self.spilled_items > 0 or self.dropped_items > 0:
+                    logger.info(f'Outbox of {self.stage_name} in pipeline "{self.pipeline_name}": '
+                                f'delivered {self.delivered_items}, failed {self.failed_deliveries}, '
+                                f'spilled {self.spilled_items}, dropped {self.dropped_items}')
+        finally:
+            self.queue = None
+            self.workers = []
+            self.workers_pid = None
+            close_method = getattr(self.sender, 'close', None)
+            if callable(close_method):
+                close_method()
+
+    def _deliver_from_queue(self):
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                if self._deliver_spilled() is True:
+                    continue
+                item = self.queue.get()
+
+            if item is _STOP_WORKER:
+                return None
+            self._update_queue_depth()
+            self._deliver(item)
+
+    def _deliver(self, item: Dict):
+        """ Send item using wrapped sender. Failures do not stop the worker """
+        start_time = time.perf_counter()
+        is_failed = True
+        try:
+            if len(item['params']) == 0:
+                self.sender.send(item['data'])
+            else:
+                self.sender.send(item['data'], **item['params'])
+            is_failed = False
+        except Exception as ex:
+            logger.warning(f'Outbox of {self.stage_name} in pipeline "{self.pipeline_name}". '
+                           f'Failed to deliver data: {ex}')
+        finally:
+            statistics = get_statistics()
+            statistics.record_stage(self.pipeline_name, f'{self.stage_name}_delivery',
+                                    time.perf_counter() - start_time, is_failed=is_failed)
+            with self.lock:
+                if is_failed is True:
+                    self.failed_deliveries += 1
+                else:
+                    self.delivered_items += 1
+            if is_failed is False:
+                statistics.observe(OUTBOX_DELIVERY_LATENCY, time.time() - item['enqueue_time'],
+                                   pipeline=self.pipeline_name, stage=self.stage_name)
+
+    def _spill(self, item: Dict):
+        """ Append item to the segment on disk """
+        try:
+            line = json.dumps(item)
+        except (TypeError, ValueError) as ex:
+            logger.warning(f'Outbox of {self.stage_name} in pipeline "{self.pipeline_name}". '
+                           f'Drop item which can not be saved on disk: {ex}')
+            with self.lock:
+                self.dropped_items += 1
+            get_statistics().increment(DROPPED_MESSAGES, pipeline=self.pipeline_name, stage=self.stage_name)
+            return None
+
+        with self.lock:
+            with open(self.spill_path, 'a') as fp:
+                fp.write(f'{line}\n')
+            self.spilled_items += 1
+        get_statistics().increment(OUTBOX_SPILLED_ITEMS, pipeline=self.pipeline_name, stage=self.stage_name)
+
+    def _deliver_spilled(self) -> bool:
+        """ Deliver items from the segment on disk. Return False if there were no such items """
+        with self.lock:
+            if self.spill_path is None or os.path.exists(self.spill_path) is False:
+                return False
+            # New items are appended to the new segment while this one is delivered
+            segment_path = f'{self.spill_path}.{next(self.spill_segments)}'
+            os.replace(self.spill_path, segment_path)
+
+        with open(segment_path, 'r') as fp:
+            for line in fp:
+                self._deliver(json.loads(line))
+        os.remove(segment_path)
+        return True
+
+    def _update_queue_depth(self):
+        get_statistics().set_gauge(QUEUE_DEPTH, self.queue_depth, pipeline=self.pipeline_name,
+                                   stage=self.stage_name)
+
+    def __getstate__(self):
+        # Queue, threads and lock can not be transferred into another process
+        state = self.__dict__.copy()
+        for name in ['queue', 'workers', 'workers_pid', 'lock', 'spill_path', 'spill_segments']:
+            state.pop(name)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_runtime()
+
+
+# Marker to finish delivery worker
+_STOP_WORKER = object()
@@ -0,0 +1,46 @@
+import json
+from typing import Any, Callable, Union
+
+
+def decode_json(payload: bytes) -> Any:
+    """ Decode JSON payload. Bytes are passed directly without creating string """
+    return json.loads(payload)
+
+
+def decode_msgpack(payload: bytes) -> Any:
+    """ Decode MessagePack payload. msgpack is an optional dependency """
+    try:
+        import msgpack
+    except ImportError:
+        raise ImportError('Payload format "msgpack" requires msgpack package. '
+                          'Install it with "pip install msgpack"')
+    return msgpack.unpackb(payload, raw=False)
+
+
+def decode_raw(payload: bytes) -> bytes:
+    """ Return payload as it is """
+    return bytes(payload)
+
+
+payload_decoder_by_name = {'json': decode_json,
+                           'msgpack': decode_msgpack,
+                           'raw': decode_raw}
+
+
+def define_payload_decoder(payload_format: Union[str, Callable, None]) -> Callable:
+    """
+    Return function for payload decoding
+
+    :param payload_format: name of the format or custom function which
+    takes payload bytes and returns decoded object. If None - 'json' is used
+    """
+    if payload_format is None:
+        # Default value is json
+        payload_format = 'json'
+    if callable(payload_format):
+        return payload_format
+
+    if payload_format not in payload_decoder_by_name:
+        raise ValueError(f'Payload format "{payload_format}" is not supported. '
+                         f'Possible options: {list(payload_decoder_by_name.keys())}')
+    return payload_decoder_by_name[payload_format]
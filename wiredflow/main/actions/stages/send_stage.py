@@ -1,10 +1,15 @@
 import json
+import os
+import threading
 from abc import abstractmethod
-from typing import Any, List, Dict, Callable
-import paho.mqtt.client as mqtt
-import requests
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, List, Dict, Callable, Optional
 from loguru import logger
-from paho.mqtt.publish import multiple
+
+from wiredflow.main.actions.stages.http_stage import HTTPSessionMixin
+
+from wiredflow.main.actions.stages.mqtt_publisher import MQTTPublisher, get_publishers_registry, \
+    DEFAULT_MAX_INFLIGHT, DEFAULT_CONNECT_TIMEOUT
 
 
 class StageSendInterface:
@@ -22,13 +27,55 @@ class StageSendInterface:
 
 
 class MQTTSendStage(StageSendInterface):
-    """ Send message to destination via MQTT protocol """
+    """
+    Send message to destination via MQTT protocol. Stage uses long-lived
+    client (shared between stages with the same destination and client
+    parameters in the process) with network loop in background thread
+
+    :param port: port of the broker
+    :param topic: topic to publish messages
+    :param label_to_send: name of data aggregation to send
+    :param qos: quality of service level for messages (0, 1 or 2)
+    :param max_inflight: number of QoS 1 and QoS 2 messages which can be
+    sent without acknowledgement
+    :param min_reconnect_delay: delay in seconds before the first
+    reconnection attempt
+    :param max_reconnect_delay: maximum delay in seconds between
+    reconnection attempts
+    :param connect_timeout: number of seconds to wait for connection to the
+    broker before sending
+    :param username: username for authentication
+    :param password: password for authentication
+    """
 
     def __init__(self, destination: str, use_threads: bool, **params):
         super().__init__(destination, use_threads, **params)
         self.port = params['port']
         self.topic = params['topic']
         self.label_to_send = params['label_to_send']
+        self.qos = params.get('qos', 0)
+        self.connect_timeout = params.get('connect_timeout', DEFAULT_CONNECT_TIMEOUT)
+        self.client_params = {'username': params.get('username'),
+                              'password': params.get('password'),
+                              'max_inflight': params.get('max_inflight', DEFAULT_MAX_INFLIGHT),
+                              'min_reconnect_delay': params.get('min_reconnect_delay', 1),
+                              'max_reconnect_delay': params.get('max_reconnect_delay', 120)}
+
+        # Publisher is created lazily in the process where stage is launched.
+        # Stage can be launched from several threads (outbox workers)
+        self._publisher: Optional[MQTTPublisher] = None
+        self._publisher_pid = None
+        self.publisher_lock = threading.Lock()
+
+    @property
+    def publisher(self) -> MQTTPublisher:
+        """ MQTT client which is taken from the registry of current process """
+        with self.publisher_lock:
+            if self._publisher is None or self._publisher_pid != os.getpid():
+                self._publisher = get_publishers_registry().acquire(self.destination, self.port,
+                                                                    **self.client_params)
+                self._publisher_pid = os.getpid()
+            return self._publisher
 
     def send(self, data_to_send: Any, **kwargs):
         if isinstance(data_to_send, list) is False:
@@ -51,56 +98,149 @@ class MQTTSendStage(StageSendInterface):
 
         :param msgs: list with payloads and topic
         """
-        multiple(msgs, hostname=self.destination, port=self.port, client_id="",
-                 keepalive=60, will=None, auth=None, tls=None,
-                 protocol=mqtt.MQTTv5, transport="tcp")
+        self.publisher.publish(msgs, qos=self.qos, connect_timeout=self.connect_timeout)
         logger.debug(f'Successfully send messages to topic {self.topic} via MQTT protocol')
 
+    def close(self):
+        """ Release the client. Called when pipeline finishes execution """
+        with self.publisher_lock:
+            if self._publisher is not None and self._publisher_pid == os.getpid():
+                get_publishers_registry().release(self.destination, self.port, **self.client_params)
+            self._publisher = None
+            self._publisher_pid = None
 
-class HTTPPUTSendStage(StageSendInterface):
-    """ Send message to destination via HTTP protocol using put method """
+    def __getstate__(self):
+        # Client with network thread and lock can not be transferred into another process
+        state = self.__dict__.copy()
+        state['_publisher'] = None
+        state['_publisher_pid'] = None
+        state.pop('publisher_lock')
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.publisher_lock = threading.Lock()
+
+
+class HTTPSendStage(HTTPSessionMixin, StageSendInterface):
+    """
+    Base class for sending messages via HTTP protocol. Stage owns persistent
+    connections pool and sends items concurrently. Supported parameters:
+        - label_to_send - name of data aggregation to send
+        - headers - headers of requests
+        - pool_size - number of connections to keep for each host
+        - keep_alive - is there a need to reuse connections or not (default True)
+        - timeout - timeout for requests in seconds (default 10)
+        - max_concurrency - number of requests which can be sent
+        simultaneously (default 1 - items are sent one by one in order)
+        - bulk - send all items as one JSON array instead of request per item
+        - bulk_size - maximum number of items in one JSON array. If None -
+        all items are sent in a single request
+    """
+    method = None
 
     def __init__(self, destination: str, use_threads: bool, **params):
+        self._init_session_params(params)
         super().__init__(destination, use_threads, **params)
         self.headers = params.get('headers')
         self.label_to_send = params['label_to_send']
+        self.max_concurrency = params.get('max_concurrency', 1)
+        self.bulk = params.get('bulk', False)
+        self.bulk_size = params.get('bulk_size')
+        if self.bulk is True:
+            self.headers = {**{'Content-Type': 'application/json'}, **(self.headers or {})}
+
+        # Executor is created lazily in the process where stage is launched
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.executor_lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self.executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+            return self._executor
 
     def send(self, data_to_send: Any, **kwargs):
         if isinstance(data_to_send, list) is False:
             data_to_send = [data_to_send]
 
+        items = []
         for output_data in data_to_send:
             if output_data is None:
                 continue
 
             if self.label_to_send in output_data.keys():
-                data = output_data[self.label_to_send]
-                if isinstance(data, dict):
-                    data = json.dumps(data)
-                requests.put(self.destination, headers=self.headers, data=data)
+                items.append(output_data[self.label_to_send])
+        if len(items) == 0:
+            return None
 
+        if self.bulk is True:
+            bulk_size = len(items) if self.bulk_size is None else self.bulk_size
+            bodies = [json.dumps(items[i: i + bulk_size]) for i in range(0, len(items), bulk_size)]
+        else:
+            bodies = [json.dumps(item) if isinstance(item, dict) else item for item in items]
+        self.send_bodies(bodies)
 
-class HTTPPOSTSendStage(StageSendInterface):
-    """ Send message to destination via HTTP protocol using POST method """
+    def send_bodies(self, bodies: List[Any]):
+        """ Send prepared request bodies. Failed request does not prevent sending of
+        others - the first error is raised after all requests are finished
 
-    def __init__(self, destination: str, use_threads: bool, **params):
-        super().__init__(destination, use_threads, **params)
-        self.headers = params.get('headers')
-        self.label_to_send = params['label_to_send']
+        :param bodies: list with data for requests
+        """
+        failures = []
+        if self.max_concurrency <= 1 or len(bodies) == 1:
+            for body in bodies:
+                try:
+                    self._send_request(body)
+                except Exception as ex:
+                    failures.append(ex)
+        else:
+            futures = [self.executor.submit(self._send_request, body) for body in bodies]
+            wait(futures)
+            failures = [future.exception() for future in futures if future.exception() is not None]
 
-    def send(self, data_to_send: Any, **kwargs):
-        if isinstance(data_to_send, list) is False:
-            data_to_send = [data_to_send]
+        if len(failures) > 0:
+            if len(failures) > 1:
+                logger.warning(f'HTTP sender. {len(failures)} of {len(bodies)} requests to '
+                               f'{self.destination} failed')
+            raise failures[0]
 
-        for output_data in data_to_send:
-            if output_data is None:
-                continue
+    def _send_request(self, body: Any):
+        response = self.session.request(self.method, self.destination, headers=self.headers,
+                                        data=body, **self._request_params({}))
+        if response.ok is False:
+            logger.warning(f'HTTP sender. {self.method} request to {self.destination} finished '
+                           f'with status {response.status_code}')
 
-            if self.label_to_send in output_data.keys():
-                data = output_data[self.label_to_send]
-                if isinstance(data, dict):
-                    data = json.dumps(data)
-                requests.post(self.destination, headers=self.headers, data=data)
+    def close(self):
+        """ Wait for requests and close all connections in the pool """
+        with self.executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+        super().close()
+
+    def __getstate__(self):
+        # Threads, locks and opened connections can not be transferred into another process
+        state = super().__getstate__()
+        state['_executor'] = None
+        state.pop('executor_lock')
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self.executor_lock = threading.Lock()
+
+
+class HTTPPUTSendStage(HTTPSendStage):
+    """ Send message to destination via HTTP protocol using put method """
+    method = 'PUT'
+
+
+class HTTPPOSTSendStage(HTTPSendStage):
+    """ Send message to destination via HTTP protocol using POST method """
+    method = 'POST'
 
 
 class CustomSendStage:
@@ -16,4 +16,10 @@ class StageStorageInterface:
 
     @abstractmethod
     def load(self, **kwargs):
+        """
+        Load saved data. File storages support parameter "stream" to return
+        generator instead of list and "batch_size" to yield records in lists.
+        Parameters "last_n", "since" and "where" allow to request only part
+        of saved records
+        """
         raise NotImplementedError()
@@ -15,11 +15,30 @@ class FlowBuilder:
 
     :param use_threads: is there a need to use threads or processes to launch
     pipelines
+    :param mode: how to launch pipelines. If defined - replace use_threads.
+    Possible options:
+        - 'threads' - each pipeline in separate thread
+        - 'processes' - each pipeline in separate process
+        - 'asyncio' - all pipelines as coroutines in single event loop
+        - 'scheduler' - launches of all pipelines are planned by central
+        scheduler and performed by pool of workers. MQTT connectors still
+        use separate threads
+    :param max_workers: number of workers in 'scheduler' mode
     """
+    supported_modes = ['threads', 'processes', 'asyncio', 'scheduler']
 
-    def __init__(self, use_threads: bool = True):
-        self.processor = FlowProcessor(use_threads)
+    def __init__(self, use_threads: bool = True, mode: Optional[str] = None,
+                 max_workers: Optional[int] = None):
+        if mode is None:
+            mode = 'threads' if use_threads is True else 'processes'
+        if mode not in self.supported_modes:
+            raise ValueError(f'Mode "{mode}" is not supported. Possible options: {self.supported_modes}')
+        # Coroutines and blocking stages share single process
+        use_threads = mode != 'processes'
+
+        self.processor = FlowProcessor(use_threads, mode, max_workers)
         self.use_threads = use_threads
+        self.mode = mode
 
     def add_pipeline(self, pipeline_name: Optional[str] = None,
                      **params):
@@ -28,6 +47,22 @@ class FlowBuilder:
 
         :param pipeline_name: name of pipeline to add for better debugging
         and identification purposes (mainly for core logic implementation)
+        :param params: parameters of pipeline execution. Supported:
+            - timedelta_seconds - period of pipeline launches
+            - delay_seconds - number of seconds to wait before first launch
+            - launch_time - particular time for pipeline launches
+            - max_concurrency - number of generator stage outputs which are
+            processed by subsequent stages simultaneously (default 1)
+            - schedule_mode - 'fixed_rate' (default) to launch pipeline every
+            timedelta_seconds or 'fixed_delay' to wait timedelta_seconds after
+            the previous launch finished
+            - overlap_policy - what to do if the launch took longer than the
+            period: 'skip_if_running' (default), 'coalesce_missed', 'catch_up'
+            or 'allow_overlap'
+            - max_overlapping_runs - maximum number of simultaneous launches
+            for 'allow_overlap' policy (default 2)
+            - parallel_senders - launch consecutive send stages
+            simultaneously (default False - senders are launched one by one)
         """
         pipeline_name = generate_pipeline_name(pipeline_name)
 
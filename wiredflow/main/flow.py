@@ -1,10 +1,15 @@
+import asyncio
 import threading
-from typing import Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, Optional
 
 from loguru import logger
 
 from wiredflow.main.pipeline import Pipeline
 from wiredflow.messages.failures_check import ExecutionStatusChecker
+from wiredflow.metrics.exporter import MetricsExporter, MetricsAggregator, MetricsPublisher
+from wiredflow.schedule import DeadlineScheduler
+from wiredflow.settings import ASYNC_EXECUTOR_WORKERS, SCHEDULER_WORKERS
 from wiredflow.wiredtimer.timer import WiredTimer
 
 # SuperFastPython.com
@@ -25,7 +30,8 @@ class FlowProcessor:
     ensuring their consistency
     """
 
-    def __init__(self, use_threads: bool = True):
+    def __init__(self, use_threads: bool = True, mode: Union[str, None] = None,
+                 max_workers: Optional[int] = None):
         self.processing_pool = {}
         # Information about DB connectors (extractors) in each pipeline
         # DB connectors help to get information about databases in the system
@@ -33,6 +39,10 @@ class FlowProcessor:
         # in all pipelines
         self.extract_objects = {}
         self.use_threads = use_threads
+        if mode is None:
+            mode = 'threads' if use_threads is True else 'processes'
+        self.mode = mode
+        self.max_workers = SCHEDULER_WORKERS if max_workers is None else max_workers
 
     def add_new_pipeline_into_pool(self, pipeline: Pipeline):
         """
@@ -50,45 +60,85 @@ class FlowProcessor:
 
         self._reassign_db_connectors_to_custom_pipeline()
 
-    def launch_flow(self, execution_seconds: Union[int, None] = None):
+    def launch_flow(self, execution_seconds: Union[int, None] = None,
+                    metrics_port: Optional[int] = None):
         """
         Launch each pipeline in its own thread
 
         :param execution_seconds: timeout for process execution in seconds
+        :param metrics_port: if defined - metrics of pipelines are available
+        in Prometheus format on http://<host>:<metrics_port>/metrics
         """
         timeout_timer = WiredTimer(execution_seconds)
 
         self.initialize_internal_structure()
 
         timeout_timer.set_failures_time()
-        if self.use_threads is True:
-            logger.info(f'Launch service with {len(self.processing_pool.values())} pipelines using thread mode')
-            failures_checker = ExecutionStatusChecker()
-            # Launch threads
-            threads = [threading.Thread(target=launch_pipeline, args=(pipeline, timeout_timer, failures_checker))
-                       for pipeline in self.processing_pool.values()]
+        exporter = None
+        if metrics_port is not None and self.use_threads is True:
+            exporter = MetricsExporter(metrics_port)
+            exporter.start()
 
-            # Launch pipelines into separate threads
-            for thread in threads:
-                thread.start()
+        try:
+            if self.mode == 'asyncio':
+                logger.info(f'Launch service with {len(self.processing_pool.values())} pipelines using asyncio mode')
+                failures_checker = ExecutionStatusChecker()
+                asyncio.run(self._launch_pipelines_async(timeout_timer, failures_checker))
+            elif self.mode == 'scheduler':
+                logger.info(f'Launch service with {len(self.processing_pool.values())} pipelines using scheduler mode')
+                failures_checker = ExecutionStatusChecker()
+                self._launch_pipelines_with_scheduler(timeout_timer, failures_checker)
+            elif self.use_threads is True:
+                logger.info(f'Launch service with {len(self.processing_pool.values())} pipelines using thread mode')
+                failures_checker = ExecutionStatusChecker()
+                # Launch threads
+                threads = [threading.Thread(target=launch_pipeline, args=(pipeline, timeout_timer, failures_checker))
+                           for pipeline in self.processing_pool.values()]
 
-            # Finish all threads processing
-            for thread in threads:
-                thread.join()
+                # Launch pipelines into separate threads
+                for thread in threads:
+                    thread.start()
 
-            logger.info(f'Flow finish execution')
-            if failures_checker.is_current_status_ok() is False:
-                raise ValueError(f'Service was failed. Please reconfigure flow. '
-                                 f'Exception: {failures_checker.exception_message()}')
-        else:
-            logger.info(f'Launch service with {len(self.processing_pool.values())} pipelines using parallel mode')
+                # Finish all threads processing
+                for thread in threads:
+                    thread.join()
+            else:
+                logger.info(f'Launch service with {len(self.processing_pool.values())} pipelines using parallel mode')
+                is_ok, exception_message = self._launch_pipelines_in_processes(timeout_timer, metrics_port)
+        finally:
+            if exporter is not None:
+                exporter.stop()
 
-            BaseManager.register('ExecutionStatusChecker', ExecutionStatusChecker)
-            with BaseManager() as manager:
-                failures_checker = manager.ExecutionStatusChecker()
-                processes = [Process(target=launch_pipeline, args=(pipeline, timeout_timer, failures_checker))
-                             for pipeline in self.processing_pool.values()]
+        if self.use_threads is True:
+            is_ok = failures_checker.is_current_status_ok()
+            exception_message = failures_checker.exception_message()
+
+        logger.info(f'Flow finish execution')
+        if is_ok is False:
+            raise ValueError(f'Service was failed. Please reconfigure flow. '
+                             f'Exception: {exception_message}')
+        return is_ok
+
+    def _launch_pipelines_in_processes(self, timeout_timer: WiredTimer, metrics_port: Optional[int] = None):
+        """
+        Launch each pipeline in separate process. Processes send their
+        metrics to the aggregator which is used by metrics exporter
+        """
+        BaseManager.register('ExecutionStatusChecker', ExecutionStatusChecker)
+        BaseManager.register('MetricsAggregator', MetricsAggregator)
+        with BaseManager() as manager:
+            failures_checker = manager.ExecutionStatusChecker()
+            metrics_aggregator = None
+            exporter = None
+            if metrics_port is not None:
+                metrics_aggregator = manager.MetricsAggregator()
+                exporter = MetricsExporter(metrics_port, snapshot_provider=metrics_aggregator.snapshot)
+                exporter.start()
 
+            processes = [Process(target=launch_pipeline,
+                                 args=(pipeline, timeout_timer, failures_checker, metrics_aggregator))
+                         for pipeline in self.processing_pool.values()]
+            try:
                 # Launch pipelines into separate processes
                 for process in processes:
                     process.start()
@@ -96,12 +146,53 @@ class FlowProcessor:
                 # Finish all threads processing
                 for process in processes:
                     process.join()
+            finally:
+                if exporter is not None:
+                    exporter.stop()
+
+            # Status must be obtained before manager shutdown
+            return failures_checker.is_current_status_ok(), failures_checker.exception_message()
+
+    async def _launch_pipelines_async(self, timeout_timer: WiredTimer,
+                                      failures_checker: ExecutionStatusChecker):
+        """ Launch each pipeline as coroutine in current event loop """
+        loop = asyncio.get_running_loop()
+        # Blocking stages are executed in threads of this pool
+        executor = ThreadPoolExecutor(max_workers=ASYNC_EXECUTOR_WORKERS, thread_name_prefix='wiredflow')
+        loop.set_default_executor(executor)
 
-                logger.info(f'Flow finish execution')
-                if failures_checker.is_current_status_ok() is False:
-                    raise ValueError(f'Service was failed. Please reconfigure flow. '
-                                     f'Exception: {failures_checker.exception_message()}')
-        return failures_checker.status.is_ok
+        await asyncio.gather(*[launch_pipeline_async(pipeline, timeout_timer, failures_checker)
+                               for pipeline in self.processing_pool.values()])
+
+    def _launch_pipelines_with_scheduler(self, timeout_timer: WiredTimer,
+                                         failures_checker: ExecutionStatusChecker):
+        """
+        Plan launches of all pipelines using central scheduler. MQTT
+        subscribers are waiting for messages all the time, so they are
+        launched in separate threads
+        """
+        scheduler = DeadlineScheduler(self.max_workers)
+        threads = []
+        scheduled_pipelines = []
+        for pipeline in self.processing_pool.values():
+            if pipeline.with_mqtt_connection is True:
+                threads.append(threading.Thread(target=launch_pipeline,
+                                                args=(pipeline, timeout_timer, failures_checker)))
+                continue
+
+            pipeline.prepare_action(timeout_timer)
+            scheduler.add(pipeline.action.create_scheduler(), pipeline.action.start_delay_seconds())
+            scheduled_pipelines.append(pipeline)
+
+        for thread in threads:
+            thread.start()
+        try:
+            scheduler.run(timeout_timer, failures_checker)
+        finally:
+            for thread in threads:
+                thread.join()
+            for pipeline in scheduled_pipelines:
+                pipeline.action.close_stages()
 
     def _get_db_connectors(self):
         """ Get instances of all DB connectors from all pipelines """
@@ -124,19 +215,49 @@ class FlowProcessor:
                 pipeline.db_connectors = self.extract_objects
 
 
-def launch_pipeline(pipeline, timeout_timer: WiredTimer, failures_checker: ExecutionStatusChecker):
+def launch_pipeline(pipeline, timeout_timer: WiredTimer, failures_checker: ExecutionStatusChecker,
+                    metrics_aggregator: Optional[MetricsAggregator] = None):
     """ Wrapper for launching in separate process or thread
 
     :param pipeline: pipeline to launch
     :param timeout_timer: object for checking allocated time
     :param failures_checker: failures checker object or AutoProxy
+    :param metrics_aggregator: AutoProxy of aggregator to send metrics of
+    the process into. Used only when pipelines are launched in processes
     """
+    publisher = None
+    if metrics_aggregator is not None:
+        publisher = MetricsPublisher(metrics_aggregator)
+        publisher.start()
+
     try:
         pipeline.run(timeout_timer, failures_checker)
     except Exception as ex:
         # Set new status - message will propagate to other threads
         failures_checker.set_failed_status(ex)
 
+        logger.info(f'Service failure due to "{failures_checker.exception_message()}". '
+                    f'Stop pipeline "{pipeline.pipeline_name}" execution')
+
+        return None
+    finally:
+        if publisher is not None:
+            publisher.stop()
+
+
+async def launch_pipeline_async(pipeline, timeout_timer: WiredTimer, failures_checker: ExecutionStatusChecker):
+    """ Wrapper for launching pipeline as coroutine
+
+    :param pipeline: pipeline to launch
+    :param timeout_timer: object for checking allocated time
+    :param failures_checker: failures checker object
+    """
+    try:
+        await pipeline.run_async(timeout_timer, failures_checker)
+    except Exception as ex:
+        # Set new status - other coroutines will stop during next check
+        failures_checker.set_failed_status(ex)
+
         logger.info(f'Service failure due to "{failures_checker.exception_message()}". '
                     f'Stop pipeline "{pipeline.pipeline_name}" execution')
 
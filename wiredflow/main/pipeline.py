@@ -1,3 +1,4 @@
+import asyncio
 import uuid
 from typing import Union, Dict, Callable
 
@@ -55,6 +56,12 @@ class Pipeline:
         implementation
         :param source: endpoint to apply get method
         :param headers: dictionary with headers for request
+        :param kwargs: additional parameters for requests. Parameters of
+        persistent connections pool are also supported:
+            - pool_size - number of connections to keep for each host (default 10)
+            - keep_alive - is there a need to reuse connections between
+            requests or not (default True)
+            - timeout - default timeout for requests in seconds
         """
         self.with_get_request_action = True
 
@@ -73,6 +80,21 @@ class Pipeline:
         :param source: endpoint to subscribe to MQTT broker
         :param port: port for connection
         :param topic: topic for subscription
+
+        Additional parameters:
+            - username - username for authentication
+            - password - password for authentication
+            - batch_size - number of messages to accumulate before saving
+            them into storage with single call (default 1)
+            - flush_interval_seconds - maximum number of seconds to keep
+            accumulated messages before saving even if batch is not full
+            - queue_size - maximum number of received messages waiting to be
+            saved (default 10000)
+            - backpressure - what to do when the queue is full: 'block'
+            (default), 'drop_oldest' or 'drop_newest'
+            - payload_format - how to decode messages: 'json' (default),
+            'msgpack', 'raw' (bytes as is) or custom function which takes
+            payload bytes and returns decoded object
         """
         self.with_mqtt_connection = True
 
@@ -87,10 +109,14 @@ class Pipeline:
         :param configuration: name of storage to use or custom realization
         Possible options:
             - 'json' - save results into json file
+            - 'jsonl' - append results into JSON Lines file (one record per
+            line, without rewriting already saved data)
             - 'csv' - save results into csv files locally
             - 'mongo' - save results into mongo DB
+            - 'memory' - keep last results in memory (ring buffer) to pass them
+            into core logic without disk operations
 
-        Additional parameters for 'json' or 'csv' storage:
+        Additional parameters for 'json', 'jsonl' or 'csv' storage:
             - folder_to_save - path to the folder where to save json files
             - preprocessing - name of preprocessing to apply or list of
             preprocessors
@@ -103,6 +129,26 @@ class Pipeline:
                 - 'overwrite' - create file from scratch
                 - 'extend' - if the structure list-related - then just add new
                 dictionaries to existing ones
+            NB: 'jsonl' storage supports only 'extend' and 'overwrite' mappings
+
+        Additional parameters for 'mongo' storage:
+            - source, database_name, collection_name, username, password -
+            parameters of connection
+            - index_field - field for unique index
+            - buffer_size - number of documents to accumulate before insertion
+            (default 1)
+            - flush_interval_seconds - maximum number of seconds to keep
+            documents in the buffer
+            - write_concern - dictionary with write concern options
+            - max_pool_size - maximum number of connections of the client.
+            Client is shared by all storages with the same connection parameters
+
+        Additional parameters for 'memory' storage:
+            - capacity - maximum number of records to keep (default 10000)
+            - slot_size - maximum size of single record in bytes for processes
+            mode (default 4096)
+            - preprocessing, mapping - the same as for files ('extend' and
+            'overwrite' mappings are supported)
         """
         self.with_storage_action = True
 
@@ -133,9 +179,15 @@ class Pipeline:
 
         :param configuration: name of sender to apply or custom implementation.
         Possible options:
-            - 'mqtt' to send messages via MQTT
+            - 'mqtt' to send messages via MQTT (persistent client with
+            qos, max_inflight, min_reconnect_delay, max_reconnect_delay and
+            connect_timeout parameters)
             - 'http_post' to send message via HTTP post request
             - 'http_put' to send message via HTTP put request
+            (HTTP senders support pool_size, timeout, max_concurrency, bulk
+            and bulk_size parameters)
+        Any sender can be made asynchronous using outbox=True (and outbox_size,
+        outbox_workers, spill_directory parameters)
         :param destination: ip of destination - where to send messages
         :param label_to_send: name of data aggregation to send
         """
@@ -148,6 +200,24 @@ class Pipeline:
 
     def run(self, timeout_timer: WiredTimer, failures_checker: ExecutionStatusChecker):
         """ Launch compiled action in current pipeline """
+        self.prepare_action(timeout_timer)
+        try:
+            self.action.execute_action(failures_checker)
+        finally:
+            self.action.close_stages()
+
+    async def run_async(self, timeout_timer: WiredTimer, failures_checker: ExecutionStatusChecker):
+        """ Launch compiled action in current pipeline as coroutine """
+        self.prepare_action(timeout_timer)
+        try:
+            await self.action.execute_action_async(failures_checker)
+        finally:
+            # Closing waits for launches and connections - it must not block the event loop
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.action.close_stages)
+
+    def prepare_action(self, timeout_timer: WiredTimer):
+        """ Pass shared objects into action before launch """
         common_message = f'Launch pipeline "{self.pipeline_name}"'
         if timeout_timer.execution_seconds is None:
             logger.info(common_message)
@@ -156,7 +226,6 @@ class Pipeline:
 
         self.action.db_connectors = self.db_connectors
         self.action.timeout_timer = timeout_timer
-        self.action.execute_action(failures_checker)
 
     def create_action(self):
         """
@@ -0,0 +1,77 @@
+import os
+import threading
+import weakref
+from typing import Any, Callable, Dict, Tuple
+
+
+class SharedResourcesRegistry:
+    """
+    Process-wide storage of resources (clients with connections and network
+    threads) which are shared between stages. Stages with the same
+    parameters use single resource. Resource is closed when the last stage
+    released it. Resources are not fork-safe, so child process starts with
+    empty registry and creates its own ones (resources of the parent are not
+    closed in the child)
+
+    :param factory: function to create resource from parameters of acquire call
+    :param close_resource: function to close resource which is not used anymore
+    """
+
+    def __init__(self, factory: Callable[..., Any], close_resource: Callable[[Any], None]):
+        self.factory = factory
+        self.close_resource = close_resource
+
+        self.lock = threading.Lock()
+        # Resource and number of stages which use it for each set of parameters
+        self.resources: Dict[Tuple, Tuple[Any, int]] = {}
+        _registries.add(self)
+
+    def acquire(self, *args, **kwargs) -> Any:
+        """ Return existing resource with desired parameters or create new one """
+        key = _define_key(args, kwargs)
+        with self.lock:
+            resource, references = self.resources.get(key, (None, 0))
+            if resource is None:
+                resource = self.factory(*args, **kwargs)
+            self.resources[key] = (resource, references + 1)
+        return resource
+
+    def release(self, *args, **kwargs):
+        """ Decrease number of resource usages and close it if it is not used anymore """
+        key = _define_key(args, kwargs)
+        with self.lock:
+            resource, references = self.resources.get(key, (None, 0))
+            if resource is None:
+                return None
+            if references > 1:
+                self.resources[key] = (resource, references - 1)
+                return None
+            del self.resources[key]
+        self.close_resource(resource)
+
+    def reset(self):
+        """ Forget all resources without closing them """
+        self.lock = threading.Lock()
+        self.resources = {}
+
+    def __len__(self):
+        with self.lock:
+            return len(self.resources)
+
+
+def _define_key(args: Tuple, kwargs: Dict) -> Tuple:
+    return args, tuple(sorted(kwargs.items()))
+
+
+# All registries of the process
+_registries = weakref.WeakSet()
+
+
+def _reset_registries_in_child():
+    # Threads of the parent (and locks which they hold) do not exist in the child process
+    for registry in list(_registries):
+        registry.reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_registries_in_child)
@@ -1,20 +1,27 @@
 import csv
+import io
+import time
 
 from pathlib import Path
-from typing import Any, Optional, Union, List, Dict
+from typing import Any, Optional, Union, List, Dict, IO
 
 from loguru import logger
 
 from wiredflow.main.actions.stages.storage_stage import StageStorageInterface
+from wiredflow.main.store_engines.preprocessors.index import RecordsIndex
 from wiredflow.main.store_engines.preprocessors.mapping import DataMapper, \
     read_csv_as_list_with_dict
 from wiredflow.main.store_engines.preprocessors.preprocessing import \
     Preprocessor
+from wiredflow.main.store_engines.preprocessors.streaming import \
+    StreamingLoadMixin, iterate_csv_as_dict
+from wiredflow.main.store_engines.preprocessors.window import \
+    is_window_requested, apply_window
 from wiredflow.main.synchronization import EventSynchronization
 from wiredflow.paths import get_tmp_folder_path
 
 
-class CSVStorageStage(StageStorageInterface):
+class CSVStorageStage(StreamingLoadMixin, StageStorageInterface):
     """ Connector to CSV file """
 
     def __init__(self, stage_id: str, use_threads: bool, **params):
@@ -32,6 +39,7 @@ class CSVStorageStage(StageStorageInterface):
         self.preprocessor = Preprocessor(params.get('preprocessing'))
         self.mapper = DataMapper(params.get('mapping'), self.db_path_file,
                                  mapper_mode='csv')
+        self.index = RecordsIndex(self.db_path_file)
 
         self.synchronizer = EventSynchronization(use_threads)
         self.synchronizer.initialize()
@@ -42,7 +50,26 @@ class CSVStorageStage(StageStorageInterface):
                      f' in {self.db_path_file}')
 
     def load(self, **kwargs):
+        """
+        Load data from CSV file
+
+        :param kwargs: additional parameters to request data. Supported:
+            - stream - if True, return generator which read rows lazily
+            instead of list with all records
+            - batch_size - if defined with stream, generator yields lists
+            with records instead of single records
+            - last_n - return only last N records
+            - since - return only records saved since desired moment
+            (datetime or UNIX timestamp)
+            - where - return only records with desired values (dictionary)
+            or records for which function returns True
+        """
         logger.debug(f'CSV info. Storage {self.stage_id} load data')
+        if kwargs.get('stream') is True:
+            return self._stream_file(**kwargs)
+        if is_window_requested(kwargs):
+            records = self._stream_file(**{**kwargs, 'batch_size': None})
+            return None if records is None else list(records)
         return self._access_to_file('read', **kwargs)
 
     def _access_to_file(self, mode: str, info_to_write: Optional = None, **read_kwargs):
@@ -66,20 +93,45 @@ class CSVStorageStage(StageStorageInterface):
             # Read file in a form of dictionary
             loaded_files = read_csv_as_list_with_dict(self.db_path_file)
 
-            read_kwargs['data'] = loaded_files
-            self.preprocessor.apply_during_load(**read_kwargs)
-            self.mapper.apply_during_load(**read_kwargs)
+            loaded_files = self._apply_load_hooks(loaded_files, **read_kwargs)
         else:
             # Save obtained data into the file
             info_to_write = self.preprocessor.apply_during_save(info_to_write)
+            number_of_new_records = len(info_to_write) if isinstance(info_to_write, list) else 1
             info_to_write = self.mapper.apply_during_save(info_to_write)
-            self._save_dict_into_file(info_to_write)
+            self._save_dict_into_file(info_to_write, number_of_new_records)
 
         self.synchronizer.release()
         return loaded_files
 
-    def _save_dict_into_file(self, info_to_write: Union[List, Dict]):
-        """ Save dictionary into json file """
+    def _iterate_file(self, fp: IO, size_limit: int, start_offset: int,
+                      batch_size: Optional[int] = None, **read_kwargs):
+        """
+        Read rows from opened file batch by batch. File is replaced (not
+        modified) during saving, so opened file remains unchanged till the
+        end of reading
+        """
+        records = apply_window(self._iterate_records(fp, start_offset),
+                               read_kwargs.get('where'), read_kwargs.get('last_n'))
+        yield from self._stream_records(records, batch_size, **read_kwargs)
+
+    @staticmethod
+    def _iterate_records(fp: IO, start_offset: int):
+        """ Read rows from opened (in binary mode) file starting from offset """
+        headers = None
+        if start_offset > 0:
+            header_line = fp.readline().decode('utf-8')
+            headers = next(csv.reader([header_line], delimiter=',', quotechar='|'))
+            fp.seek(start_offset)
+        yield from iterate_csv_as_dict(io.TextIOWrapper(fp, encoding='utf-8', newline=''), headers)
+
+    def _load_processors(self) -> List:
+        return [self.preprocessor, self.mapper]
+
+    def _save_dict_into_file(self, info_to_write: Union[List, Dict],
+                             number_of_new_records: int):
+        """ Save dictionary into csv file and update records index """
+        previous_timestamps = self.index.timestamps()
         self.__remove_old_file()
 
         # Prepare data for storage
@@ -92,12 +144,30 @@ class CSVStorageStage(StageStorageInterface):
             for dictionary in info_to_write:
                 data.append(list(dictionary.values()))
 
-        with open(self.db_path_file, 'w', encoding='UTF8', newline='') as f:
-            writer = csv.writer(f)
+        # Rows are written one by one to know position of each row
+        row_buffer = io.StringIO()
+        writer = csv.writer(row_buffer)
+
+        def encode_row(row: List) -> bytes:
+            row_buffer.seek(0)
+            row_buffer.truncate()
+            writer.writerow(row)
+            return row_buffer.getvalue().encode('utf-8')
 
+        offsets = []
+        with open(self.db_path_file, 'wb') as f:
             # write the header and data
-            writer.writerow(header)
-            writer.writerows(data)
+            f.write(encode_row(header))
+            for row in data:
+                offsets.append(f.tell())
+                f.write(encode_row(row))
+
+        number_of_old_records = max(len(data) - number_of_new_records, 0)
+        old_timestamps = previous_timestamps[-number_of_old_records:] if number_of_old_records > 0 else []
+        # Saving time is unknown for records which were not indexed
+        old_timestamps = [0.0] * (number_of_old_records - len(old_timestamps)) + old_timestamps
+        new_timestamps = [time.time()] * (len(data) - len(old_timestamps))
+        self.index.rewrite(offsets, old_timestamps + new_timestamps)
 
     def __remove_old_file(self):
         """ Remove old JSON file """
@@ -1,17 +1,24 @@
+import io
 import json
+import time
 from pathlib import Path
-from typing import Any, Optional, Union, List, Dict
+from typing import Any, Optional, Union, List, Dict, IO
 
 from loguru import logger
 
 from wiredflow.main.actions.stages.storage_stage import StageStorageInterface
+from wiredflow.main.store_engines.preprocessors.index import RecordsIndex
 from wiredflow.main.store_engines.preprocessors.mapping import DataMapper
 from wiredflow.main.store_engines.preprocessors.preprocessing import Preprocessor
+from wiredflow.main.store_engines.preprocessors.streaming import \
+    StreamingLoadMixin, iterate_json_items, iterate_json_array_tail
+from wiredflow.main.store_engines.preprocessors.window import \
+    is_window_requested, apply_window
 from wiredflow.main.synchronization import EventSynchronization
 from wiredflow.paths import get_tmp_folder_path
 
 
-class JSONStorageStage(StageStorageInterface):
+class JSONStorageStage(StreamingLoadMixin, StageStorageInterface):
     """ Connector to JSON file """
 
     def __init__(self, stage_id: str, use_threads: bool, **params):
@@ -28,6 +35,7 @@ class JSONStorageStage(StageStorageInterface):
 
         self.preprocessor = Preprocessor(params.get('preprocessing'))
         self.mapper = DataMapper(params.get('mapping'), self.db_path_file)
+        self.index = RecordsIndex(self.db_path_file)
 
         self.synchronizer = EventSynchronization(use_threads)
         self.synchronizer.initialize()
@@ -38,7 +46,26 @@ class JSONStorageStage(StageStorageInterface):
                      f' in {self.db_path_file}')
 
     def load(self, **kwargs):
+        """
+        Load data from JSON file
+
+        :param kwargs: additional parameters to request data. Supported:
+            - stream - if True, return generator which decode records lazily
+            instead of list with all records
+            - batch_size - if defined with stream, generator yields lists
+            with records instead of single records
+            - last_n - return only last N records
+            - since - return only records saved since desired moment
+            (datetime or UNIX timestamp)
+            - where - return only records with desired values (dictionary)
+            or records for which function returns True
+        """
         logger.debug(f'JSON info. Storage {self.stage_id} load data')
+        if kwargs.get('stream') is True:
+            return self._stream_file(**kwargs)
+        if is_window_requested(kwargs):
+            records = self._stream_file(**{**kwargs, 'batch_size': None})
+            return None if records is None else list(records)
         return self._access_to_file('read', **kwargs)
 
     def _access_to_file(self, mode: str, info_to_write: Optional = None, **read_kwargs):
@@ -62,23 +89,70 @@ class JSONStorageStage(StageStorageInterface):
             with open(self.db_path_file, 'r') as fp:
                 loaded_files = json.load(fp)
 
-            read_kwargs['data'] = loaded_files
-            self.preprocessor.apply_during_load(**read_kwargs)
-            self.mapper.apply_during_load(**read_kwargs)
+            loaded_files = self._apply_load_hooks(loaded_files, **read_kwargs)
         else:
             # Save obtained data into the file
             info_to_write = self.preprocessor.apply_during_save(info_to_write)
+            number_of_new_records = len(info_to_write) if isinstance(info_to_write, list) else 1
             info_to_write = self.mapper.apply_during_save(info_to_write)
-            self._save_dict_into_file(info_to_write)
+            self._save_dict_into_file(info_to_write, number_of_new_records)
 
         self.synchronizer.release()
         return loaded_files
 
-    def _save_dict_into_file(self, info_to_write: Union[List, Dict]):
-        """ Save dictionary into json file """
+    def _iterate_file(self, fp: IO, size_limit: int, start_offset: int,
+                      batch_size: Optional[int] = None, **read_kwargs):
+        """
+        Decode records from opened file batch by batch. File is replaced
+        (not modified) during saving, so opened file remains unchanged till
+        the end of reading
+        """
+        records = apply_window(self._iterate_records(fp, start_offset),
+                               read_kwargs.get('where'), read_kwargs.get('last_n'))
+        yield from self._stream_records(records, batch_size, **read_kwargs)
+
+    @staticmethod
+    def _iterate_records(fp: IO, start_offset: int):
+        """ Decode records from opened (in binary mode) file starting from offset """
+        if start_offset == 0:
+            yield from iterate_json_items(io.TextIOWrapper(fp, encoding='utf-8'))
+        else:
+            fp.seek(start_offset)
+            yield from iterate_json_array_tail(io.TextIOWrapper(fp, encoding='utf-8'))
+
+    def _load_processors(self) -> List:
+        return [self.preprocessor, self.mapper]
+
+    def _save_dict_into_file(self, info_to_write: Union[List, Dict],
+                             number_of_new_records: int):
+        """ Save dictionary into json file and update records index """
         self.__remove_old_file()
-        with open(self.db_path_file, 'w') as fp:
-            json.dump(info_to_write, fp)
+        if isinstance(info_to_write, list) is False:
+            with open(self.db_path_file, 'w') as fp:
+                json.dump(info_to_write, fp)
+            # Index can be applied only for list of records
+            self.index.remove()
+            return None
+
+        previous_timestamps = self.index.timestamps()
+
+        # Write records one by one to know position of each record
+        offsets = []
+        with open(self.db_path_file, 'wb') as fp:
+            fp.write(b'[')
+            for record_id, record in enumerate(info_to_write):
+                if record_id > 0:
+                    fp.write(b', ')
+                offsets.append(fp.tell())
+                fp.write(json.dumps(record).encode('utf-8'))
+            fp.write(b']')
+
+        number_of_old_records = len(info_to_write) - number_of_new_records
+        old_timestamps = previous_timestamps[-number_of_old_records:] if number_of_old_records > 0 else []
+        # Saving time is unknown for records which were not indexed
+        old_timestamps = [0.0] * (number_of_old_records - len(old_timestamps)) + old_timestamps
+        new_timestamps = [time.time()] * (len(info_to_write) - len(old_timestamps))
+        self.index.rewrite(offsets, old_timestamps + new_timestamps)
 
     def __remove_old_file(self):
         """ Remove old JSON file """
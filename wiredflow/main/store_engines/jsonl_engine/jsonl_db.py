@@ -0,0 +1,165 @@
+import json
+import time
+from pathlib import Path
+from typing import Any, Optional, Union, List, Dict, IO
+
+from loguru import logger
+
+from wiredflow.main.actions.stages.storage_stage import StageStorageInterface
+from wiredflow.main.store_engines.preprocessors.index import RecordsIndex
+from wiredflow.main.store_engines.preprocessors.preprocessing import Preprocessor
+from wiredflow.main.store_engines.preprocessors.streaming import StreamingLoadMixin
+from wiredflow.main.store_engines.preprocessors.window import \
+    is_window_requested, apply_window
+from wiredflow.main.synchronization import EventSynchronization
+from wiredflow.paths import get_tmp_folder_path
+
+
+class JSONLinesStorageStage(StreamingLoadMixin, StageStorageInterface):
+    """
+    Connector to JSON Lines file. Each record is stored as a separate line,
+    so new records are appended to the end of the file without reading
+    (and rewriting) already saved data
+    """
+
+    supported_mappings = ['extend', 'overwrite']
+
+    def __init__(self, stage_id: str, use_threads: bool, **params):
+        super().__init__(stage_id, use_threads, **params)
+        self.stage_id = stage_id
+        # Prepare local folder where there is a need to save jsonl file
+        if 'folder_to_save' in list(params.keys()):
+            self.db_path: Path = params['folder_to_save']
+        else:
+            self.db_path: Path = get_tmp_folder_path()
+        if self.db_path.is_dir() is False:
+            self.db_path.mkdir(parents=True, exist_ok=True)
+        self.db_path_file = Path(self.db_path, f'{self.stage_id}.jsonl')
+
+        self.preprocessor = Preprocessor(params.get('preprocessing'))
+        self.index = RecordsIndex(self.db_path_file)
+
+        self.mapping = params.get('mapping')
+        if self.mapping is None:
+            # Default value is extend
+            self.mapping = 'extend'
+        if self.mapping not in self.supported_mappings:
+            raise ValueError(f'JSON Lines storage does not support mapping "{self.mapping}". '
+                             f'Possible options: {self.supported_mappings}')
+
+        self.synchronizer = EventSynchronization(use_threads)
+        self.synchronizer.initialize()
+
+    def save(self, relevant_info: Any, **kwargs):
+        self._access_to_file('write', info_to_write=relevant_info)
+        logger.debug(f'JSON Lines info. Storage {self.stage_id} successfully save data'
+                     f' in {self.db_path_file}')
+
+    def load(self, **kwargs):
+        """
+        Load data from JSON Lines file
+
+        :param kwargs: additional parameters to request data. Supported:
+            - stream - if True, return generator which decode records lazily
+            instead of list with all records
+            - batch_size - if defined with stream, generator yields lists
+            with records instead of single records
+            - last_n - return only last N records
+            - since - return only records saved since desired moment
+            (datetime or UNIX timestamp)
+            - where - return only records with desired values (dictionary)
+            or records for which function returns True
+        """
+        logger.debug(f'JSON Lines info. Storage {self.stage_id} load data')
+        if kwargs.get('stream') is True:
+            return self._stream_file(**kwargs)
+        if is_window_requested(kwargs):
+            records = self._stream_file(**{**kwargs, 'batch_size': None})
+            return None if records is None else list(records)
+        return self._access_to_file('read', **kwargs)
+
+    def _access_to_file(self, mode: str, info_to_write: Optional = None, **read_kwargs):
+        """
+        Read or write to file with Lock protection
+
+        :param mode: name of mode (read or write)
+        :param info_to_write: dictionary to store information
+        :param read_kwargs: additional parameters to request data
+        """
+        # To avoid deadlock - synchronize thread during file storing or reading
+        self.synchronizer.wait()
+
+        loaded_files = None
+        if mode == 'read':
+            if self.db_path_file.is_file() is False:
+                # There are no saved data yet - return None
+                self.synchronizer.release()
+                return None
+
+            with open(self.db_path_file, 'rb') as fp:
+                loaded_files = list(self._iterate_records(fp))
+
+            loaded_files = self._apply_load_hooks(loaded_files, **read_kwargs)
+        else:
+            # Save obtained data into the file
+            info_to_write = self.preprocessor.apply_during_save(info_to_write)
+            self._append_into_file(info_to_write)
+
+        self.synchronizer.release()
+        return loaded_files
+
+    def _iterate_file(self, fp: IO, size_limit: int, start_offset: int,
+                      batch_size: Optional[int] = None, **read_kwargs):
+        """ Decode records from opened file batch by batch """
+        fp.seek(start_offset)
+        records = apply_window(self._iterate_records(fp, size_limit - start_offset),
+                               read_kwargs.get('where'), read_kwargs.get('last_n'))
+        yield from self._stream_records(records, batch_size, **read_kwargs)
+
+    @staticmethod
+    def _iterate_records(fp: IO, size_limit: Optional[int] = None):
+        """ Read opened (in binary mode) file line by line and decode each record """
+        read_bytes = 0
+        for line in fp:
+            read_bytes += len(line)
+            if size_limit is not None and read_bytes > size_limit:
+                break
+            if line.strip():
+                yield json.loads(line)
+
+    def _append_into_file(self, info_to_write: Union[List, Dict]):
+        """ Append records into the end of the file - one record per line """
+        if isinstance(info_to_write, list) is False:
+            info_to_write = [info_to_write]
+
+        if self.mapping == 'overwrite' and self.db_path_file.is_file():
+            # Replace file instead of truncation - readers which already
+            # opened old file can finish reading
+            self.db_path_file.unlink()
+            self.index.remove()
+
+        if self.db_path_file.is_file() and self.index.is_available() is False:
+            # File was created without index
+            self._create_index_for_existing_file()
+
+        lines = [f'{json.dumps(record)}\n'.encode('utf-8') for record in info_to_write]
+        with open(self.db_path_file, 'ab') as fp:
+            offset = fp.tell()
+            fp.write(b''.join(lines))
+
+        offsets = []
+        for line in lines:
+            offsets.append(offset)
+            offset += len(line)
+        self.index.append(offsets, time.time())
+
+    def _create_index_for_existing_file(self):
+        """ Index records from file. Saving time for such records is unknown """
+        offsets = []
+        offset = 0
+        with open(self.db_path_file, 'rb') as fp:
+            for line in fp:
+                if line.strip():
+                    offsets.append(offset)
+                offset += len(line)
+        self.index.rewrite(offsets, [0.0] * len(offsets))
@@ -0,0 +1,139 @@
+import bisect
+import time
+from collections import deque
+from typing import Any, List, Tuple, Union
+
+from loguru import logger
+
+from wiredflow.main.actions.stages.storage_stage import StageStorageInterface
+from wiredflow.main.store_engines.memory_engine.shared_buffer import SharedRingBuffer, DEFAULT_SLOT_SIZE
+from wiredflow.main.store_engines.preprocessors.preprocessing import Preprocessor
+from wiredflow.main.store_engines.preprocessors.streaming import StreamingLoadMixin
+from wiredflow.main.store_engines.preprocessors.window import apply_window, to_timestamp
+from wiredflow.main.synchronization import EventSynchronization
+
+# Default maximum number of records in the storage
+DEFAULT_MEMORY_CAPACITY = 10000
+
+
+class MemoryStorageStage(StreamingLoadMixin, StageStorageInterface):
+    """
+    Bounded in-memory storage for data exchange between pipelines of the
+    flow. Records are kept in the ring buffer: when the buffer is full, new
+    records replace the oldest ones. Data is not saved on disk, so it is lost
+    after flow finishes execution.
+
+    In threads mode records are stored as they are (without serialization),
+    so loaded records are the same objects which were saved and must not be
+    modified. In processes mode records are pickled into shared memory
+    segment with slots of fixed size
+    """
+
+    supported_mappings = ['extend', 'overwrite']
+
+    def __init__(self, stage_id: str, use_threads: bool, **params):
+        super().__init__(stage_id, use_threads, **params)
+        self.capacity = params.get('capacity', DEFAULT_MEMORY_CAPACITY)
+        if self.capacity is None or self.capacity < 1:
+            raise ValueError(f'Capacity of memory storage must be positive integer, got {self.capacity}')
+
+        self.preprocessor = Preprocessor(params.get('preprocessing'))
+        self.mapping = params.get('mapping')
+        if self.mapping is None:
+            # Default value is extend
+            self.mapping = 'extend'
+        if self.mapping not in self.supported_mappings:
+            raise ValueError(f'Memory storage does not support mapping "{self.mapping}". '
+                             f'Possible options: {self.supported_mappings}')
+
+        # Buffer with saving time and records
+        self.buffer: Union[deque, SharedRingBuffer]
+        if use_threads is True:
+            self.buffer = deque(maxlen=self.capacity)
+        else:
+            self.buffer = SharedRingBuffer(self.capacity, params.get('slot_size', DEFAULT_SLOT_SIZE))
+        # Is there at least one save call (threads mode). In processes mode
+        # the counter of written records in shared memory is used
+        self.is_saved = False
+
+        self.synchronizer = EventSynchronization(use_threads)
+        self.synchronizer.initialize()
+
+    def save(self, relevant_info: Any, **kwargs):
+        relevant_info = self.preprocessor.apply_during_save(relevant_info)
+        if isinstance(relevant_info, list) is False:
+            relevant_info = [relevant_info]
+
+        self.synchronizer.wait()
+        try:
+            if self.mapping == 'overwrite':
+                self.buffer.clear()
+            if self.use_threads is True:
+                saving_time = time.time()
+                self.buffer.extend((saving_time, record) for record in relevant_info)
+            else:
+                self.buffer.append(relevant_info, time.time())
+            self.is_saved = True
+        finally:
+            self.synchronizer.release()
+        logger.debug(f'Memory info. Storage {self.stage_id} successfully save data')
+
+    def load(self, **kwargs):
+        """
+        Load data from memory
+
+        :param kwargs: additional parameters to request data. Supported:
+            - stream - if True, return generator instead of list with all records
+            - batch_size - if defined with stream, generator yields lists
+            with records instead of single records
+            - last_n - return only last N records
+            - since - return only records saved since desired moment
+            (datetime or UNIX timestamp)
+            - where - return only records with desired values (dictionary)
+            or records for which function returns True
+        """
+        logger.debug(f'Memory info. Storage {self.stage_id} load data')
+        entries = self._take_entries(kwargs.get('last_n') if kwargs.get('where') is None else None)
+        if entries is None:
+            # There are no saved data yet - return None
+            return None
+
+        since = kwargs.get('since')
+        if since is not None:
+            start_id = bisect.bisect_left([saving_time for saving_time, _ in entries], to_timestamp(since))
+            entries = entries[start_id:]
+
+        records = (self._decode(record) for _, record in entries)
+        records = apply_window(records, kwargs.get('where'), kwargs.get('last_n'))
+        if kwargs.get('stream') is True:
+            return self._stream_records(records, **kwargs)
+        return self._apply_load_hooks(list(records), **kwargs)
+
+    def _take_entries(self, last_n: Union[int, None]) -> Union[List[Tuple[float, Any]], None]:
+        """ Copy saving time and records from the buffer under the lock """
+        self.synchronizer.wait()
+        try:
+            if self.use_threads is True:
+                if self.is_saved is False:
+                    return None
+                if last_n is None:
+                    return list(self.buffer)
+                if last_n < 1:
+                    return []
+                return list(self.buffer)[-last_n:]
+
+            if self.buffer.written_records == 0:
+                return None
+            return self.buffer.read(last_n)
+        finally:
+            self.synchronizer.release()
+
+    def _decode(self, record: Any) -> Any:
+        if self.use_threads is True:
+            return record
+        return self.buffer.decode(record)
+
+    def close(self):
+        """ Detach from shared memory segment. Data remains available for other processes """
+        if self.use_threads is False:
+            self.buffer.close()
@@ -0,0 +1,126 @@
+import atexit
+import os
+import pickle
+import struct
+from multiprocessing import shared_memory
+from typing import Any, List, Tuple, Union
+
+# Number of records ever written into the buffer (unsigned 64-bit integer)
+HEADER = struct.Struct('<Q')
+# Saving time and size of serialized record at the beginning of each slot
+SLOT_HEADER = struct.Struct('<dI')
+# Default maximum size of single serialized record (with slot header) in bytes
+DEFAULT_SLOT_SIZE = 4096
+
+
+class SharedRingBuffer:
+    """
+    Ring buffer in shared memory segment which can be used by several
+    processes. Memory is divided into slots of equal size - each record is
+    serialized (pickled) into its own slot, so append takes constant time.
+    When the buffer is full, new records overwrite the oldest ones.
+    Buffer does not synchronize access - it must be done by the caller.
+
+    Segment is created by the process which created the buffer object and
+    removed when this process finishes. Other processes attach to the segment
+    by name if the buffer was passed to them by pickling
+
+    :param capacity: maximum number of records in the buffer
+    :param slot_size: maximum size of single serialized record in bytes
+    """
+
+    def __init__(self, capacity: int, slot_size: int = DEFAULT_SLOT_SIZE):
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self.memory = shared_memory.SharedMemory(create=True, size=HEADER.size + capacity * slot_size)
+        self.name = self.memory.name
+        self.owner_pid = os.getpid()
+        HEADER.pack_into(self.memory.buf, 0, 0)
+        atexit.register(self.unlink)
+
+    @property
+    def view(self) -> memoryview:
+        """ Content of the segment. Process attaches to the segment during first usage """
+        if self.memory is None:
+            self.memory = shared_memory.SharedMemory(name=self.name)
+        return self.memory.buf
+
+    @property
+    def written_records(self) -> int:
+        """ Number of records written into the buffer since creation (or clearing) """
+        return HEADER.unpack_from(self.view, 0)[0]
+
+    def __len__(self):
+        return min(self.written_records, self.capacity)
+
+    def append(self, records: List[Any], timestamp: float):
+        """ Serialize records and write them into next slots """
+        payloads = [pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL) for record in records]
+        for payload in payloads:
+            if SLOT_HEADER.size + len(payload) > self.slot_size:
+                raise ValueError(f'Record size ({len(payload)} bytes) exceeds slot size of shared memory '
+                                 f'buffer. Increase "slot_size" parameter of the storage')
+
+        view = self.view
+        written_records = self.written_records
+        for payload in payloads:
+            offset = self._slot_offset(written_records)
+            SLOT_HEADER.pack_into(view, offset, timestamp, len(payload))
+            start = offset + SLOT_HEADER.size
+            view[start: start + len(payload)] = payload
+            written_records += 1
+        # Records become visible for readers only after counter update
+        HEADER.pack_into(view, 0, written_records)
+
+    def clear(self):
+        HEADER.pack_into(self.view, 0, 0)
+
+    def read(self, last_n: Union[int, None] = None) -> List[Tuple[float, bytes]]:
+        """
+        Copy serialized records (from the oldest to the newest) with their
+        saving time. Records are decoded by decode method
+        """
+        written_records = self.written_records
+        number_of_records = min(written_records, self.capacity)
+        if last_n is not None:
+            number_of_records = min(number_of_records, max(last_n, 0))
+
+        view = self.view
+        entries = []
+        for record_id in range(written_records - number_of_records, written_records):
+            offset = self._slot_offset(record_id)
+            timestamp, size = SLOT_HEADER.unpack_from(view, offset)
+            start = offset + SLOT_HEADER.size
+            entries.append((timestamp, bytes(view[start: start + size])))
+        return entries
+
+    @staticmethod
+    def decode(payload: bytes) -> Any:
+        return pickle.loads(payload)
+
+    def _slot_offset(self, record_id: int) -> int:
+        return HEADER.size + (record_id % self.capacity) * self.slot_size
+
+    def close(self):
+        """ Detach from the segment in current process """
+        if self.memory is not None:
+            self.memory.close()
+            self.memory = None
+
+    def unlink(self):
+        """ Remove the segment. Only process which created the buffer can do it """
+        if os.getpid() != self.owner_pid:
+            return None
+        atexit.unregister(self.unlink)
+        if self.memory is None:
+            self.memory = shared_memory.SharedMemory(name=self.name)
+        self.memory.close()
+        self.memory.unlink()
+        self.memory = None
+
+    def __getstate__(self):
+        # Segment is attached again by name in another process
+        state = self.__dict__.copy()
+        state['memory'] = None
+        return state
+
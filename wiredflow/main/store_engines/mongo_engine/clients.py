@@ -0,0 +1,27 @@
+from typing import Optional
+
+from loguru import logger
+from pymongo import MongoClient
+
+from wiredflow.main.registry import SharedResourcesRegistry
+
+
+def create_client(source: str, username: Optional[str], password: Optional[str],
+                  max_pool_size: Optional[int] = None) -> MongoClient:
+    """ Create MongoDB client. Each client owns connections pool and monitoring threads """
+    params = {} if max_pool_size is None else {'maxPoolSize': max_pool_size}
+    client = MongoClient(source, username=username, password=password, **params)
+    logger.debug(f'MongoDB info. Create new client for {source}')
+    return client
+
+
+def close_client(client: MongoClient):
+    client.close()
+
+
+_registry = SharedResourcesRegistry(create_client, close_client)
+
+
+def get_clients_registry() -> SharedResourcesRegistry:
+    """ Return registry of MongoDB clients for current process """
+    return _registry
@@ -1,16 +1,47 @@
-from pymongo import MongoClient, WriteConcern
+import os
+import threading
+import time
+from datetime import datetime, timezone
 
-from typing import Any, Union, List
+from bson import ObjectId
+from pymongo import WriteConcern, ASCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from typing import Any, Union, List, Dict
 
 from loguru import logger
 
 from wiredflow.main.actions.stages.storage_stage import StageStorageInterface
+from wiredflow.main.store_engines.mongo_engine.clients import get_clients_registry
 from wiredflow.main.store_engines.preprocessors.preprocessing import \
     Preprocessor
+from wiredflow.main.store_engines.preprocessors.window import to_timestamp
+
+
+# Code of MongoDB error for documents which violate unique index
+DUPLICATE_KEY_ERROR_CODE = 11000
 
 
 class MongoStorageStage(StageStorageInterface):
-    """ Connector to MongoDB file """
+    """
+    Connector to MongoDB. Documents can be accumulated in the buffer and
+    inserted by single unordered request when the buffer is full or flush
+    interval expired. Stages with the same connection parameters share
+    single client (and connections pool) within the process. Client is
+    requested during the first access to the database, so stages can be
+    passed into another process before usage. Supported parameters:
+        - max_pool_size - maximum number of connections in the pool of the
+        client (default is defined by pymongo)
+        - index_field - fields for unique index. Index is created once
+        before the first insertion. Documents which violate the index are skipped
+        - buffer_size - number of documents to accumulate before insertion
+        (default 1 - insert immediately)
+        - flush_interval_seconds - maximum number of seconds to keep
+        documents in the buffer
+        - write_concern - dictionary with write concern options, for
+        example {'w': 'majority'} or {'w': 0}. If not defined - default
+        write concern of the client is used
+    """
 
     def __init__(self, stage_id: str, use_threads: bool, **params):
         super().__init__(stage_id, use_threads, **params)
@@ -38,47 +69,212 @@ class MongoStorageStage(StageStorageInterface):
         if self.source is None:
             self.source = 'mongodb://localhost:27017'
 
-        # Connect to desired database
-        client = MongoClient(self.source, username=self.username, password=self.password)
-        self.db = client[self.database_name]
+        # Client is shared between stages and created during the first usage
+        self.max_pool_size = params.get('max_pool_size')
+        self._db = None
+        # Process where client was acquired
+        self._client_pid = None
+        self.client_lock = threading.Lock()
 
         self.preprocessor = Preprocessor(params.get('preprocessing'))
 
         # Get fields which can be used for indexation
         self.index_field: Union[List[tuple], None] = params.get('index_field')
+        # Index is created only once per stage (per process)
+        self.is_index_created = False
+
+        write_concern: Union[Dict, None] = params.get('write_concern')
+        self.write_concern = None if write_concern is None else WriteConcern(**write_concern)
+
+        # Parameters of documents accumulation
+        self.buffer_size = max(params.get('buffer_size', 1), 1)
+        self.flush_interval_seconds = params.get('flush_interval_seconds')
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.flush_timer: Union[threading.Timer, None] = None
+        # Exception which arisen during flush by timer
+        self.failure: Union[Exception, None] = None
+
+    @property
+    def db(self):
+        """ Database object. Client is taken from the registry of current process """
+        with self.client_lock:
+            if self._db is None or self._client_pid != os.getpid():
+                client = get_clients_registry().acquire(self.source, self.username, self.password,
+                                                        self.max_pool_size)
+                self._db = client[self.database_name]
+                self._client_pid = os.getpid()
+            return self._db
+
+    @property
+    def collection(self):
+        collection = self.db[self.collection_name]
+        if self.write_concern is not None:
+            collection = collection.with_options(write_concern=self.write_concern)
+        return collection
 
     def save(self, relevant_info: Any, **kwargs):
-        """ Add new document to collection """
+        """ Add new documents to the buffer and insert them if the buffer is full """
+        if self.failure is not None:
+            # Flush in background failed
+            failure, self.failure = self.failure, None
+            raise failure
+
         relevant_info = self.preprocessor.apply_during_save(relevant_info)
+        if isinstance(relevant_info, dict):
+            relevant_info = [relevant_info]
+        elif isinstance(relevant_info, list) is False:
+            return None
 
-        # Insert new item to database
-        collection = self.db[self.collection_name]
+        with self.lock:
+            self.buffer.extend(relevant_info)
+            if len(self.buffer) < self.buffer_size:
+                self._start_flush_timer()
+                return None
+            documents = self._take_buffer()
+        self._insert_documents(documents)
+
+    def flush(self):
+        """ Insert all documents from the buffer into collection """
+        with self.lock:
+            documents = self._take_buffer()
+        self._insert_documents(documents)
+
+    def close(self):
+        """
+        Insert remaining documents and release the client. Called when
+        pipeline finishes execution
+        """
+        try:
+            self.flush()
+        finally:
+            with self.client_lock:
+                if self._client_pid == os.getpid():
+                    get_clients_registry().release(self.source, self.username, self.password,
+                                                   self.max_pool_size)
+                self._db = None
+                self._client_pid = None
+
+    def __getstate__(self):
+        # Client, lock and timer can not be transferred into another process
+        state = self.__dict__.copy()
+        state['_db'] = None
+        state['_client_pid'] = None
+        state['lock'] = None
+        state['client_lock'] = None
+        state['flush_timer'] = None
+        return state
 
-        if self.index_field is not None:
-            # Set index
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+        self.client_lock = threading.Lock()
+
+    def _take_buffer(self) -> List[Dict]:
+        """ Return accumulated documents and clear the buffer. Must be called under the lock """
+        documents, self.buffer = self.buffer, []
+        if self.flush_timer is not None:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+        return documents
+
+    def _start_flush_timer(self):
+        if self.flush_interval_seconds is None or self.flush_timer is not None or len(self.buffer) == 0:
+            return None
+        self.flush_timer = threading.Timer(self.flush_interval_seconds, self._flush_by_timer)
+        self.flush_timer.daemon = True
+        self.flush_timer.start()
+
+    def _flush_by_timer(self):
+        with self.lock:
+            # Timer is not relevant anymore if the buffer was already taken
+            if self.flush_timer is None or self.flush_timer is not threading.current_thread():
+                return None
+            self.flush_timer = None
+            documents, self.buffer = self.buffer, []
+        try:
+            self._insert_documents(documents)
+        except Exception as ex:
+            logger.warning(f'MongoDB info. Failed to insert documents by timer: {ex}')
+            self.failure = ex
+
+    def _insert_documents(self, documents: List[Dict]):
+        """ Insert documents with single unordered request """
+        if len(documents) == 0:
+            return None
+
+        collection = self.collection
+        if self.index_field is not None and self.is_index_created is False:
             collection.create_index(self.index_field, unique=True)
+            self.is_index_created = True
 
-        if isinstance(relevant_info, dict):
-            # Insert single dictionary
-            if self.index_field is not None:
-                collection.with_options(write_concern=WriteConcern(w=0)).insert_one(relevant_info)
+        start_time = time.perf_counter()
+        try:
+            if len(documents) == 1:
+                collection.insert_one(documents[0])
             else:
-                collection.insert_one(relevant_info)
-        elif isinstance(relevant_info, list):
-            # Insert several elements at once
-            if self.index_field is not None:
-                collection.with_options(write_concern=WriteConcern(w=0)).insert_many(relevant_info,
-                                                                                     ordered=False)
-            else:
-                collection.insert_many(relevant_info)
+                # Unordered insertion continues after failed documents
+                collection.insert_many(documents, ordered=False)
+        except DuplicateKeyError:
+            logger.debug(f'MongoDB info. Document already exists in collection "{self.collection_name}"')
+        except BulkWriteError as ex:
+            errors = ex.details.get('writeErrors', [])
+            if any(error.get('code') != DUPLICATE_KEY_ERROR_CODE for error in errors) or \
+                    len(ex.details.get('writeConcernErrors', [])) > 0:
+                raise
+            logger.debug(f'MongoDB info. {len(errors)} documents already exist in collection '
+                         f'"{self.collection_name}"')
 
-        logger.debug(f'MongoDB info. Successfully save data into database '
-                     f'"{self.database_name}" collection "{self.collection_name}"')
+        logger.debug(f'MongoDB info. Successfully save {len(documents)} documents into database '
+                     f'"{self.database_name}" collection "{self.collection_name}" '
+                     f'in {time.perf_counter() - start_time:.3f} seconds')
 
     def load(self, **kwargs):
+        """
+        Request documents from collection. All filters are applied on
+        the database side
+
+        :param kwargs: additional parameters to request data. Supported:
+            - last_n - return only last N inserted documents
+            - since - return only documents inserted since desired moment
+            (datetime or UNIX timestamp). Generation time of "_id" is used
+            - where - dictionary with MongoDB query
+            - projection - fields to return
+        :return: cursor which fetches documents lazily during iteration (in
+        order of insertion if "since" or "last_n" is defined) or None if
+        collection does not exist
+        """
+        # Documents from the buffer must be available for reading
+        self.flush()
+
         list_of_collections = self.db.list_collection_names()
         if self.collection_name not in list_of_collections:
             # Current collection does not exist
             return None
 
-        return self.db[self.collection_name].find()
+        where = kwargs.get('where')
+        if where is not None and isinstance(where, dict) is False:
+            raise ValueError(f'MongoDB storage supports only dictionaries as "where" '
+                             f'parameter, got {type(where)}')
+
+        query = {} if where is None else where
+        since = kwargs.get('since')
+        if since is not None:
+            since_datetime = datetime.fromtimestamp(to_timestamp(since), tz=timezone.utc)
+            since_condition = {'_id': {'$gte': ObjectId.from_datetime(since_datetime)}}
+            query = since_condition if len(query) == 0 else {'$and': [query, since_condition]}
+
+        last_n = kwargs.get('last_n')
+        collection = self.db[self.collection_name]
+        if last_n is not None and last_n < 1:
+            # Every document has "_id" field, so the cursor is empty
+            query = {'_id': {'$exists': False}}
+        cursor = collection.find(query, kwargs.get('projection'))
+        if last_n is None or last_n < 1:
+            if since is not None:
+                cursor = cursor.sort('_id', ASCENDING)
+            return cursor
+
+        # Skip all documents except the last ones to keep order of insertion
+        number_of_documents = collection.count_documents(query)
+        return cursor.sort('_id', ASCENDING).skip(max(number_of_documents - last_n, 0)).limit(last_n)
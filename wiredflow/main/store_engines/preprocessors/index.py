@@ -0,0 +1,86 @@
+import struct
+from pathlib import Path
+from typing import List, Union
+
+
+class RecordsIndex:
+    """
+    Sidecar file for local file storages. Contains byte offset and saving
+    timestamp of each record in the storage file. Allows to find the position
+    of last N records (or records saved since desired moment) without
+    scanning of the storage file
+
+    :param db_path_file: path to the file with data
+    """
+    # Byte offset of the record and UNIX timestamp of saving
+    entry = struct.Struct('<qd')
+
+    def __init__(self, db_path_file: Path):
+        self.index_path = db_path_file.with_name(f'{db_path_file.name}.idx')
+
+    def is_available(self) -> bool:
+        return self.index_path.is_file()
+
+    def number_of_records(self) -> int:
+        if self.is_available() is False:
+            return 0
+        return self.index_path.stat().st_size // self.entry.size
+
+    def append(self, offsets: List[int], timestamp: float):
+        """ Add information about new records into the end of the index """
+        with open(self.index_path, 'ab') as fp:
+            fp.write(b''.join(self.entry.pack(offset, timestamp) for offset in offsets))
+
+    def rewrite(self, offsets: List[int], timestamps: List[float]):
+        """ Create index from scratch """
+        with open(self.index_path, 'wb') as fp:
+            fp.write(b''.join(self.entry.pack(offset, timestamp)
+                              for offset, timestamp in zip(offsets, timestamps)))
+
+    def timestamps(self) -> List[float]:
+        """ Return saving timestamps for all indexed records """
+        if self.is_available() is False:
+            return []
+        with open(self.index_path, 'rb') as fp:
+            return [timestamp for _, timestamp in self.entry.iter_unpack(fp.read())]
+
+    def remove(self):
+        if self.is_available():
+            self.index_path.unlink()
+
+    def offset_of_last(self, last_n: int) -> Union[int, None]:
+        """ Return byte offset of the first record among last N records """
+        number_of_records = self.number_of_records()
+        if number_of_records == 0:
+            return None
+
+        with open(self.index_path, 'rb') as fp:
+            offset, _ = self._read_entry(fp, max(number_of_records - last_n, 0))
+        return offset
+
+    def offset_since(self, since_timestamp: float) -> Union[int, None]:
+        """
+        Return byte offset of the first record which was saved not earlier
+        than desired timestamp. Binary search is used because records are
+        always indexed in order of saving
+        """
+        number_of_records = self.number_of_records()
+        with open(self.index_path, 'rb') as fp:
+            left, right = 0, number_of_records
+            while left < right:
+                middle = (left + right) // 2
+                _, timestamp = self._read_entry(fp, middle)
+                if timestamp < since_timestamp:
+                    left = middle + 1
+                else:
+                    right = middle
+
+            if left == number_of_records:
+                # There are no such records
+                return None
+            offset, _ = self._read_entry(fp, left)
+        return offset
+
+    def _read_entry(self, fp, entry_id: int):
+        fp.seek(entry_id * self.entry.size)
+        return self.entry.unpack(fp.read(self.entry.size))
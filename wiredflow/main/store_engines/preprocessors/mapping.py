@@ -1,27 +1,14 @@
 import json
-import csv
 from pathlib import Path
 from typing import Union, Dict, List
 
+from wiredflow.main.store_engines.preprocessors.streaming import iterate_csv_as_dict
+
 
 def read_csv_as_list_with_dict(db_path_file: Path) -> List[Dict]:
     """ Read csv file as list with dictionary or dictionaries """
-    json_data = []
     with open(db_path_file, newline='') as csvfile:
-        csv_reader = csv.reader(csvfile, delimiter=',', quotechar='|')
-
-        # Convert list structure into dictionary
-        data = [row for row in csv_reader]
-        headers = data[0]
-        for batch_id in range(1, len(data)):
-            data_batch = data[batch_id]
-            dictionary_to_add = {}
-            for column_id, header in enumerate(headers):
-                dictionary_to_add.update({header: data_batch[column_id]})
-
-            json_data.append(dictionary_to_add)
-
-    return json_data
+        return list(iterate_csv_as_dict(csvfile))
 
 
 def update_json(db_path_file: Path, info_to_write: Union[Dict, List]):
@@ -0,0 +1,190 @@
+import csv
+import json
+import os
+from typing import Iterable, Iterator, IO, Any, List, Dict, Optional
+
+from wiredflow.main.store_engines.preprocessors.window import define_start_offset
+
+# Number of records which are processed at once during streaming reading
+# when the batch size was not defined
+DEFAULT_STREAM_BATCH_SIZE = 1000
+# Number of characters to read from JSON file at once
+JSON_READ_CHUNK_SIZE = 65536
+
+
+class StreamingLoadMixin:
+    """
+    Common part of lazy reading for storages. Storage must define
+    "preprocessor" and "synchronizer" attributes. File storages also define
+    "db_path_file", "index" and method "_iterate_file" which decodes records
+    from the opened file
+    """
+
+    def _stream_file(self, **read_kwargs):
+        """ Return generator which reads the file lazily or None if there are no saved data yet """
+        if self.db_path_file.is_file() is False:
+            return None
+        return self._read_file(**read_kwargs)
+
+    def _read_file(self, **read_kwargs):
+        """
+        Open file with Lock protection when iteration starts and decode
+        records. Generator owns the file, so it is closed even if the caller
+        stops iteration early
+        """
+        self.synchronizer.wait()
+        try:
+            if self.db_path_file.is_file() is False:
+                # File was removed after the load call
+                return None
+            start_offset = define_start_offset(self.index, **read_kwargs)
+            if start_offset is None:
+                # There are no suitable records
+                return None
+            fp = open(self.db_path_file, 'rb')
+            # Records appended after this moment are not included into reading
+            size_limit = os.fstat(fp.fileno()).st_size
+        finally:
+            self.synchronizer.release()
+
+        with fp:
+            yield from self._iterate_file(fp, size_limit, start_offset, **read_kwargs)
+
+    def _iterate_file(self, fp: IO, size_limit: int, start_offset: int,
+                      batch_size: Optional[int] = None, **read_kwargs):
+        raise NotImplementedError()
+
+    def _stream_records(self, records: Iterable, batch_size: Optional[int] = None, **read_kwargs):
+        """ Apply load hooks to records batch by batch and yield records or batches """
+        chunk_size = DEFAULT_STREAM_BATCH_SIZE if batch_size is None else batch_size
+        for batch in split_into_batches(records, chunk_size):
+            batch = self._apply_load_hooks(batch, **read_kwargs)
+            if batch_size is None:
+                yield from batch
+            else:
+                yield batch
+
+    def _apply_load_hooks(self, data: Any, **read_kwargs):
+        """ Launch preprocessor (and mapper) procedures for loaded data """
+        read_kwargs['data'] = data
+        for processor in self._load_processors():
+            read_kwargs = processor.apply_during_load(**read_kwargs)
+        return read_kwargs['data']
+
+    def _load_processors(self) -> List:
+        return [self.preprocessor]
+
+
+def split_into_batches(records: Iterable, batch_size: int) -> Iterator[List]:
+    """ Group records from iterable into lists with desired size """
+    if batch_size is None or batch_size < 1:
+        raise ValueError(f'Batch size must be positive integer, got {batch_size}')
+
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if len(batch) > 0:
+        yield batch
+
+
+def iterate_csv_as_dict(csv_file: IO, headers: Optional[List[str]] = None) -> Iterator[Dict]:
+    """
+    Read opened csv file row by row and convert each row into dictionary.
+    If headers are not defined - first row of the file is used as header
+    """
+    csv_reader = csv.reader(csv_file, delimiter=',', quotechar='|')
+    if headers is None:
+        headers = next(csv_reader, None)
+    if headers is None:
+        # File is empty
+        return None
+
+    for data_batch in csv_reader:
+        dictionary_to_add = {}
+        for column_id, header in enumerate(headers):
+            dictionary_to_add.update({header: data_batch[column_id]})
+        yield dictionary_to_add
+
+
+def iterate_json_items(json_file: IO, chunk_size: int = JSON_READ_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Incrementally decode elements of JSON array from opened file. Only one
+    chunk of the file (and currently decoded element) is kept in memory.
+    If the file contains not an array but single object - it is returned
+    as the only element
+    """
+    buffer = json_file.read(chunk_size)
+    position = _skip_separators(buffer, 0, separators=' \t\n\r')
+    while position >= len(buffer):
+        more_data = json_file.read(chunk_size)
+        if not more_data:
+            # File is empty
+            return None
+        buffer = more_data
+        position = _skip_separators(buffer, 0, separators=' \t\n\r')
+
+    if buffer[position] != '[':
+        # Not a list - there is a need to decode whole document
+        yield json.loads(buffer[position:] + json_file.read())
+        return None
+
+    yield from _iterate_array_elements(json_file, buffer, position + 1, chunk_size)
+
+
+def iterate_json_array_tail(json_file: IO, chunk_size: int = JSON_READ_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Incrementally decode elements of JSON array starting from the current
+    position of opened file. Position must point to the beginning of
+    the array element
+    """
+    yield from _iterate_array_elements(json_file, '', 0, chunk_size)
+
+
+def _iterate_array_elements(json_file: IO, buffer: str, position: int, chunk_size: int):
+    """ Decode array elements till the end of the array """
+    decoder = json.JSONDecoder()
+    while True:
+        position = _skip_separators(buffer, position, separators=' \t\n\r,')
+        if position >= len(buffer):
+            more_data = json_file.read(chunk_size)
+            if not more_data:
+                raise ValueError('Unexpected end of JSON array during streaming reading')
+            buffer, position = buffer[position:] + more_data, 0
+            continue
+
+        if buffer[position] == ']':
+            # End of the array
+            return None
+
+        try:
+            item, end_position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # Element was not read completely - extend buffer
+            more_data = json_file.read(chunk_size)
+            if not more_data:
+                raise
+            buffer, position = buffer[position:] + more_data, 0
+            continue
+
+        if end_position == len(buffer):
+            # Numbers and literals at the end of the buffer can be truncated
+            more_data = json_file.read(chunk_size)
+            if more_data:
+                buffer, position = buffer[position:] + more_data, 0
+                continue
+
+        yield item
+        position = end_position
+        if position > chunk_size:
+            # Remove already processed part of the buffer
+            buffer, position = buffer[position:], 0
+
+
+def _skip_separators(buffer: str, position: int, separators: str) -> int:
+    while position < len(buffer) and buffer[position] in separators:
+        position += 1
+    return position
@@ -0,0 +1,82 @@
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Union
+
+from wiredflow.main.store_engines.preprocessors.index import RecordsIndex
+
+# Parameters of load method which define the part of records to read
+WINDOW_PARAMETERS = ('last_n', 'since', 'where')
+
+
+def is_window_requested(read_kwargs: Dict) -> bool:
+    """ Check if only part of stored records was requested """
+    return any(read_kwargs.get(parameter) is not None for parameter in WINDOW_PARAMETERS)
+
+
+def to_timestamp(since: Union[datetime, float, int]) -> float:
+    """ Convert moment of time into UNIX timestamp """
+    if isinstance(since, datetime):
+        return since.timestamp()
+    return float(since)
+
+
+def is_record_suitable(record: Any, where: Union[Dict, Callable, None]) -> bool:
+    """
+    Check if record satisfies the condition. Condition can be a dictionary
+    with desired values for keys or function which returns True or False
+    """
+    if where is None:
+        return True
+    if callable(where):
+        return where(record)
+
+    if isinstance(record, dict) is False:
+        return False
+    return all(key in record and record[key] == value for key, value in where.items())
+
+
+def apply_window(records: Iterable, where: Union[Dict, Callable, None] = None,
+                 last_n: Union[int, None] = None) -> Iterable:
+    """
+    Filter records by condition and keep only last N of them.
+    Only last N records are kept in memory during processing
+    """
+    if where is not None:
+        records = (record for record in records if is_record_suitable(record, where))
+
+    if last_n is not None:
+        records = deque(records, maxlen=last_n)
+    return records
+
+
+def define_start_offset(index: RecordsIndex, last_n: Union[int, None] = None,
+                        since: Union[datetime, float, int, None] = None,
+                        where: Union[Dict, Callable, None] = None, **kwargs) -> Union[int, None]:
+    """
+    Define byte offset in the storage file from which there is a need to read
+    records. Return 0 if the whole file must be scanned and None if there are
+    no suitable records at all. If there is no index (file was created by
+    previous versions and nothing was saved since that time), saving time of
+    records is unknown, so "since" condition can not be applied
+    """
+    if last_n is not None and last_n < 1:
+        return None
+
+    if index.is_available() is False:
+        if since is not None:
+            raise ValueError(f'Records can not be filtered by saving time: index file {index.index_path} '
+                             f'is missing. Index is created during the next saving into storage')
+        return 0
+
+    start_offset = 0
+    if since is not None:
+        start_offset = index.offset_since(to_timestamp(since))
+        if start_offset is None:
+            return None
+
+    if last_n is not None and where is None:
+        # Without additional conditions last records can be found using index
+        last_offset = index.offset_of_last(last_n)
+        if last_offset is not None:
+            start_offset = max(start_offset, last_offset)
+    return start_offset
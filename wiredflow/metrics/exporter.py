@@ -0,0 +1,197 @@
+import math
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Union
+
+from loguru import logger
+
+from wiredflow.metrics.metric import Statistics, get_statistics
+from wiredflow.settings import METRICS_PUSH_SECONDS
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def format_prometheus(snapshot: Dict[str, List[Dict]]) -> str:
+    """ Convert snapshot of metrics into Prometheus text exposition format """
+    lines = []
+    _format_simple_metrics(lines, snapshot.get('counters', []), 'counter')
+    _format_simple_metrics(lines, snapshot.get('gauges', []), 'gauge')
+
+    for name, metrics in _group_by_name(snapshot.get('histograms', [])).items():
+        lines.append(f'# TYPE {name} histogram')
+        for metric in metrics:
+            histogram = metric['value']
+            cumulative_count = 0
+            for upper_bound, count in zip(histogram['buckets'], histogram['counts']):
+                cumulative_count += count
+                labels = _format_labels({**metric['labels'], 'le': _format_value(upper_bound)})
+                lines.append(f'{name}_bucket{labels} {cumulative_count}')
+            labels = _format_labels({**metric['labels'], 'le': '+Inf'})
+            lines.append(f'{name}_bucket{labels} {histogram["count"]}')
+
+            labels = _format_labels(metric['labels'])
+            lines.append(f'{name}_sum{labels} {_format_value(histogram["sum"])}')
+            lines.append(f'{name}_count{labels} {histogram["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsAggregator:
+    """
+    Storage of metrics snapshots obtained from several processes. Lives in
+    the manager process when pipelines are launched in processes
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshots = {}
+
+    def update(self, source: str, snapshot: Dict[str, List[Dict]]):
+        """ Replace snapshot from desired source (process) with new one """
+        with self.lock:
+            self.snapshots[source] = snapshot
+
+    def snapshot(self) -> Dict[str, List[Dict]]:
+        """ Return combined snapshot from all sources """
+        statistics = Statistics()
+        with self.lock:
+            snapshots = list(self.snapshots.values())
+        for snapshot in snapshots:
+            statistics.merge(snapshot)
+        return statistics.snapshot()
+
+
+class MetricsPublisher:
+    """
+    Periodically send metrics of current process to aggregator in the
+    separate thread
+
+    :param aggregator: aggregator object or AutoProxy
+    :param push_seconds: period of sending
+    """
+
+    def __init__(self, aggregator: MetricsAggregator, push_seconds: float = METRICS_PUSH_SECONDS):
+        self.aggregator = aggregator
+        self.push_seconds = push_seconds
+        self.source = str(os.getpid())
+        self.stop_event = threading.Event()
+        self.thread: Union[threading.Thread, None] = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._publish_periodically, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """ Stop sending and send final state of metrics """
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.publish()
+
+    def publish(self):
+        try:
+            self.aggregator.update(self.source, get_statistics().snapshot())
+        except Exception as ex:
+            logger.warning(f'Failed to send metrics of process {self.source}: {ex}')
+
+    def _publish_periodically(self):
+        while self.stop_event.wait(self.push_seconds) is False:
+            self.publish()
+
+
+class MetricsExporter:
+    """
+    HTTP server with /metrics endpoint for Prometheus. Works in the
+    separate thread
+
+    :param port: port to listen
+    :param host: address to listen
+    :param snapshot_provider: function which returns snapshot of metrics.
+    If not defined - metrics of current process are used
+    """
+
+    def __init__(self, port: int, host: str = '0.0.0.0',
+                 snapshot_provider: Union[Callable, None] = None):
+        self.port = port
+        self.host = host
+        self.snapshot_provider = snapshot_provider
+        if self.snapshot_provider is None:
+            self.snapshot_provider = lambda: get_statistics().snapshot()
+
+        self.server: Union[ThreadingHTTPServer, None] = None
+        self.thread: Union[threading.Thread, None] = None
+
+    def start(self):
+        handler = _create_handler(self.snapshot_provider)
+        self.server = ThreadingHTTPServer((self.host, self.port), handler)
+        self.server.daemon_threads = True
+        # Port can be chosen by the operating system if it is 0
+        self.port = self.server.server_port
+
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info(f'Metrics are available on http://{self.host}:{self.port}/metrics')
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+
+def _create_handler(snapshot_provider: Callable):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """ Return metrics in Prometheus text format """
+
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return None
+
+            body = format_prometheus(snapshot_provider()).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Do not write every scrape into the log
+            return None
+
+    return MetricsHandler
+
+
+def _format_simple_metrics(lines: List[str], metrics: List[Dict], metric_type: str):
+    for name, metrics_with_name in _group_by_name(metrics).items():
+        lines.append(f'# TYPE {name} {metric_type}')
+        for metric in metrics_with_name:
+            lines.append(f'{name}{_format_labels(metric["labels"])} {_format_value(metric["value"])}')
+
+
+def _group_by_name(metrics: List[Dict]) -> Dict[str, List[Dict]]:
+    grouped_metrics = {}
+    for metric in metrics:
+        grouped_metrics.setdefault(metric['name'], []).append(metric)
+    return grouped_metrics
+
+
+def _format_labels(labels: Dict) -> str:
+    if len(labels) == 0:
+        return ''
+    formatted = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        formatted.append(f'{key}="{value}"')
+    return '{' + ','.join(formatted) + '}'
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
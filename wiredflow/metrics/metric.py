@@ -1,5 +1,199 @@
+import os
+import threading
+from typing import Dict, List, Tuple, Union, Sequence
+
+# Upper bounds of buckets for stage latency histograms (in seconds). Buckets
+# below 5 ms allow to estimate quantiles for fast stages (in-memory storages, core logic)
+DEFAULT_LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                           1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Upper bounds of buckets for number of records in payloads
+DEFAULT_SIZE_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+# Names of metrics which are collected for each stage launch
+STAGE_DURATION = 'wiredflow_stage_duration_seconds'
+STAGE_PAYLOAD_RECORDS = 'wiredflow_stage_payload_records'
+STAGE_LAUNCHES = 'wiredflow_stage_launches_total'
+STAGE_ERRORS = 'wiredflow_stage_errors_total'
+QUEUE_DEPTH = 'wiredflow_queue_depth'
+DROPPED_MESSAGES = 'wiredflow_dropped_messages_total'
+MALFORMED_MESSAGES = 'wiredflow_malformed_messages_total'
+# Metrics of send stages with outbox
+OUTBOX_DELIVERY_LATENCY = 'wiredflow_outbox_delivery_latency_seconds'
+OUTBOX_SPILLED_ITEMS = 'wiredflow_outbox_spilled_items_total'
+
+
+class Histogram:
+    """
+    Distribution of observed values. Only the number of values in each
+    bucket is stored, so memory does not depend on the number of observations
+
+    :param buckets: upper bounds of buckets in ascending order
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # The last bucket is for values larger than all bounds
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for bucket_id, upper_bound in enumerate(self.buckets):
+            if value <= upper_bound:
+                break
+        else:
+            bucket_id = len(self.buckets)
+        self.counts[bucket_id] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Union[float, None]:
+        """ Estimate quantile using linear interpolation inside the bucket """
+        return estimate_quantile(self.to_dict(), q)
+
+    def to_dict(self) -> Dict:
+        return {'buckets': list(self.buckets), 'counts': list(self.counts),
+                'sum': self.sum, 'count': self.count}
+
+    def merge(self, histogram: Dict):
+        """ Add values from histogram (in dictionary form) with the same buckets """
+        if tuple(histogram['buckets']) != self.buckets:
+            raise ValueError('Histograms with different buckets can not be merged')
+        self.counts = [count + other for count, other in zip(self.counts, histogram['counts'])]
+        self.sum += histogram['sum']
+        self.count += histogram['count']
+
+
 class Statistics:
-    """ Simple class to collect statistics about service processing """
+    """
+    Thread-safe registry of metrics. Contains counters, gauges and histograms
+    identified by the name and labels (for example, pipeline and stage).
+    Each process has its own registry - snapshots from several processes
+    can be combined using merge method
+    """
 
     def __init__(self):
-        pass
+        self.lock = threading.Lock()
+        self.counters: Dict[Tuple, float] = {}
+        self.gauges: Dict[Tuple, float] = {}
+        self.histograms: Dict[Tuple, Histogram] = {}
+
+    def increment(self, name: str, value: float = 1, **labels):
+        key = _define_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        key = _define_key(name, labels)
+        with self.lock:
+            self.gauges[key] = value
+
+    def observe(self, name: str, value: float, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS, **labels):
+        key = _define_key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = Histogram(buckets)
+                self.histograms[key] = histogram
+            histogram.observe(value)
+
+    def record_stage(self, pipeline: str, stage: str, duration_seconds: float,
+                     number_of_records: Union[int, None] = None, is_failed: bool = False):
+        """ Save information about single stage launch """
+        key_labels = {'pipeline': pipeline, 'stage': stage}
+        launches_key = _define_key(STAGE_LAUNCHES, key_labels)
+        errors_key = _define_key(STAGE_ERRORS, key_labels)
+        duration_key = _define_key(STAGE_DURATION, key_labels)
+        records_key = _define_key(STAGE_PAYLOAD_RECORDS, key_labels)
+        with self.lock:
+            self.counters[launches_key] = self.counters.get(launches_key, 0) + 1
+            if is_failed is True:
+                self.counters[errors_key] = self.counters.get(errors_key, 0) + 1
+
+            if duration_key not in self.histograms:
+                self.histograms[duration_key] = Histogram(DEFAULT_LATENCY_BUCKETS)
+            self.histograms[duration_key].observe(duration_seconds)
+
+            if number_of_records is not None:
+                if records_key not in self.histograms:
+                    self.histograms[records_key] = Histogram(DEFAULT_SIZE_BUCKETS)
+                self.histograms[records_key].observe(number_of_records)
+
+    def snapshot(self) -> Dict[str, List[Dict]]:
+        """
+        Return copy of all metrics in the form of dictionary with lists of
+        metrics. Each metric is a dictionary with name, labels and value
+        """
+        with self.lock:
+            return {'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                                 for (name, labels), value in self.counters.items()],
+                    'gauges': [{'name': name, 'labels': dict(labels), 'value': value}
+                               for (name, labels), value in self.gauges.items()],
+                    'histograms': [{'name': name, 'labels': dict(labels), 'value': histogram.to_dict()}
+                                   for (name, labels), histogram in self.histograms.items()]}
+
+    def merge(self, snapshot: Dict[str, List[Dict]]):
+        """ Add metrics from snapshot (for example, obtained from another process) """
+        with self.lock:
+            for metric in snapshot.get('counters', []):
+                key = _define_key(metric['name'], metric['labels'])
+                self.counters[key] = self.counters.get(key, 0) + metric['value']
+            for metric in snapshot.get('gauges', []):
+                self.gauges[_define_key(metric['name'], metric['labels'])] = metric['value']
+            for metric in snapshot.get('histograms', []):
+                key = _define_key(metric['name'], metric['labels'])
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram(metric['value']['buckets'])
+                self.histograms[key].merge(metric['value'])
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+            self.gauges = {}
+            self.histograms = {}
+
+
+def estimate_quantile(histogram: Dict, q: float) -> Union[float, None]:
+    """
+    Estimate quantile of values in the histogram (in dictionary form).
+    Values are considered uniformly distributed inside each bucket
+    """
+    if histogram['count'] == 0:
+        return None
+
+    rank = q * histogram['count']
+    cumulative_count = 0
+    lower_bound = 0.0
+    for bucket_id, count in enumerate(histogram['counts']):
+        if bucket_id == len(histogram['buckets']):
+            # Values larger than the last bound - there is no upper bound
+            return histogram['buckets'][-1]
+
+        upper_bound = histogram['buckets'][bucket_id]
+        if cumulative_count + count >= rank and count > 0:
+            return lower_bound + (upper_bound - lower_bound) * (rank - cumulative_count) / count
+        cumulative_count += count
+        lower_bound = upper_bound
+    return histogram['buckets'][-1]
+
+
+def _define_key(name: str, labels: Dict) -> Tuple:
+    return name, tuple(sorted(labels.items()))
+
+
+_statistics = Statistics()
+
+
+def get_statistics() -> Statistics:
+    """ Return registry of metrics for current process """
+    return _statistics
+
+
+def _reset_statistics_in_child():
+    # Child process must not report metrics of the parent one
+    global _statistics
+    _statistics = Statistics()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_statistics_in_child)
@@ -1,4 +1,3 @@
-import json
 import string
 
 from http.server import HTTPServer
@@ -6,12 +5,11 @@ from time import sleep
 from typing import Union
 
 from loguru import logger
-from paho.mqtt.publish import multiple
-import paho.mqtt.client as mqtt
 
 from wiredflow.main.build import FlowBuilder
 from wiredflow.mocks.http_server import RandomIntegersHandler, INT_PORT, \
     HTTP_LOCALHOST, _start_mock_http_server, STR_PORT, RandomStringHandler
+from wiredflow.mocks.mqtt_broker import publish_demo_messages
 from wiredflow.wiredtimer.timer import WiredTimer
 
 
@@ -44,19 +42,8 @@ def stage_int_mqtt_broker(**kwargs):
     else:
         logger.info(f'{common_message}. Execution timeout, seconds: {execution_seconds}')
 
-    for generated_int in range(0, 500):
-        payload = {"Generated number": str(generated_int)}
-        current_message = {'topic': topic, 'payload': json.dumps(payload)}
-        multiple([current_message], hostname='localhost', port=1883,
-                 client_id="", keepalive=60, will=None, auth=None, tls=None,
-                 protocol=mqtt.MQTTv5, transport="tcp")
-
-        logger.debug(f'MQTT local broker. Send generated int {generated_int} from topic {topic}')
-        sleep(1)
-
-        if timeout_timer.is_limit_reached():
-            # Finish execution
-            return None
+    payloads = [{"Generated number": str(generated_int)} for generated_int in range(0, 500)]
+    publish_demo_messages(topic, payloads, 'int', timeout_timer)
 
 
 def stage_str_mqtt_broker(**kwargs):
@@ -75,19 +62,8 @@ def stage_str_mqtt_broker(**kwargs):
         logger.info(common_message)
     else:
         logger.info(f'{common_message}. Execution timeout, seconds: {execution_seconds}')
-    for generated_str in string.ascii_letters:
-        payload = {"Generated letter": generated_str}
-        current_message = {'topic': topic, 'payload': json.dumps(payload)}
-        multiple([current_message], hostname='localhost', port=1883,
-                 client_id="", keepalive=60, will=None, auth=None, tls=None,
-                 protocol=mqtt.MQTTv5, transport="tcp")
-
-        logger.debug(f'MQTT local broker. Send generated letter {generated_str} from topic {topic}')
-        sleep(1)
-
-        if timeout_timer.is_limit_reached():
-            # Finish execution
-            return None
+    payloads = [{"Generated letter": generated_str} for generated_str in string.ascii_letters]
+    publish_demo_messages(topic, payloads, 'letter', timeout_timer)
 
 
 def launch_demo_with_int_http_connector_processes(flow_builder: FlowBuilder,
@@ -1,8 +1,10 @@
 import json
+import threading
+import time
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import HTTPServer, BaseHTTPRequestHandler, ThreadingHTTPServer
 import random
-from typing import Union
+from typing import Union, Dict
 import string
 
 from attrs import asdict
@@ -140,6 +142,148 @@ class HelloWorldHandler(BaseHTTPRequestHandler):
         return data_to_send.encode(encoding='utf_8')
 
 
+class LoadTestHandler(BaseHTTPRequestHandler):
+    """
+    Handler for load testing. Supports HTTP/1.1 persistent connections:
+    every response contains Content-Length, so client can send next request
+    through the same connection. Behaviour is defined by the server
+    """
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are sent by separate writes - without this option
+    # Nagle's algorithm delays responses in persistent connections
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.count_connection()
+
+    def do_GET(self):
+        self._respond()
+
+    def do_POST(self):
+        self._read_body()
+        self._respond()
+
+    def do_PUT(self):
+        self._read_body()
+        self._respond()
+
+    def _read_body(self):
+        content_length = int(self.headers.get('Content-Length', 0))
+        if content_length > 0:
+            self.rfile.read(content_length)
+
+    def _respond(self):
+        self.server.count_request()
+        if self.server.latency_seconds > 0:
+            time.sleep(self.server.latency_seconds)
+
+        if self.server.is_error_required():
+            status = self.server.error_status
+            body = json.dumps({'Error': 'Generated error'}).encode('utf-8')
+        else:
+            status = 200
+            body = self.server.response_body
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Do not write every request into the log
+        return None
+
+
+class MockHTTPServer(ThreadingHTTPServer):
+    """
+    Multithreaded HTTP server with keep-alive connections for load testing of
+    connectors and senders. Each connection is served in separate thread.
+    Responds to GET, POST and PUT requests with JSON list of records
+
+    :param host: address to listen
+    :param port: port to listen. If 0 - free port is chosen by operating system
+    :param latency_seconds: artificial delay before each response
+    :param response_size: approximate size of successful response in bytes
+    :param error_rate: part of requests (from 0 to 1) to respond with error
+    :param error_status: HTTP status of responses with errors
+    :param seed: seed for random generator which decides whether to respond
+    with error
+    """
+    daemon_threads = True
+    # Default backlog (5) drops simultaneous connections of load tests
+    request_queue_size = 128
+
+    def __init__(self, host: str = HTTP_LOCALHOST, port: int = 0,
+                 latency_seconds: float = 0.0, response_size: int = 100,
+                 error_rate: float = 0.0, error_status: int = 503,
+                 seed: Union[int, None] = None):
+        super().__init__((host, port), LoadTestHandler)
+        self.latency_seconds = latency_seconds
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.response_body = _generate_response_body(response_size)
+        self.random = random.Random(seed)
+
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.connections = 0
+        self.thread: Union[threading.Thread, None] = None
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.server_address[0]}:{self.server_port}'
+
+    def start(self):
+        """ Start serving in the separate thread """
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info(f'Start mock HTTP server for load testing: {self.url}')
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def count_connection(self):
+        with self.lock:
+            self.connections += 1
+
+    def count_request(self):
+        with self.lock:
+            self.requests += 1
+
+    def is_error_required(self) -> bool:
+        with self.lock:
+            is_error = self.error_rate > 0 and self.random.random() < self.error_rate
+            if is_error:
+                self.errors += 1
+        return is_error
+
+    def statistics(self) -> Dict[str, int]:
+        with self.lock:
+            return {'requests': self.requests, 'errors': self.errors, 'connections': self.connections}
+
+
+def _generate_response_body(response_size: int) -> bytes:
+    """ Generate JSON list with records which size is close to desired one """
+    record = json.dumps({'Generated random number': 0})
+    number_of_records = max(response_size // (len(record) + 2), 1)
+    records = [{'Generated random number': random.randint(0, 100)} for _ in range(number_of_records)]
+    return json.dumps(records).encode('utf-8')
+
+
 def _start_mock_http_server(execution_seconds: Union[int, None],
                             server: HTTPServer):
     common_message = f'Start mock HTTP server in separate process: {HTTP_LOCALHOST},' \
@@ -180,3 +324,22 @@ def start_mock_str_http_server(execution_seconds: Union[int, None] = None):
 def start_mock_hello_world_http_server(execution_seconds: Union[int, None] = None):
     server = HTTPServer((HTTP_LOCALHOST, HELLO_WORLD_PORT), HelloWorldHandler)
     return _start_mock_http_server(execution_seconds, server)
+
+
+def start_mock_load_http_server(execution_seconds: Union[int, None] = None, port: int = INT_PORT,
+                                **params):
+    """
+    Launch multithreaded keep-alive server for desired number of seconds
+    (or forever). Parameters are passed into MockHTTPServer
+    """
+    server = MockHTTPServer(port=port, **params)
+    server.start()
+    try:
+        if execution_seconds is None:
+            server.thread.join()
+        else:
+            time.sleep(execution_seconds)
+            logger.info(f'WiredTimer info: timeout was reached')
+    finally:
+        server.stop()
+    return server.statistics()
@@ -1,15 +1,146 @@
 import string
+import time
 from time import sleep
 import json
-from typing import Union
+from typing import Union, Dict, List
 
 from loguru import logger
 import paho.mqtt.client as mqtt
-from paho.mqtt.publish import multiple
 
 from wiredflow.wiredtimer.timer import WiredTimer
 
 
+class MQTTLoadGenerator:
+    """
+    Publish generated messages through single persistent connection to the
+    broker. Messages are sent by bursts: all messages of the burst are sent
+    without pauses and then generator waits to keep desired rate
+
+    :param hostname: address of the broker
+    :param port: port of the broker
+    :param rate: number of messages per second. If None - messages are
+    sent as fast as possible
+    :param burst_size: number of messages sent without pauses
+    :param payload_size: approximate size of each payload in bytes
+    :param topics: number of topics to send messages into. Messages are
+    distributed between topics evenly
+    :param duration_seconds: duration of sending
+    :param max_messages: if defined - sending is finished when desired
+    number of messages were sent
+    :param topic_prefix: topics are named "<topic_prefix>/<topic id>"
+    :param qos: quality of service level for messages
+    :param protocol: version of MQTT protocol
+    """
+
+    def __init__(self, hostname: str = 'localhost', port: int = 1883,
+                 rate: Union[float, None] = 1000, burst_size: int = 100,
+                 payload_size: int = 100, topics: int = 1,
+                 duration_seconds: Union[float, None] = 10,
+                 max_messages: Union[int, None] = None,
+                 topic_prefix: str = '/load', qos: int = 0, protocol: int = mqtt.MQTTv311):
+        if duration_seconds is None and max_messages is None:
+            raise ValueError('Duration or maximum number of messages must be defined for load generator')
+        self.hostname = hostname
+        self.port = port
+        self.rate = rate
+        self.burst_size = max(burst_size, 1)
+        self.payload_size = payload_size
+        self.topics = [f'{topic_prefix}/{topic_id}' for topic_id in range(max(topics, 1))]
+        self.duration_seconds = duration_seconds
+        self.max_messages = max_messages
+        self.qos = qos
+        self.protocol = protocol
+
+        self.published_messages = 0
+
+    def run(self) -> Dict[str, float]:
+        """ Send messages and return statistics of sending """
+        client = mqtt.Client(protocol=self.protocol)
+        # Messages are not dropped if the network is slower than generator
+        client.max_queued_messages_set(0)
+        client.max_inflight_messages_set(max(self.burst_size, 20))
+        client.connect(self.hostname, self.port, 60)
+        client.loop_start()
+
+        start_time = time.perf_counter()
+        message_info = None
+        try:
+            payload_filler = 'x' * self.payload_size
+            while self._is_finished(start_time) is False:
+                for _ in range(self._define_burst_size()):
+                    topic = self.topics[self.published_messages % len(self.topics)]
+                    payload = json.dumps({'Index': self.published_messages, 'Payload': payload_filler})
+                    message_info = client.publish(topic, payload, qos=self.qos)
+                    self.published_messages += 1
+                self._wait_for_next_burst(start_time)
+
+            # Wait till all messages are passed to the broker
+            if message_info is not None:
+                message_info.wait_for_publish()
+        finally:
+            client.disconnect()
+            client.loop_stop()
+
+        elapsed_seconds = time.perf_counter() - start_time
+        logger.info(f'MQTT load generator. Sent {self.published_messages} messages '
+                    f'in {elapsed_seconds:.2f} seconds')
+        return {'published_messages': self.published_messages,
+                'elapsed_seconds': elapsed_seconds,
+                'publish_rate': self.published_messages / elapsed_seconds if elapsed_seconds > 0 else 0.0}
+
+    def _is_finished(self, start_time: float) -> bool:
+        if self.max_messages is not None and self.published_messages >= self.max_messages:
+            return True
+        return self.duration_seconds is not None and time.perf_counter() - start_time >= self.duration_seconds
+
+    def _define_burst_size(self) -> int:
+        if self.max_messages is None:
+            return self.burst_size
+        return min(self.burst_size, self.max_messages - self.published_messages)
+
+    def _wait_for_next_burst(self, start_time: float):
+        if self.rate is None:
+            return None
+        # Time of the next burst is calculated from the start, so pauses do not accumulate errors
+        seconds_to_wait = start_time + self.published_messages / self.rate - time.perf_counter()
+        if self.duration_seconds is not None:
+            seconds_to_wait = min(seconds_to_wait, start_time + self.duration_seconds - time.perf_counter())
+        if seconds_to_wait > 0:
+            time.sleep(seconds_to_wait)
+
+
+def publish_demo_messages(topic: str, payloads: List[Dict], name: str,
+                          timeout_timer: WiredTimer,
+                          hostname: str = 'localhost', port: int = 1883):
+    """
+    Send messages one per second through single persistent connection.
+    Used in demo flows
+
+    :param topic: name of topic
+    :param payloads: messages to send
+    :param name: name of generated values for logging
+    :param timeout_timer: object for checking allocated time
+    :param hostname: address of the broker
+    :param port: port of the broker
+    """
+    client = mqtt.Client(protocol=mqtt.MQTTv5)
+    client.connect(hostname, port, 60)
+    client.loop_start()
+    try:
+        for payload in payloads:
+            client.publish(topic, json.dumps(payload)).wait_for_publish()
+
+            logger.debug(f'MQTT local broker. Send generated {name} {list(payload.values())[0]} from topic {topic}')
+            sleep(1)
+
+            if timeout_timer.is_limit_reached():
+                # Finish execution
+                return None
+    finally:
+        client.disconnect()
+        client.loop_stop()
+
+
 def configure_int_mqtt_broker(execution_seconds: Union[int, None] = None):
     """
     Generate messages with integers values and then send messages through
@@ -26,19 +157,8 @@ def configure_int_mqtt_broker(execution_seconds: Union[int, None] = None):
     else:
         logger.info(f'{common_message}. Execution timeout, seconds: {execution_seconds}')
 
-    for generated_int in range(0, 500):
-        payload = {"Generated number": str(generated_int)}
-        current_message = {'topic': topic, 'payload': json.dumps(payload)}
-        multiple([current_message], hostname='localhost', port=1883,
-                 client_id="", keepalive=60, will=None, auth=None, tls=None,
-                 protocol=mqtt.MQTTv5, transport="tcp")
-
-        logger.debug(f'MQTT local broker. Send generated int {generated_int} from topic {topic}')
-        sleep(1)
-
-        if timeout_timer.is_limit_reached():
-            # Finish execution
-            return None
+    payloads = [{"Generated number": str(generated_int)} for generated_int in range(0, 500)]
+    publish_demo_messages(topic, payloads, 'int', timeout_timer)
 
 
 def configure_str_mqtt_broker(execution_seconds: Union[int, None] = None):
@@ -56,16 +176,5 @@ def configure_str_mqtt_broker(execution_seconds: Union[int, None] = None):
         logger.info(common_message)
     else:
         logger.info(f'{common_message}. Execution timeout, seconds: {execution_seconds}')
-    for generated_str in string.ascii_letters:
-        payload = {"Generated letter": generated_str}
-        current_message = {'topic': topic, 'payload': json.dumps(payload)}
-        multiple([current_message], hostname='localhost', port=1883,
-                 client_id="", keepalive=60, will=None, auth=None, tls=None,
-                 protocol=mqtt.MQTTv5, transport="tcp")
-
-        logger.debug(f'MQTT local broker. Send generated letter {generated_str} from topic {topic}')
-        sleep(1)
-
-        if timeout_timer.is_limit_reached():
-            # Finish execution
-            return None
+    payloads = [{"Generated letter": generated_str} for generated_str in string.ascii_letters]
+    publish_demo_messages(topic, payloads, 'letter', timeout_timer)
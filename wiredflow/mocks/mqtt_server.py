@@ -0,0 +1,371 @@
+import socket
+import socketserver
+import threading
+import time
+from typing import Dict, List, Union, Tuple
+
+from loguru import logger
+
+MQTT_LOCALHOST = '127.0.0.1'
+
+# Types of MQTT control packets
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+PUBACK = 4
+PUBREC = 5
+PUBREL = 6
+PUBCOMP = 7
+SUBSCRIBE = 8
+SUBACK = 9
+UNSUBSCRIBE = 10
+UNSUBACK = 11
+PINGREQ = 12
+PINGRESP = 13
+DISCONNECT = 14
+
+MQTT_V5 = 5
+
+
+class LocalMQTTBroker:
+    """
+    Minimal MQTT broker for local tests and benchmarks. Supports MQTT 3.1.1
+    and MQTT 5 clients, subscriptions with wildcards ("+" and "#") and
+    delivers all messages with QoS 0. Authentication, retained messages,
+    sessions and will messages are not supported.
+    Each client connection is served by separate thread
+
+    :param host: address to listen
+    :param port: port to listen. If 0 - free port is chosen by operating system
+    """
+
+    def __init__(self, host: str = MQTT_LOCALHOST, port: int = 1883):
+        self.host = host
+        self.port = port
+
+        self.lock = threading.Lock()
+        self.sessions: List['_ClientSession'] = []
+        # Statistics of the broker
+        self.received_messages = 0
+        self.delivered_messages = 0
+
+        self.server: Union['_BrokerServer', None] = None
+        self.thread: Union[threading.Thread, None] = None
+
+    def start(self):
+        """ Start accepting connections in the separate thread """
+        broker = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                _ClientSession(broker, self.request).serve()
+
+        self.server = _BrokerServer((self.host, self.port), Handler)
+        # Port can be chosen by the operating system if it is 0
+        self.port = self.server.server_address[1]
+
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info(f'Start local MQTT broker: {self.host}, port {self.port}')
+
+    def stop(self):
+        """ Stop accepting connections and disconnect all clients """
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+        with self.lock:
+            sessions = list(self.sessions)
+        for session in sessions:
+            session.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def number_of_subscriptions(self) -> int:
+        with self.lock:
+            return sum(len(session.subscriptions) for session in self.sessions)
+
+    def wait_for_subscriptions(self, number_of_subscriptions: int = 1, timeout: float = 10) -> bool:
+        """ Wait till clients subscribe to desired number of topics """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.number_of_subscriptions >= number_of_subscriptions:
+                return True
+            time.sleep(0.05)
+        return False
+
+    def register(self, session: '_ClientSession'):
+        with self.lock:
+            self.sessions.append(session)
+
+    def unregister(self, session: '_ClientSession'):
+        with self.lock:
+            if session in self.sessions:
+                self.sessions.remove(session)
+
+    def publish(self, topic: str, payload: bytes):
+        """ Deliver message to all clients with suitable subscription """
+        with self.lock:
+            self.received_messages += 1
+            recipients = [session for session in self.sessions if session.is_subscribed(topic)]
+
+        for session in recipients:
+            if session.deliver(topic, payload) is True:
+                with self.lock:
+                    self.delivered_messages += 1
+
+
+class _BrokerServer(socketserver.ThreadingTCPServer):
+    """ TCP server of the broker which does not wait for client threads """
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _ClientSession:
+    """ Connection with single client """
+
+    def __init__(self, broker: LocalMQTTBroker, connection: socket.socket):
+        self.broker = broker
+        self.connection = connection
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = connection.makefile('rb')
+        self.write_lock = threading.Lock()
+
+        self.protocol_level = 4
+        self.subscriptions: List[str] = []
+        self.is_closed = False
+
+    def serve(self):
+        """ Process packets from the client till disconnection """
+        self.broker.register(self)
+        try:
+            while True:
+                packet = self.read_packet()
+                if packet is None:
+                    return None
+                packet_type, flags, body = packet
+                if self.process_packet(packet_type, flags, body) is False:
+                    return None
+        except (OSError, ValueError) as ex:
+            logger.debug(f'Local MQTT broker. Connection closed: {ex}')
+        finally:
+            self.broker.unregister(self)
+            self.close()
+
+    def read_packet(self) -> Union[Tuple[int, int, bytes], None]:
+        first_byte = self.reader.read(1)
+        if len(first_byte) == 0:
+            return None
+
+        remaining_length = 0
+        multiplier = 1
+        while True:
+            encoded_byte = self.reader.read(1)
+            if len(encoded_byte) == 0:
+                return None
+            remaining_length += (encoded_byte[0] & 127) * multiplier
+            if encoded_byte[0] & 128 == 0:
+                break
+            multiplier *= 128
+
+        body = self.reader.read(remaining_length)
+        if len(body) < remaining_length:
+            return None
+        return first_byte[0] >> 4, first_byte[0] & 15, body
+
+    def process_packet(self, packet_type: int, flags: int, body: bytes) -> bool:
+        """ Process packet and return False if connection must be closed """
+        if packet_type == CONNECT:
+            self._process_connect(body)
+        elif packet_type == PUBLISH:
+            self._process_publish(flags, body)
+        elif packet_type == PUBREL:
+            # Second step of QoS 2 delivery
+            self.send(_encode_packet(PUBCOMP, 0, body[:2]))
+        elif packet_type == SUBSCRIBE:
+            self._process_subscribe(body)
+        elif packet_type == UNSUBSCRIBE:
+            self._process_unsubscribe(body)
+        elif packet_type == PINGREQ:
+            self.send(_encode_packet(PINGRESP, 0, b''))
+        elif packet_type == DISCONNECT:
+            return False
+        return True
+
+    def _process_connect(self, body: bytes):
+        _, position = _decode_string(body, 0)
+        self.protocol_level = body[position]
+
+        if self.protocol_level == MQTT_V5:
+            # Session present flag, reason code and empty properties
+            self.send(_encode_packet(CONNACK, 0, b'\x00\x00\x00'))
+        else:
+            self.send(_encode_packet(CONNACK, 0, b'\x00\x00'))
+
+    def _process_publish(self, flags: int, body: bytes):
+        qos = (flags >> 1) & 3
+        topic, position = _decode_string(body, 0)
+        packet_id = None
+        if qos > 0:
+            packet_id = body[position:position + 2]
+            position += 2
+        if self.protocol_level == MQTT_V5:
+            position = _skip_properties(body, position)
+
+        self.broker.publish(topic, body[position:])
+        if qos == 1:
+            self.send(_encode_packet(PUBACK, 0, packet_id))
+        elif qos == 2:
+            self.send(_encode_packet(PUBREC, 0, packet_id))
+
+    def _process_subscribe(self, body: bytes):
+        packet_id = body[:2]
+        position = 2
+        if self.protocol_level == MQTT_V5:
+            position = _skip_properties(body, position)
+
+        topic_filters = []
+        while position < len(body):
+            topic_filter, position = _decode_string(body, position)
+            # Skip subscription options
+            position += 1
+            topic_filters.append(topic_filter)
+        with self.broker.lock:
+            self.subscriptions.extend(topic_filters)
+
+        # All subscriptions are granted with QoS 0
+        properties = b'\x00' if self.protocol_level == MQTT_V5 else b''
+        self.send(_encode_packet(SUBACK, 0, packet_id + properties + b'\x00' * len(topic_filters)))
+
+    def _process_unsubscribe(self, body: bytes):
+        packet_id = body[:2]
+        position = 2
+        if self.protocol_level == MQTT_V5:
+            position = _skip_properties(body, position)
+
+        topic_filters = []
+        while position < len(body):
+            topic_filter, position = _decode_string(body, position)
+            topic_filters.append(topic_filter)
+        with self.broker.lock:
+            self.subscriptions = [subscription for subscription in self.subscriptions
+                                  if subscription not in topic_filters]
+
+        if self.protocol_level == MQTT_V5:
+            self.send(_encode_packet(UNSUBACK, 0, packet_id + b'\x00' + b'\x00' * len(topic_filters)))
+        else:
+            self.send(_encode_packet(UNSUBACK, 0, packet_id))
+
+    def is_subscribed(self, topic: str) -> bool:
+        return any(is_topic_matched(subscription, topic) for subscription in self.subscriptions)
+
+    def deliver(self, topic: str, payload: bytes) -> bool:
+        """ Send message to the client with QoS 0 """
+        body = _encode_string(topic)
+        if self.protocol_level == MQTT_V5:
+            body += b'\x00'
+        try:
+            self.send(_encode_packet(PUBLISH, 0, body + payload))
+        except OSError:
+            return False
+        return True
+
+    def send(self, packet: bytes):
+        with self.write_lock:
+            self.connection.sendall(packet)
+
+    def close(self):
+        if self.is_closed is True:
+            return None
+        self.is_closed = True
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.connection.close()
+
+
+def is_topic_matched(topic_filter: str, topic: str) -> bool:
+    """ Check if topic satisfies subscription with wildcards """
+    filter_levels = topic_filter.split('/')
+    topic_levels = topic.split('/')
+    for level_id, filter_level in enumerate(filter_levels):
+        if filter_level == '#':
+            return True
+        if level_id >= len(topic_levels):
+            return False
+        if filter_level != '+' and filter_level != topic_levels[level_id]:
+            return False
+    return len(filter_levels) == len(topic_levels)
+
+
+def _encode_packet(packet_type: int, flags: int, body: bytes) -> bytes:
+    return bytes([(packet_type << 4) | flags]) + _encode_variable_integer(len(body)) + body
+
+
+def _encode_variable_integer(value: int) -> bytes:
+    encoded = bytearray()
+    while True:
+        encoded_byte = value % 128
+        value = value // 128
+        if value > 0:
+            encoded_byte |= 128
+        encoded.append(encoded_byte)
+        if value == 0:
+            return bytes(encoded)
+
+
+def _decode_variable_integer(data: bytes, position: int) -> Tuple[int, int]:
+    value = 0
+    multiplier = 1
+    while True:
+        encoded_byte = data[position]
+        position += 1
+        value += (encoded_byte & 127) * multiplier
+        if encoded_byte & 128 == 0:
+            return value, position
+        multiplier *= 128
+
+
+def _encode_string(value: str) -> bytes:
+    encoded = value.encode('utf-8')
+    return len(encoded).to_bytes(2, 'big') + encoded
+
+
+def _decode_string(data: bytes, position: int) -> Tuple[str, int]:
+    length = int.from_bytes(data[position:position + 2], 'big')
+    position += 2
+    return data[position:position + length].decode('utf-8'), position + length
+
+
+def _skip_properties(data: bytes, position: int) -> int:
+    """ Properties of MQTT 5 packets are not used by the broker """
+    properties_length, position = _decode_variable_integer(data, position)
+    return position + properties_length
+
+
+def start_local_mqtt_broker(execution_seconds: Union[int, None] = None,
+                            port: int = 1883) -> Dict[str, int]:
+    """ Launch local MQTT broker for desired number of seconds (or forever) """
+    broker = LocalMQTTBroker(port=port)
+    broker.start()
+    try:
+        if execution_seconds is None:
+            broker.thread.join()
+        else:
+            time.sleep(execution_seconds)
+            logger.info('WiredTimer info: timeout was reached')
+    finally:
+        broker.stop()
+    return {'received_messages': broker.received_messages,
+            'delivered_messages': broker.delivered_messages}
@@ -1,33 +1,296 @@
 import datetime
-from typing import Union, Callable
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, Callable, List, Tuple
+
+from loguru import logger
+
+from wiredflow.settings import SCHEDULER_STATUS_CHECK_SECONDS
+from wiredflow.wiredtimer.cron import CronSchedule
 
 
 class Scheduler:
-    """ Class for controlling execution time for desired functions """
+    """
+    Class for controlling execution time for desired functions.
+    Time of the next launch is stored as deadline on the monotonic clock,
+    so changes of system time do not affect the schedule
+
+    :param function_to_launch: function to launch
+    :param timedelta_seconds: period of launches in seconds
+    :param launch_time: particular time for launches - cron expression
+    ("*/5 * * * *"), "HH:MM" or "every day HH:MM". If defined -
+    timedelta_seconds is ignored. Look at CronSchedule for details
+    :param schedule_mode: how to define the next launch
+        - 'fixed_rate' - launches are performed every timedelta_seconds
+        regardless of function execution time (schedule does not drift)
+        - 'fixed_delay' - next launch is performed timedelta_seconds after the
+        previous one finished
+    :param overlap_policy: what to do if the launch took longer than the
+    period and the time of the next launches has already come
+        - 'skip_if_running' - skip missed launches, wait for the next one
+        according to schedule
+        - 'coalesce_missed' - perform single launch instead of all missed ones
+        immediately
+        - 'catch_up' - perform all missed launches one by one
+        - 'allow_overlap' - launch function in background according to
+        schedule even if the previous launch is still in progress
+    :param max_overlapping_runs: maximum number of simultaneous launches for
+    'allow_overlap' policy. If the limit is reached - launch is skipped
+    """
+    supported_modes = ['fixed_rate', 'fixed_delay']
+    supported_overlap_policies = ['skip_if_running', 'coalesce_missed', 'catch_up', 'allow_overlap']
 
     def __init__(self, function_to_launch: Callable,
                  timedelta_seconds: float,
-                 launch_time: Union[str, None]):
+                 launch_time: Union[str, None],
+                 schedule_mode: str = 'fixed_rate',
+                 overlap_policy: str = 'skip_if_running',
+                 max_overlapping_runs: int = 2):
         self.function_to_launch = function_to_launch
         self.timedelta_seconds = timedelta_seconds
         self.launch_time = launch_time
 
-        self.start_time = datetime.datetime.now()
+        if schedule_mode not in self.supported_modes:
+            raise ValueError(f'Schedule mode "{schedule_mode}" is not supported. '
+                             f'Possible options: {self.supported_modes}')
+        self.schedule_mode = schedule_mode
+        if overlap_policy not in self.supported_overlap_policies:
+            raise ValueError(f'Overlap policy "{overlap_policy}" is not supported. '
+                             f'Possible options: {self.supported_overlap_policies}')
+        self.overlap_policy = overlap_policy
+        self.max_overlapping_runs = max(max_overlapping_runs, 1)
+
+        # Counters of launches which were not performed in time
+        self.skipped_runs = 0
+        self.overlapping_runs = 0
+        self.caught_up_runs = 0
+
+        # Launches in background for 'allow_overlap' policy
+        self.lock = threading.Lock()
+        self.active_runs = 0
+        self.executor: Union[ThreadPoolExecutor, None] = None
+        self.failure: Union[Exception, None] = None
+
+        self.cron_schedule = None
+        if self.launch_time is None:
+            # Nominal time of the launch according to schedule. Wall-clock time
+            # is stored only for launches at particular time
+            self.slot = (time.monotonic(), None)
+        else:
+            self.cron_schedule = CronSchedule(self.launch_time)
+            current_time = datetime.datetime.now(self.cron_schedule.timezone)
+            self.slot = self._convert_into_slot(self.cron_schedule.next_fire_time(current_time),
+                                                current_time)
+        # Deadline for the next launch
+        self.next_launch = self.slot[0]
+
+    @property
+    def next_fire_time(self) -> Union[datetime.datetime, None]:
+        """ Wall-clock time of the next launch according to schedule """
+        return self.slot[1]
 
     def run(self):
         """ Launch function if it is time for that """
-        if self.launch_time is None:
-            self.launch_via_delta()
+        if time.monotonic() >= self.next_launch:
+            self.launch()
+
+    def seconds_to_next_launch(self) -> float:
+        """ Return number of seconds before the next launch of the function """
+        return max(self.next_launch - time.monotonic(), 0)
+
+    def delay_first_launch(self, delay_seconds: float):
+        """ Postpone the first launch if it is planned earlier than after delay """
+        delayed_launch = time.monotonic() + delay_seconds
+        if delayed_launch > self.next_launch:
+            self.slot = (delayed_launch, self.slot[1])
+            self.next_launch = delayed_launch
+
+    def launch(self):
+        """ Launch function right now and define the time of the next launch """
+        if self.failure is not None:
+            # Launch in background failed
+            raise self.failure
+
+        if self.overlap_policy == 'allow_overlap':
+            return self._launch_in_background()
+
+        current_slot = self.slot
+        try:
+            self.function_to_launch()
+        finally:
+            self.next_launch = self.define_next_launch(current_slot)
+
+    def define_next_launch(self, current_slot: Tuple[float, Union[datetime.datetime, None]]) -> float:
+        """
+        Calculate deadline for the next launch after the current one finished.
+        Launches which were missed are processed according to overlap policy
+        """
+        current_time = time.monotonic()
+        if self.cron_schedule is None and self.schedule_mode == 'fixed_delay':
+            self.slot = (current_time + self.timedelta_seconds, None)
+            return self.slot[0]
+
+        next_slot = self._following_slot(current_slot)
+        if next_slot[0] >= current_time or self.overlap_policy == 'allow_overlap':
+            self.slot = next_slot
+            return next_slot[0]
+
+        missed_slots = [next_slot]
+        if self.overlap_policy != 'catch_up':
+            while True:
+                next_slot = self._following_slot(next_slot)
+                if next_slot[0] >= current_time:
+                    break
+                missed_slots.append(next_slot)
+
+        if self.overlap_policy == 'skip_if_running':
+            self.skipped_runs += len(missed_slots)
+            self.slot = next_slot
+            return next_slot[0]
+
+        if self.overlap_policy == 'coalesce_missed':
+            # Launch once immediately instead of all missed launches
+            self.skipped_runs += len(missed_slots) - 1
+            self.slot = missed_slots[-1]
         else:
-            self.launch_via_particular_time()
+            # Launch immediately - next missed launch will be found after that
+            self.caught_up_runs += 1
+            self.slot = missed_slots[0]
+        return current_time
+
+    def close(self):
+        """ Wait for launches in background """
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def _launch_in_background(self):
+        with self.lock:
+            self.next_launch = self.define_next_launch(self.slot)
+            if self.active_runs >= self.max_overlapping_runs:
+                self.skipped_runs += 1
+                return None
+            if self.active_runs > 0:
+                self.overlapping_runs += 1
+            self.active_runs += 1
 
-    def launch_via_delta(self):
-        current_time = datetime.datetime.now()
-        time_from_previous_launch = current_time - self.start_time
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_overlapping_runs)
+        self.executor.submit(self._launch_and_release)
 
-        if time_from_previous_launch.total_seconds() >= self.timedelta_seconds:
-            self.start_time = datetime.datetime.now()
+    def _launch_and_release(self):
+        try:
             self.function_to_launch()
+        except Exception as ex:
+            logger.warning(f'Launch in background failed: {ex}')
+            self.failure = ex
+        finally:
+            with self.lock:
+                self.active_runs -= 1
+
+    def _following_slot(self, slot: Tuple[float, Union[datetime.datetime, None]]):
+        """ Return nominal time of the launch which follows desired one """
+        if self.cron_schedule is None:
+            return slot[0] + self.timedelta_seconds, None
+
+        monotonic_time, fire_time = slot
+        next_fire_time = self.cron_schedule.next_fire_time(fire_time)
+        return monotonic_time + (next_fire_time - fire_time).total_seconds(), next_fire_time
+
+    @staticmethod
+    def _convert_into_slot(fire_time: datetime.datetime, current_time: datetime.datetime):
+        """ Convert wall-clock time into deadline on the monotonic clock """
+        return time.monotonic() + (fire_time - current_time).total_seconds(), fire_time
+
+
+class DeadlineScheduler:
+    """
+    Central scheduler for several pipelines. Deadlines of next launches are
+    stored in priority queue, single dispatcher thread waits for the nearest
+    one and passes the launch into pool of workers. So a lot of pipelines
+    can share a small number of threads
+
+    :param max_workers: number of threads to perform launches
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+
+        # Priority queue with deadlines, unique sequence number and scheduler
+        self.deadlines: List[Tuple[float, int, Scheduler]] = []
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+
+        # Number of launches which are in progress now
+        self.active_launches = 0
+        self.failure: Union[Exception, None] = None
+
+    def add(self, scheduler: Scheduler, delay_seconds: float = 0):
+        """ Add new schedule. First launch will be performed not earlier than after delay """
+        scheduler.delay_first_launch(delay_seconds)
+        with self.condition:
+            self._push(scheduler)
+            self.condition.notify()
+
+    def run(self, timeout_timer, failures_checker):
+        """
+        Dispatch launches till timeout is reached or service failed.
+        Blocks current thread
+
+        :param timeout_timer: object for checking allocated time
+        :param failures_checker: failures checker object
+        """
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='wiredflow')
+        try:
+            with self.condition:
+                while True:
+                    if self.failure is not None:
+                        failures_checker.set_failed_status(self.failure)
+                        break
+                    if failures_checker.is_current_status_ok() is False:
+                        logger.info(f'Service failure due to "{failures_checker.exception_message()}". '
+                                    f'Stop scheduler execution')
+                        break
+
+                    seconds_to_wait = SCHEDULER_STATUS_CHECK_SECONDS
+                    if timeout_timer is not None and timeout_timer.execution_seconds is not None:
+                        seconds_till_limit = timeout_timer.seconds_till_limit()
+                        if seconds_till_limit <= 0:
+                            # Finish execution
+                            break
+                        seconds_to_wait = min(seconds_to_wait, seconds_till_limit)
+
+                    if len(self.deadlines) > 0:
+                        seconds_to_deadline = self.deadlines[0][0] - time.monotonic()
+                        if seconds_to_deadline <= 0:
+                            _, _, scheduler = heapq.heappop(self.deadlines)
+                            self.active_launches += 1
+                            executor.submit(self._launch, scheduler)
+                            continue
+                        seconds_to_wait = min(seconds_to_wait, seconds_to_deadline)
+
+                    self.condition.wait(seconds_to_wait)
+        finally:
+            # Wait for launches which are in progress
+            executor.shutdown(wait=True)
+
+    def _launch(self, scheduler: Scheduler):
+        """ Launch function in the worker and put next deadline into the queue """
+        try:
+            scheduler.launch()
+        except Exception as ex:
+            with self.condition:
+                if self.failure is None:
+                    self.failure = ex
+        finally:
+            with self.condition:
+                self.active_launches -= 1
+                if self.failure is None:
+                    self._push(scheduler)
+                self.condition.notify()
 
-    def launch_via_particular_time(self):
-        raise NotImplementedError(f'Launch time does not supported yet')
+    def _push(self, scheduler: Scheduler):
+        heapq.heappush(self.deadlines, (scheduler.next_launch, next(self.sequence), scheduler))
@@ -6,3 +6,19 @@ MAX_NUMBER_FAILURES_PER_PIPELINE = 2
 FAILURES_BATCH_MINUTES = 5
 
 WARM_START_CORE_SECONDS = 10
+
+# How often MQTT subscribers check service status and timeout
+MQTT_STATUS_CHECK_SECONDS = 1
+
+# How often pipelines launched as coroutines check service status and timeout
+ASYNC_STATUS_CHECK_SECONDS = 1
+# Number of threads to launch blocking stages in asyncio mode
+ASYNC_EXECUTOR_WORKERS = 32
+
+# How often central scheduler checks service status and timeout
+SCHEDULER_STATUS_CHECK_SECONDS = 1
+# Default number of threads to perform launches in scheduler mode
+SCHEDULER_WORKERS = 8
+
+# How often processes send their metrics to the main process
+METRICS_PUSH_SECONDS = 2
@@ -0,0 +1,129 @@
+import datetime
+import re
+from typing import List, Set, Union
+
+from wiredflow.settings import LOCAL_TIMEZONE
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+# Maximum number of days to search for the next launch (leap year cycle)
+MAX_DAYS_TO_SEARCH = 366 * 4 + 1
+
+
+class CronSchedule:
+    """
+    Schedule of launches at particular wall-clock times. Supported formats:
+        - cron expression with five fields: "minute hour day month weekday".
+        Each field can be "*", number, range "1-5", step "*/5" or "1-30/5"
+        and list of such values "1,15,30"
+        - "HH:MM" - every day at desired time
+        - "every day HH:MM" - every day at desired time
+        - "every <weekday> HH:MM" - every week at desired day and time
+
+    :param launch_time: string with schedule
+    :param timezone: time zone of the schedule. If not defined - local time zone is used
+    """
+
+    def __init__(self, launch_time: str, timezone: Union[datetime.tzinfo, None] = None):
+        self.launch_time = launch_time
+        self.timezone = LOCAL_TIMEZONE if timezone is None else timezone
+
+        fields = _convert_into_cron_fields(launch_time.strip().lower())
+        if len(fields) != 5:
+            raise ValueError(f'Launch time "{launch_time}" can not be parsed. Use cron expression '
+                             f'"minute hour day month weekday", "HH:MM" or "every day HH:MM"')
+
+        self.minutes = _parse_field(fields[0], 0, 59)
+        self.hours = _parse_field(fields[1], 0, 23)
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12)
+        # Both 0 and 7 mean sunday in cron expressions
+        weekdays = _parse_field(fields[4], 0, 7)
+        self.weekdays = {(weekday - 1) % 7 for weekday in weekdays}
+
+        self.is_day_restricted = fields[2] != '*'
+        self.is_weekday_restricted = fields[4] != '*'
+
+    def next_fire_time(self, after: Union[datetime.datetime, None] = None) -> datetime.datetime:
+        """ Return the nearest time of launch which is strictly later than desired moment """
+        if after is None:
+            after = datetime.datetime.now(self.timezone)
+        elif after.tzinfo is None:
+            after = after.replace(tzinfo=self.timezone)
+        else:
+            after = after.astimezone(self.timezone)
+
+        # Launches are defined with minute precision
+        start = after.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        current_day = start.date()
+        for _ in range(MAX_DAYS_TO_SEARCH):
+            if self._is_day_suitable(current_day):
+                fire_time = self._first_time_in_day(current_day, start)
+                if fire_time is not None:
+                    return fire_time
+            current_day += datetime.timedelta(days=1)
+
+        raise ValueError(f'Launch time "{self.launch_time}" never occurs')
+
+    def _is_day_suitable(self, day: datetime.date) -> bool:
+        if day.month not in self.months:
+            return False
+
+        is_day_match = day.day in self.days
+        is_weekday_match = day.weekday() in self.weekdays
+        if self.is_day_restricted and self.is_weekday_restricted:
+            # Cron rule - day is suitable if any of conditions is satisfied
+            return is_day_match or is_weekday_match
+        return is_day_match and is_weekday_match
+
+    def _first_time_in_day(self, day: datetime.date,
+                           start: datetime.datetime) -> Union[datetime.datetime, None]:
+        for hour in sorted(self.hours):
+            for minute in sorted(self.minutes):
+                fire_time = datetime.datetime(day.year, day.month, day.day, hour, minute,
+                                              tzinfo=self.timezone)
+                if fire_time >= start:
+                    return fire_time
+        return None
+
+
+def _convert_into_cron_fields(launch_time: str) -> List[str]:
+    """ Convert human-readable schedule into cron expression fields """
+    human_readable = re.fullmatch(r'(?:every\s+(\w+)\s+)?(\d{1,2}):(\d{2})', launch_time)
+    if human_readable is None:
+        return launch_time.split()
+
+    period, hour, minute = human_readable.groups()
+    weekday = '*'
+    if period is not None and period != 'day':
+        if period not in WEEKDAYS:
+            raise ValueError(f'Period "{period}" is not supported. Possible options: {["day"] + WEEKDAYS}')
+        # Cron weekdays start from sunday
+        weekday = str((WEEKDAYS.index(period) + 1) % 7)
+    return [str(int(minute)), str(int(hour)), '*', '*', weekday]
+
+
+def _parse_field(field: str, min_value: int, max_value: int) -> Set[int]:
+    """ Convert field of cron expression into set of suitable values """
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step = part.split('/')
+            step = int(step)
+            if step < 1:
+                raise ValueError(f'Step in cron expression must be positive, got {step}')
+
+        if part == '*':
+            start, end = min_value, max_value
+        elif '-' in part:
+            start, end = (int(value) for value in part.split('-'))
+        else:
+            start = int(part)
+            # Value with step means the range till the end
+            end = max_value if step > 1 else start
+
+        if start < min_value or end > max_value or start > end:
+            raise ValueError(f'Value "{field}" in cron expression is out of range '
+                             f'{min_value}-{max_value}')
+        values.update(range(start, end + 1, step))
+    return values
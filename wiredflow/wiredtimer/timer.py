@@ -46,6 +46,15 @@ class WiredTimer:
         else:
             return False
 
+    def seconds_till_limit(self) -> Union[float, None]:
+        """ Return number of seconds left before the timeout """
+        if self.execution_seconds is None:
+            # There is no limit for execution
+            return None
+
+        spend_time = datetime.datetime.now() - self.current_spend_time
+        return self.execution_seconds - spend_time.total_seconds()
+
     def set_failures_time(self):
         self.failures_start_time = datetime.datetime.now()
 